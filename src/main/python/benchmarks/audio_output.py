@@ -0,0 +1,82 @@
+"""
+Compare the CPU cost of the two `AudioEngine` output modes: one OpenAL source per
+sound (`AudioOutputHandler`) and software mixing into a single stream
+(`SoftwareMixerOutput`), for an increasing number of simultaneous sounds.
+
+Each run starts all sounds at once, then does the work needed to play one second
+of audio. Requires an OpenAL output device. Run from `src/main/python` with:
+
+    python -m benchmarks.audio_output
+"""
+
+import sys
+import time
+
+import numpy as np
+from benchmarks.render import load_default_sounds
+
+from nbs.core.audio import (
+    AudioOutputHandler,
+    SampleCache,
+    SoftwareMixerOutput,
+    key_to_pitch,
+)
+
+VOICES = (64, 256, 2048)
+SAMPLE_RATE = 44100
+UPDATE_INTERVAL = 0.016
+
+
+def random_notes(voices: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return zip(
+        rng.integers(0, 16, voices).tolist(),
+        rng.integers(33, 58, voices).tolist(),
+        rng.uniform(0.2, 1, voices).tolist(),
+        rng.uniform(-1, 1, voices).tolist(),
+    )
+
+
+def run_per_source(sounds, voices: int) -> tuple:
+    handler = AudioOutputHandler()
+    start = time.perf_counter()
+    for ins, key, volume, panning in random_notes(voices):
+        handler.push_sound(sounds[ins], key_to_pitch(key - 45), volume, panning, ins)
+    for _ in range(round(1 / UPDATE_INTERVAL)):
+        handler.update()
+    elapsed = time.perf_counter() - start
+    return elapsed, voices - handler.stolen_count - handler.dropped_count
+
+
+def run_software_mixer(cache: SampleCache, voices: int) -> tuple:
+    mixer = SoftwareMixerOutput(SAMPLE_RATE)
+    start = time.perf_counter()
+    for ins, key, volume, panning in random_notes(voices):
+        mixer.push_sound(cache.get(ins, key), volume, panning)
+    audible = mixer.voice_count
+    for _ in range(SAMPLE_RATE // mixer.block_size):
+        mixer.mix_block()
+    elapsed = time.perf_counter() - start
+    return elapsed, audible
+
+
+def main() -> None:
+    sounds = load_default_sounds()
+    cache = SampleCache(sounds, SAMPLE_RATE)
+    # Resample every sound up front, so only mixing is measured
+    for ins, key, _, _ in random_notes(max(VOICES)):
+        cache.get(ins, key)
+
+    print(f"{'voices':>7} {'mode':>15} {'CPU per second':>15} {'audible':>8}")
+    for voices in VOICES:
+        for mode, run in (
+            ("per-source", lambda: run_per_source(sounds, voices)),
+            ("software mixer", lambda: run_software_mixer(cache, voices)),
+        ):
+            elapsed, audible = run()
+            print(f"{voices:>7} {mode:>15} {elapsed * 1000:>13.1f}ms {audible:>8}")
+            sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Measure the per-frame cost of `AudioOutputHandler.update` with many active sounds,
+against the previous implementation that scanned every active sound on each frame.
+
+Requires an OpenAL output device. Run from `src/main/python` with:
+
+    python -m benchmarks.audio_update [frames]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List, Type
+
+from openal.audio import SoundData
+
+from nbs.core.audio import AudioOutputHandler, SoundInstance
+
+FRAME_INTERVAL = 0.016
+VOICES = (16, 64, 256)
+
+
+class ListScanHandler(AudioOutputHandler):
+    """The previous implementation, which checks every active sound on each update."""
+
+    def __init__(self):
+        super().__init__()
+        self.sound_list: List[SoundInstance] = []
+
+    def push_sound(
+        self, samples: SoundData, pitch: float, volume: float, panning: float
+    ) -> None:
+        super().push_sound(samples, pitch, volume, panning)
+        _, _, sound = self.active_sounds.pop()
+        sound.deadline = datetime.now() + timedelta(
+            seconds=sound.end_time - time.monotonic()
+        )
+        self.sound_list.insert(0, sound)
+
+    def update(self):
+        for sound in self.sound_list:
+            if datetime.now() >= sound.deadline:
+                self.sound_list.remove(sound)
+                self._stop_sound(sound)
+        self.sink.update()
+
+
+def silence(seconds: float, sample_rate: int = 44100) -> SoundData:
+    buf = bytes(int(seconds * sample_rate) * 2)
+    return SoundData(buf, 1, 16, len(buf), sample_rate)
+
+
+def run(handler_class: Type[AudioOutputHandler], voices: int, frames: int) -> float:
+    """
+    Keep `voices` sounds playing, with about one in every eight finishing on each
+    frame, and return the mean time spent in `update()` per frame.
+    """
+    handler = handler_class()
+    lifetime = FRAME_INTERVAL * max(voices // 8, 1)
+    sounds = [silence(lifetime * (i + 1) / voices) for i in range(voices)]
+    for sound in sounds:
+        handler.push_sound(sound, 1.0, 0.0, 0.0)
+
+    free = handler.source_pool.free_sources
+    idle = len(free)
+    spent = 0.0
+    for _ in range(frames):
+        time.sleep(FRAME_INTERVAL)
+        start = time.perf_counter()
+        handler.update()
+        spent += time.perf_counter() - start
+        # Replace the sounds that finished, as a song that keeps playing would
+        while len(free) > idle:
+            handler.push_sound(sounds[-1], 1.0, 0.0, 0.0)
+    return spent / frames
+
+
+def main() -> None:
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'voices':>7} {'list scan':>11} {'heap':>11} {'speedup':>8}")
+    for voices in VOICES:
+        scan = run(ListScanHandler, voices, frames)
+        heap = run(AudioOutputHandler, voices, frames)
+        print(
+            f"{voices:>7} {scan * 1e6:>9.1f}us {heap * 1e6:>9.1f}us"
+            f" {scan / heap:>7.1f}x"
+        )
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
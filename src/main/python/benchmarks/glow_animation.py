@@ -0,0 +1,143 @@
+"""
+Measure the cost of the glow played note blocks are animated with, comparing:
+
+- the previous approach, where every `NoteBlock` owned a `QPropertyAnimation` on its
+  opacity, restarted each time the block was played;
+- `GlowAnimator`, which keeps the glowing blocks and their start times in arrays and
+  updates them all from a single timer.
+
+Memory per block is the growth of the process's resident set size while creating
+blocks (Linux only). Frame times are measured while playing a song where every tick
+is a chord, at 60 frames per second. The update time covers playing the ticks
+reached and updating the glows, and is measured with the view hidden, while the
+frame time adds painting the view. Each approach is measured in its own process. Run from `src/main/python` with:
+
+    python -m benchmarks.glow_animation [chord size]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PyQt5 import QtCore, QtWidgets
+
+from nbs.core.data import Layer, Note
+
+BLOCKS = 20_000
+TICKS = 200
+TEMPO = 10
+FRAME_SECS = 1 / 60
+PLAYBACK_SECS = 3
+
+
+def resident_memory() -> int:
+    """Return the resident set size of the process, in bytes."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def add_legacy_animation(block) -> None:
+    block.legacyAnimation = QtCore.QPropertyAnimation(block, b"opacity")
+    block.legacyAnimation.setDuration(1000)
+
+
+def start_legacy(blocks) -> None:
+    for block in blocks:
+        animation = block.legacyAnimation
+        if animation.state() == QtCore.QAbstractAnimation.State.Running:
+            animation.stop()
+        animation.setStartValue(1.0)
+        animation.setEndValue(0.6)
+        animation.start(QtCore.QAbstractAnimation.DeletionPolicy.KeepWhenStopped)
+
+
+def memory_per_block(legacy: bool) -> float:
+    from nbs.ui.workspace.note_blocks import NoteBlock
+
+    note = Note(tick=0, layer=0, instrument=0, key=45)
+    memory = resident_memory()
+    blocks = []
+    for _ in range(BLOCKS):
+        block = NoteBlock(note)
+        if legacy:
+            add_legacy_animation(block)
+        blocks.append(block)
+    return (resident_memory() - memory) / BLOCKS
+
+
+def frame_times(chord: int, legacy: bool, painted: bool) -> np.ndarray:
+    from nbs.ui.workspace.note_blocks import NoteBlockArea
+
+    area = NoteBlockArea([Layer() for _ in range(chord)], QtWidgets.QMenu())
+    area.loadNoteData(
+        [
+            Note(tick=tick, layer=layer, instrument=layer % 16, key=45)
+            for tick in range(TICKS)
+            for layer in range(chord)
+        ]
+    )
+    if legacy:
+        for block in area.grid:
+            add_legacy_animation(block)
+        area.glowAnimator.start = start_legacy
+    view = area.view
+    if painted:
+        view.resize(1280, 720)
+        view.show()
+    QtWidgets.QApplication.processEvents()
+
+    times = []
+    start = time.perf_counter()
+    tick = 0
+    for frame in range(round(PLAYBACK_SECS / FRAME_SECS)):
+        # Wait for the next frame, so the animation timers are due as in playback
+        deadline = start + frame * FRAME_SECS
+        time.sleep(max(0, deadline - time.perf_counter()))
+        frameStart = time.perf_counter()
+        nextTick = int((frameStart - start) * TEMPO) + 1
+        if nextTick > tick:
+            area.playTicks(tick, nextTick)
+            tick = nextTick
+        QtWidgets.QApplication.processEvents()
+        if painted:
+            view.viewport().grab()
+        times.append(time.perf_counter() - frameStart)
+    return np.array(times)
+
+
+def run(chord: int, legacy: bool) -> None:
+    memory = memory_per_block(legacy)
+    updateTimes = frame_times(chord, legacy, painted=False)
+    frameTimes = frame_times(chord, legacy, painted=True)
+    name = "previous" if legacy else "animator"
+    print(
+        f"{name:>9} {memory:>9.0f}B {np.mean(updateTimes) * 1000:>8.2f}ms"
+        f" {np.max(updateTimes) * 1000:>8.2f}ms {np.mean(frameTimes) * 1000:>8.2f}ms",
+        flush=True,
+    )
+
+
+def main() -> None:
+    chord = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    if len(sys.argv) > 2:
+        app = QtWidgets.QApplication(sys.argv)
+        run(chord, sys.argv[2] == "previous")
+        # Tearing down a scene whose view was shown may crash on exit, and there's
+        # nothing left to clean up in this process anyway
+        os._exit(0)
+    print(f"{chord}-note chords, {TEMPO} ticks per second")
+    print(
+        f"{'':>9} {'per block':>10} {'update':>10} {'max update':>10} {'frame':>10}",
+        flush=True,
+    )
+    for name in ("previous", "animator"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.glow_animation", str(chord), name],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
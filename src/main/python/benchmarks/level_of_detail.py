@@ -0,0 +1,115 @@
+"""
+Measure the frame rate while scrolling through a ten-minute song at several zoom
+levels, comparing:
+
+- the previous approach, where blocks were always drawn from pixmaps with their
+  labels, and items were cached by Qt in item coordinates;
+- detail levels, where blocks too small to read are drawn as flat colors, all at
+  once without items, and blocks larger than the atlas are rendered at the screen's
+  resolution.
+
+Both `RenderMode`s are measured, each approach in its own process. Frame rate is
+measured by scrolling the view one screen at a time and painting its viewport. Run
+from `src/main/python` with:
+
+    python -m benchmarks.level_of_detail [layers]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from PyQt5 import QtWidgets
+
+from nbs.core.data import Layer, Note
+
+# Ten minutes at 10 ticks per second
+TICKS = 6000
+SCALES = (0.25, 1, 3)
+FRAMES = 50
+
+
+def make_notes(layers: int):
+    return [
+        Note(tick=tick, layer=layer, instrument=(tick + layer) % 16, key=33 + tick % 25)
+        for tick in range(TICKS)
+        for layer in range(layers)
+    ]
+
+
+def run(layers: int, mode_name: str, approach: str) -> None:
+    # Imported here, as the module needs a QApplication to exist
+    from nbs.ui.workspace import note_blocks
+    from nbs.ui.workspace.note_atlas import NOTE_BLOCK_ATLAS, DetailLevel
+    from nbs.ui.workspace.note_blocks import NoteBlockArea, RenderMode
+
+    if approach == "previous":
+        note_blocks.getDetailLevel = lambda blockSize: DetailLevel.PIXMAP
+
+    area = NoteBlockArea(
+        [Layer() for _ in range(layers)],
+        QtWidgets.QMenu(),
+        None,
+        RenderMode[mode_name],
+    )
+    area.loadNoteData(make_notes(layers))
+    if approach == "previous":
+        for block in area.items():
+            block.setCacheMode(QtWidgets.QGraphicsItem.ItemCoordinateCache)
+    view = area.view
+    view.resize(1280, 720)
+    view.show()
+    QtWidgets.QApplication.processEvents()
+
+    rates = []
+    for scale in SCALES:
+        view.setScale(scale)
+        NOTE_BLOCK_ATLAS.get(scale * note_blocks.BLOCK_SIZE, wait=True)
+        scrollBar = view.horizontalScrollBar()
+        width = view.viewport().width()
+        # The first frame fills the caches
+        view.viewport().grab()
+        start = time.perf_counter()
+        for frame in range(FRAMES):
+            scrollBar.setValue(frame * width % scrollBar.maximum())
+            view.viewport().grab()
+        rates.append(FRAMES / (time.perf_counter() - start))
+
+    print(
+        f"{mode_name.lower():>8} {approach:>9}"
+        + "".join(f" {rate:>9.1f}" for rate in rates),
+        flush=True,
+    )
+
+
+def main() -> None:
+    layers = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    if len(sys.argv) > 2:
+        app = QtWidgets.QApplication(sys.argv)
+        run(layers, sys.argv[2], sys.argv[3])
+        # Tearing down a scene whose view was shown may crash on exit, and there's
+        # nothing left to clean up in this process anyway
+        os._exit(0)
+    print(f"{TICKS} ticks, {layers} layers, frames per second at each scale")
+    print(
+        f"{'mode':>8} {'':>9}" + "".join(f" {scale:>9}" for scale in SCALES),
+        flush=True,
+    )
+    for mode_name in ("ITEMS", "VIRTUAL"):
+        for approach in ("previous", "detail"):
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.level_of_detail",
+                    str(layers),
+                    mode_name,
+                    approach,
+                ],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
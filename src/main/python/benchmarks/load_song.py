@@ -0,0 +1,76 @@
+"""
+Compare the time it takes to open a large song with `SongReader` against
+reading it with `pynbs` and converting the result.
+
+Run from `src/main/python` with:
+
+    python -m benchmarks.load_song [notes]
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pynbs
+
+from nbs.core.file import convert_file_to_song, load_song
+
+
+def write_random_song(path: Path, size: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    file = pynbs.new_file(song_name="Benchmark")
+    ticks = np.sort(rng.integers(0, size // 8 + 1, size))
+    layers = rng.permutation(size) % 256
+    file.notes = [
+        pynbs.Note(
+            tick=int(tick),
+            layer=int(layer),
+            instrument=int(rng.integers(0, 16)),
+            key=int(rng.integers(33, 58)),
+            velocity=int(rng.integers(0, 101)),
+            panning=int(rng.integers(-100, 101)),
+            pitch=int(rng.integers(-1200, 1201)),
+        )
+        for tick, layer in zip(ticks, layers)
+    ]
+    # Drop notes sharing the same tick and layer
+    unique = {(note.tick, note.layer): note for note in file.notes}
+    file.notes = sorted(unique.values(), key=lambda n: (n.tick, n.layer))
+    file.layers = [pynbs.Layer(id=i) for i in range(256)]
+    file.save(path)
+
+
+def measure(function, path: Path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    song = function(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return song, elapsed, peak
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, "benchmark.nbs")
+        write_random_song(path, size)
+        print(f"{path.stat().st_size / 2**20:.1f} MB file")
+
+        reference, pynbs_time, pynbs_peak = measure(
+            lambda p: convert_file_to_song(pynbs.read(p)), path
+        )
+        song, native_time, native_peak = measure(load_song, path)
+        assert song.notes == reference.notes
+
+        print(f"{len(song.notes)} notes")
+        print(f"pynbs:  {pynbs_time:7.3f}s, peak {pynbs_peak / 2**20:7.1f} MB")
+        print(f"native: {native_time:7.3f}s, peak {native_peak / 2**20:7.1f} MB")
+        print(f"speedup: {pynbs_time / native_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure the cost of keeping the minimap of a ten-minute song up to date:
+
+- binning every note again, as when a song is loaded;
+- updating the columns of the ticks edited, as after every batch of edits, for a
+  single note and for a chord pasted over a hundred ticks;
+- painting the minimap, which is all that's left to do while scrolling.
+
+Notes are edited through `NoteBlockArea`, and the time taken by the edits themselves
+isn't counted. Run from `src/main/python` with:
+
+    python -m benchmarks.minimap [layers]
+"""
+
+import os
+import sys
+import time
+
+from PyQt5 import QtWidgets
+
+from nbs.core.data import Layer, Note
+
+# Ten minutes at 10 ticks per second
+TICKS = 6000
+ROUNDS = 200
+
+
+def make_notes(layers: int):
+    return [
+        Note(tick=tick, layer=layer, instrument=0, key=45)
+        for tick in range(TICKS)
+        for layer in range(layers)
+        if (tick + layer) % 3
+    ]
+
+
+def timed(function, *args) -> float:
+    """Return the mean time taken by `function`, in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        function(*args)
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+
+def run(layers: int) -> None:
+    # Imported here, as the modules need a QApplication to exist
+    from nbs.ui.workspace.minimap import Minimap
+    from nbs.ui.workspace.note_blocks import NoteBlockArea, RenderMode
+
+    area = NoteBlockArea(
+        [Layer() for _ in range(layers)],
+        QtWidgets.QMenu(),
+        renderMode=RenderMode.VIRTUAL,
+    )
+    notes = make_notes(layers)
+    area.loadNoteData(notes)
+    minimap = Minimap(area)
+    minimap.resize(1280, minimap.height())
+    print(f"{len(notes)} notes, {TICKS} ticks, {layers} layers")
+
+    print(f"{'rebuild':>16} {timed(minimap.rebuild):>8.2f}ms")
+    for ticks in (1, 100):
+        # Into cells left free by `make_notes`, so the image doesn't have to grow
+        for tick in range(TICKS // 2, TICKS // 2 + ticks):
+            area.addBlockManual(tick, -tick % 3, 45, 0)
+        editedTicks = sorted(area.editedTicks)
+        area.editedTicks.clear()
+        label = f"edit {ticks} ticks"
+        print(f"{label:>16} {timed(minimap.updateTicks, editedTicks):>8.2f}ms")
+    print(f"{'paint':>16} {timed(minimap.grab):>8.2f}ms")
+
+
+def main() -> None:
+    layers = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    app = QtWidgets.QApplication(sys.argv)
+    run(layers)
+    # Tearing down the scene may crash on exit, and there's nothing left to clean up
+    # in this process anyway
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Measure the cost of painting note blocks, comparing:
+
+- the previous approach, where each paint looked up the block's pixmap in a
+  `QPixmapCache` under a formatted string key, rendering it on a miss;
+- the note block atlas, where each paint is a blit from a cell of a single pixmap,
+  addressed by an integer index.
+
+Blocks are painted with every look in turn, which is more than the default pixmap
+cache limit holds, so the previous approach renders some of them again every round,
+then with a hundred looks only, which always hit the cache.
+The time taken to render each atlas in the background is also shown. Run from
+`src/main/python` with:
+
+    python -m benchmarks.note_atlas [rounds]
+"""
+
+import os
+import sys
+import time
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+# The UI modules need a QApplication to exist before they're imported
+BLOCK_SIZE = 32
+
+LOOKS = [
+    (instrument, key, isOutOfRange)
+    for instrument in range(16)
+    for isOutOfRange in (False, True)
+    for key in range(88)
+]
+
+
+def paint_previous(painter: QtGui.QPainter, cache: QtGui.QPixmapCache, looks) -> None:
+    from nbs.ui.workspace.note_blocks import NoteBlock
+
+    for instrument, key, isOutOfRange in looks:
+        cacheKey = f"note_{instrument}_{key}_{int(isOutOfRange)}"
+        pixmap = cache.find(cacheKey)
+        if pixmap is None:
+            pixmap = NoteBlock.renderPixmap(instrument, key, isOutOfRange)
+            cache.insert(cacheKey, pixmap)
+        painter.drawPixmap(0, 0, pixmap)
+
+
+def paint_atlas(painter: QtGui.QPainter, atlas, looks) -> None:
+    from nbs.ui.workspace.note_atlas import atlasIndex
+
+    target = QtCore.QRectF(0, 0, BLOCK_SIZE, BLOCK_SIZE)
+    for instrument, key, isOutOfRange in looks:
+        index = atlasIndex(instrument, key, isOutOfRange)
+        painter.drawPixmap(target, atlas.pixmap, atlas.rects[index])
+
+
+def run(rounds: int) -> None:
+    from nbs.ui.workspace.note_atlas import ATLAS_BLOCK_SIZES, NoteBlockAtlas
+
+    atlases = NoteBlockAtlas()
+    for level in ATLAS_BLOCK_SIZES:
+        start = time.perf_counter()
+        atlas = atlases.get(level, wait=True)
+        print(f"{level}px atlas built in {time.perf_counter() - start:.2f}s")
+
+    atlas = atlases.get(BLOCK_SIZE)
+    cache = QtGui.QPixmapCache()
+    cache.clear()
+    pixmap = QtGui.QPixmap(BLOCK_SIZE, BLOCK_SIZE)
+    painter = QtGui.QPainter(pixmap)
+    print(f"Time per block painted, over {rounds} rounds")
+    print(f"{'looks':>6} {'previous':>10} {'atlas':>10}")
+    for looks in (LOOKS, LOOKS[:100]):
+        timings = []
+        for paint, arg in ((paint_previous, cache), (paint_atlas, atlas)):
+            # The first round fills the cache
+            paint(painter, arg, looks)
+            start = time.perf_counter()
+            for _ in range(rounds):
+                paint(painter, arg, looks)
+            timings.append((time.perf_counter() - start) / (rounds * len(looks)))
+        print(f"{len(looks):>6} {timings[0] * 1e6:>8.2f}µs {timings[1] * 1e6:>8.2f}µs")
+    painter.end()
+
+
+def main() -> None:
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    app = QtWidgets.QApplication(sys.argv)
+    run(rounds)
+    # Pixmaps left in the global caches may crash on exit, once the application is
+    # gone, and there's nothing left to clean up anyway
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
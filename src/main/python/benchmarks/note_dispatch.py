@@ -0,0 +1,101 @@
+"""
+Measure the cost of sending a played tick to `AudioEngine`, for a chord of many
+notes, comparing:
+
+- dispatching each note on its own, as when the scene emitted one payload per note,
+  computing its parameters and pushing it to the output one at a time;
+- `note_batch()` and `AudioEngine.playNotes`, which compute the parameters of all
+  notes at once and push them to the output together.
+
+Both output modes are measured. Each chord is dispatched with the output emptied
+beforehand, so only dispatching is timed. Requires an OpenAL output device. Run
+from `src/main/python` with:
+
+    python -m benchmarks.note_dispatch [notes per chord]
+"""
+
+import sys
+import time
+
+import numpy as np
+from benchmarks.render import SOUNDS_DIR
+from PyQt5 import QtCore
+
+from nbs.core.audio import AudioEngine, OutputMode
+from nbs.core.data import default_instruments, note_batch
+
+CHORDS = 50
+
+
+def make_engine(mode: OutputMode) -> AudioEngine:
+    engine = AudioEngine(output_mode=mode)
+    engine.setInstrumentSounds(
+        [
+            (str(id), str(SOUNDS_DIR / ins.sound_path))
+            for id, ins in enumerate(default_instruments)
+        ]
+    )
+    while not all(sound is not None for sound in engine.sounds):
+        QtCore.QCoreApplication.processEvents()
+        time.sleep(0.01)
+    return engine
+
+
+def random_chord(notes: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.integers(0, 16, notes),
+        # Whole keys only, so every resampled sound fits in the sample cache
+        rng.integers(33, 58, notes).astype(float),
+        rng.uniform(0.2, 1, notes),
+        rng.uniform(-1, 1, notes),
+    )
+
+
+def reset(engine: AudioEngine) -> None:
+    if engine.output_mode == OutputMode.SOFTWARE_MIXER:
+        engine.handler.clear_scheduled()
+        engine.handler._pending.clear()
+    else:
+        for _, _, sound in list(engine.handler.active_sounds):
+            if sound.playing:
+                engine.handler._stop_sound(sound)
+
+
+def run(engine: AudioEngine, notes: int, batched: bool) -> float:
+    """Return the average time taken to dispatch a chord, in seconds."""
+    elapsed = 0.0
+    for seed in range(CHORDS):
+        instruments, keys, volumes, pannings = random_chord(notes, seed)
+        reset(engine)
+        start = time.perf_counter()
+        if batched:
+            engine.playNotes(note_batch(instruments, keys, volumes, pannings))
+        else:
+            for note in zip(instruments, keys, volumes, pannings):
+                engine.playNotes(note_batch(*([value] for value in note)))
+        elapsed += time.perf_counter() - start
+    return elapsed / CHORDS
+
+
+def main() -> None:
+    notes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app = QtCore.QCoreApplication(sys.argv)
+    print(f"{notes}-note chords")
+    print(f"{'mode':>15} {'per note':>10} {'batch':>10}")
+    for mode, name in (
+        (OutputMode.PER_SOURCE, "per-source"),
+        (OutputMode.SOFTWARE_MIXER, "software mixer"),
+    ):
+        engine = make_engine(mode)
+        # Warm up the sample cache, so only dispatching is measured
+        run(engine, notes, batched=True)
+        per_note = run(engine, notes, batched=False)
+        batch = run(engine, notes, batched=True)
+        print(f"{name:>15} {per_note * 1000:>8.2f}ms {batch * 1000:>8.2f}ms")
+        engine.stop()
+    del app
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measure loading and scrolling through a large song in each `RenderMode`:
+
+- `ITEMS`, where every note is a `NoteBlock` item, found by the scene for painting;
+- `VIRTUAL`, where notes are drawn from the grid index with the background, and only
+  get an item while selected, hovered or playing.
+
+Load time covers `NoteBlockArea.loadNoteData`, and memory is the growth of the
+process's resident set size while loading (Linux only). Frame rate is measured by
+scrolling the view one screen at a time and painting its viewport. Each mode is
+measured in its own process, so memory freed by the other isn't reused. Run from
+`src/main/python` with:
+
+    python -m benchmarks.note_rendering [song ticks]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from PyQt5 import QtWidgets
+
+from nbs.core.data import Layer, Note
+
+LAYERS = 100
+FRAMES = 100
+
+
+def resident_memory() -> int:
+    """Return the resident set size of the process, in bytes."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def make_notes(ticks: int):
+    return [
+        Note(tick=tick, layer=layer, instrument=(tick + layer) % 16, key=33 + tick % 25)
+        for tick in range(ticks)
+        for layer in range(LAYERS)
+    ]
+
+
+def run(ticks: int, mode_name: str) -> None:
+    # Imported here, as the module needs a QApplication to exist
+    from nbs.ui.workspace.note_blocks import NoteBlockArea, RenderMode
+
+    mode = RenderMode[mode_name]
+    notes = make_notes(ticks)
+    area = NoteBlockArea(
+        [Layer() for _ in range(LAYERS)], QtWidgets.QMenu(), None, mode
+    )
+    view = area.view
+    view.resize(1280, 720)
+    view.show()
+    QtWidgets.QApplication.processEvents()
+
+    memory = resident_memory()
+    start = time.perf_counter()
+    area.loadNoteData(notes)
+    load_time = time.perf_counter() - start
+    memory = resident_memory() - memory
+    QtWidgets.QApplication.processEvents()
+
+    scrollBar = view.horizontalScrollBar()
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        scrollBar.setValue(frame * view.viewport().width() % scrollBar.maximum())
+        view.viewport().grab()
+    fps = FRAMES / (time.perf_counter() - start)
+
+    print(
+        f"{mode_name.lower():>8} {load_time:>9.2f}s {memory / 2**20:>9.0f}MB"
+        f" {fps:>9.1f}",
+        flush=True,
+    )
+
+
+def main() -> None:
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    if len(sys.argv) > 2:
+        app = QtWidgets.QApplication(sys.argv)
+        run(ticks, sys.argv[2])
+        # Tearing down a scene whose view was shown may crash on exit, and there's
+        # nothing left to clean up in this process anyway
+        os._exit(0)
+    print(f"{ticks * LAYERS} notes in the song")
+    print(f"{'mode':>8} {'load':>10} {'memory':>11} {'fps':>9}", flush=True)
+    for mode_name in ("ITEMS", "VIRTUAL"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.note_rendering", str(ticks), mode_name],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
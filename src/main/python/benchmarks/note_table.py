@@ -0,0 +1,102 @@
+"""
+Compare the memory footprint and throughput of `NoteTable` against a plain
+`list[Note]` for songs of increasing size.
+
+Run from `src/main/python` with:
+
+    python -m benchmarks.note_table
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+import numpy as np
+
+from nbs.core.data import Note, NoteTable
+
+SIZES = (10_000, 100_000, 1_000_000)
+
+
+def random_columns(size: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    return {
+        "tick": np.sort(rng.integers(0, size // 4 + 1, size)),
+        "layer": rng.integers(0, 64, size),
+        "instrument": rng.integers(0, 16, size),
+        "key": rng.integers(33, 58, size),
+        "velocity": rng.integers(0, 101, size),
+        "panning": rng.integers(-100, 101, size),
+        "pitch": rng.integers(-1200, 1201, size),
+    }
+
+
+def build_list(columns: dict) -> List[Note]:
+    rows = zip(*(col.tolist() for col in columns.values()))
+    return [Note(*row) for row in rows]
+
+
+def build_table(columns: dict) -> NoteTable:
+    return NoteTable.from_arrays(**columns)
+
+
+def measure_memory(factory: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    obj = factory()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def timeit(function: Callable[[], object], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def range_query_list(notes: List[Note], start: int, stop: int) -> List[Note]:
+    return [note for note in notes if start <= note.tick < stop]
+
+
+def main() -> None:
+    header = f"{'notes':>10} {'impl':>6} {'memory':>10} {'B/note':>7} {'build':>9} {'range':>9} {'scan':>9}"
+    print(header)
+    print("-" * len(header))
+    for size in SIZES:
+        columns = random_columns(size)
+        window = (size // 8, size // 8 + 100)
+
+        notes = build_list(columns)
+        table = build_table(columns)
+
+        results = {
+            "list": (
+                measure_memory(lambda: build_list(columns)),
+                timeit(lambda: build_list(columns), repeat=1),
+                timeit(lambda: range_query_list(notes, *window)),
+                timeit(lambda: sum(note.velocity for note in notes)),
+            ),
+            "table": (
+                measure_memory(lambda: build_table(columns)),
+                timeit(lambda: build_table(columns)),
+                timeit(lambda: table.window(*window)),
+                timeit(lambda: int(table.velocity.sum())),
+            ),
+        }
+        for impl, (memory, build, query, scan) in results.items():
+            print(
+                f"{size:>10} {impl:>6} {memory / 2**20:>8.1f}MB {memory / size:>7.1f}"
+                f" {build * 1000:>7.1f}ms {query * 1000:>7.3f}ms {scan * 1000:>7.2f}ms"
+            )
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
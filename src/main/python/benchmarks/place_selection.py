@@ -0,0 +1,93 @@
+"""
+Measure the time it takes to place (deselect) a selection pasted over a dense song,
+where every selected block lands on an existing one that must be removed, comparing:
+
+- the previous approach, where each selected block asked the scene's BSP tree for
+  its colliding items, and every removal counted all the items in the scene;
+- `NoteBlockArea.deselectAll`, which looks up each selected block's cell in the
+  grid index. Most of the time left is spent in `QGraphicsScene.removeItem`, whose
+  cost grows with the number of items in the scene.
+
+The previous approach is only measured for a 1000-block selection, as it takes
+minutes for the larger ones. Run from `src/main/python` with:
+
+    python -m benchmarks.place_selection [song ticks]
+"""
+
+import sys
+import time
+
+import numpy as np
+from PyQt5 import QtWidgets
+
+from nbs.core.data import Layer, Note
+
+LAYERS = 100
+SELECTION_SIZES = (1_000, 10_000, 50_000, 100_000)
+
+
+def make_area(ticks: int, legacy: bool = False):
+    # Imported here, as the module needs a QApplication to exist
+    from nbs.ui.workspace.note_blocks import NoteBlockArea
+
+    area = NoteBlockArea([Layer() for _ in range(LAYERS)], QtWidgets.QMenu())
+    if legacy:
+        # The scene's index before the grid index was added
+        area.setItemIndexMethod(QtWidgets.QGraphicsScene.ItemIndexMethod.BspTreeIndex)
+        area.setBspTreeDepth(12)
+    area.loadNoteData(
+        [
+            Note(tick=tick, layer=layer, instrument=layer % 16, key=45)
+            for tick in range(ticks)
+            for layer in range(LAYERS)
+        ]
+    )
+    return area
+
+
+def make_selection(ticks: int, size: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    cells = rng.choice(ticks * LAYERS, size, replace=False)
+    return [
+        Note(tick=int(cell // LAYERS), layer=int(cell % LAYERS), instrument=1, key=50)
+        for cell in cells
+    ]
+
+
+def place_legacy(area) -> None:
+    for item in area.selectedItems():
+        for other in item.collidingItems():
+            area._doRemoveBlock(other)
+            area.blockCountChanged.emit(len(area.items()))
+    area.clearSelection()
+    area.updateSceneSize()
+
+
+def main() -> None:
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    app = QtWidgets.QApplication(sys.argv)
+    print(f"{ticks * LAYERS} notes in the song")
+    print(f"{'selected':>9} {'previous':>10} {'grid':>10}")
+    for size in SELECTION_SIZES:
+        size = min(size, ticks * LAYERS)
+        selection = make_selection(ticks, size)
+        timings = []
+        for legacy in (True, False):
+            if legacy and size != SELECTION_SIZES[0]:
+                timings.append("-")
+                continue
+            area = make_area(ticks, legacy)
+            area.loadSelection(selection)
+            start = time.perf_counter()
+            if legacy:
+                place_legacy(area)
+            else:
+                area.deselectAll()
+            timings.append(f"{time.perf_counter() - start:.2f}s")
+            assert len(area.items()) == ticks * LAYERS
+        print(f"{size:>9} {timings[0]:>10} {timings[1]:>10}")
+    del app
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Measure how far from their intended time notes start playing, comparing:
+
+- the previous approach, where a GUI loop (whose iterations take a varying time, as
+  repainting does) plays the notes of a tick when it notices the position reached it;
+- `PlaybackScheduler`, polled by a 16 ms timer as in `AudioEngine`, with notes
+  started by the next update after their onset (per-source output) or at their exact
+  sample, unless the blocks mixed ahead of time already went past it (software mixer
+  output).
+
+Every note's intended time is `start + tick / tempo`. Run from `src/main/python` with:
+
+    python -m benchmarks.playback_jitter [seconds]
+"""
+
+import random
+import sys
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from nbs.core.data import NoteTable
+from nbs.core.scheduler import PlaybackScheduler
+
+TEMPO = 20.0
+UPDATE_INTERVAL = 0.016
+SAMPLE_RATE = 44100
+# How far ahead of the playback position `SoftwareMixerOutput` mixes by default
+MIXER_LATENCY = 4 * 512 / SAMPLE_RATE
+
+
+def busy_wait(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def make_notes(seconds: float) -> NoteTable:
+    ticks = np.arange(int(seconds * TEMPO))
+    return NoteTable.from_arrays(
+        tick=ticks, layer=np.zeros_like(ticks), instrument=ticks % 16, key=ticks % 25
+    )
+
+
+def run_gui_loop(notes: NoteTable, seconds: float) -> Tuple[List[float], int]:
+    """Return the error of each note played, and the number of notes never played."""
+    ticks = set(notes.tick.tolist())
+    errors = []
+    start = time.monotonic()
+    previous = -1
+    while time.monotonic() - start < seconds:
+        busy_wait(random.uniform(0, 0.03))
+        now = time.monotonic()
+        current = int((now - start) * TEMPO)
+        if current != previous and current in ticks:
+            errors.append(now - (start + current / TEMPO))
+        previous = current
+    return errors, len(notes.window(0, previous + 1)) - len(errors)
+
+
+def run_scheduler(notes: NoteTable, seconds: float) -> Tuple[List[float], List[float]]:
+    """
+    Return the error of each note when started by the next update after its onset,
+    and when started at the nearest sample to its onset by the software mixer.
+    """
+    scheduler = PlaybackScheduler()
+    scheduler.set_notes(notes, [])
+    scheduler.play(0)
+    start = scheduler.time_at(0)
+    pending: List[float] = []
+    per_source = []
+    mixer = []
+    while time.monotonic() - start < seconds:
+        busy_wait(random.uniform(0, 0.002))
+        time.sleep(UPDATE_INTERVAL)
+        now = time.monotonic()
+        for onset in scheduler.poll().times.tolist():
+            # The tempo never changes, so the scheduled onset should be exact
+            intended = start + round((onset - start) * TEMPO) / TEMPO
+            mixed = max(onset, now + MIXER_LATENCY)
+            mixer.append(round(mixed * SAMPLE_RATE) / SAMPLE_RATE - intended)
+            pending.append(onset)
+        due = [onset for onset in pending if onset <= now]
+        pending = [onset for onset in pending if onset > now]
+        per_source.extend(
+            now - (start + round((o - start) * TEMPO) / TEMPO) for o in due
+        )
+    return per_source, mixer
+
+
+def summary(name: str, errors: List[float], lost: int = 0) -> None:
+    errors = np.abs(errors) * 1000
+    print(
+        f"{name:>24} {errors.mean():>8.2f} {np.percentile(errors, 99):>8.2f}"
+        f" {errors.max():>8.2f} {lost:>6}"
+    )
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    notes = make_notes(seconds + 1)
+    print(f"{'error (ms)':>24} {'mean':>8} {'p99':>8} {'max':>8} {'lost':>6}")
+    gui, lost = run_gui_loop(notes, seconds)
+    summary("GUI loop", gui, lost)
+    per_source, mixer = run_scheduler(notes, seconds)
+    summary("scheduler (per-source)", per_source)
+    summary("scheduler (mixer)", mixer)
+
+
+if __name__ == "__main__":
+    main()
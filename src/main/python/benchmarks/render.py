@@ -0,0 +1,70 @@
+"""
+Measure how much faster than real time `render_song` mixes a long, dense song
+using the default instrument sounds, and how rendering scales with the number
+of worker processes.
+
+Run from `src/main/python` with:
+
+    python -m benchmarks.render [minutes] [notes per second]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from nbs.core.audio import load_sound, render_song
+from nbs.core.data import Layer, NoteTable, Song, SongHeader, default_instruments
+
+SOUNDS_DIR = Path(__file__).parents[2] / "resources" / "base" / "sounds"
+
+
+def random_song(minutes: float, notes_per_second: float, seed: int = 0) -> Song:
+    rng = np.random.default_rng(seed)
+    tempo = 10.0
+    size = int(minutes * 60 * notes_per_second)
+    length = int(minutes * 60 * tempo)
+    notes = NoteTable.from_arrays(
+        tick=rng.integers(0, length, size),
+        layer=rng.integers(0, 32, size),
+        instrument=rng.integers(0, 16, size),
+        key=rng.integers(33, 58, size),
+        velocity=rng.integers(50, 101, size),
+        panning=rng.integers(-100, 101, size),
+    )
+    layers = [Layer() for _ in range(32)]
+    return Song(SongHeader(tempo=tempo), notes, layers, [])
+
+
+def load_default_sounds():
+    return [load_sound(SOUNDS_DIR / ins.sound_path) for ins in default_instruments]
+
+
+def main() -> None:
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    density = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    song = random_song(minutes, density)
+    sounds = load_default_sounds()
+    duration = minutes * 60
+    print(f"{len(song.notes)} notes, {duration:.0f}s of audio")
+
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, *(n for n in (2, 4, 8, 16) if n <= cores), cores})
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in worker_counts:
+            start = time.perf_counter()
+            render_song(song, sounds, Path(tmp, "render.wav"), workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(
+                f"{workers:>2} worker(s): {elapsed:6.2f}s"
+                f" ({duration / elapsed:4.0f}x real time, {baseline / elapsed:.2f}x speedup)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -100,6 +100,8 @@ class InstrumentInstance:
         self.blockCount = 0
         self.loaded = False
         self.absSoundPath: Optional[Path] = None
+        # Identifies the instrument's sound in the audio engine, regardless of its index
+        self.uuid = uuid4()
 
     @property
     def isDefault(self) -> bool:
@@ -138,8 +140,6 @@ class InstrumentController(QtCore.QObject):
     instrumentListUpdated = QtCore.pyqtSignal(list)
     currentInstrumentChanged = QtCore.pyqtSignal(int)
 
-    instrumentSoundLoadRequested = QtCore.pyqtSignal(str)
-
     def __init__(
         self, instruments: Sequence[Instrument], parent: Optional[QtCore.QObject] = None
     ) -> None:
@@ -190,7 +190,6 @@ class InstrumentController(QtCore.QObject):
         Adds the instrument `ins` to the instrument list, and emits the appropriate signals.
         """
         instrumentInstance = self._loadInstrument(ins)
-        self.instrumentSoundLoadRequested.emit(str(instrumentInstance.absSoundPath))
         self.instrumentAdded.emit(instrumentInstance)
         self.instrumentListUpdated.emit(self.instruments)
 
@@ -268,8 +267,8 @@ class InstrumentController(QtCore.QObject):
     def setInstrumentSound(self, id: int, sound: str) -> None:
         ins = self.instruments[id]
         ins.sound_path = copy_sound_file(sound)
+        ins.absSoundPath = ins.sound_path
         self.instrumentSoundChanged.emit(id, sound)
-        self.instrumentSoundLoadRequested.emit(str(ins.sound_path))
         self.instrumentChanged.emit(id, self.instruments[id])
         self.instrumentListUpdated.emit(self.instruments)
 
@@ -1,43 +1,68 @@
 import time
+from typing import Callable
 
 from PyQt5 import QtCore
 
-TPS = 60
-MSPT = 1000 / TPS
+from nbs.core.clock import PlaybackClock
 
 
 class PlaybackController(QtCore.QObject):
+    """
+    Keep track of the playback state on the GUI thread.
+
+    While playing, the position isn't polled here: the audio engine, which plays the
+    notes from its own thread, reports it at the display's refresh rate through
+    `updatePlaybackPosition`. The controller's clock is only used to answer queries
+    about the current position, and to detect updates made stale by a seek.
+    """
+
     tempoChanged = QtCore.pyqtSignal(float)
     playbackPositionChanged = QtCore.pyqtSignal(float)
     songLengthChanged = QtCore.pyqtSignal(int)
-
-    def __init__(self, parent: QtCore.QObject = None):
+    playbackStarted = QtCore.pyqtSignal(float)
+    playbackPaused = QtCore.pyqtSignal()
+    playbackSought = QtCore.pyqtSignal(float)
+
+    def __init__(
+        self,
+        parent: QtCore.QObject = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
         super().__init__(parent)
-        self.tempo = 10.00
-        self.currentTick = 0
-        self.lastTickTimestamp = None
+        self.clock = PlaybackClock(clock)
         self.callback = lambda currentTick: None
+        # Position updates further than this (in seconds) from the controller's own
+        # clock were sent before a seek or tempo change, and are ignored
+        self.maxPositionError = 0.25
 
-        self.timer = QtCore.QTimer()
-        self.timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
-        # An interval of 0 means that the timer will fire as often as possible.
-        # See: https://doc.qt.io/qt-5/qtimer.html#interval-prop
-        self.timer.setInterval(0)
-        self.timer.timeout.connect(self.tickPlayback)
+    @property
+    def isPlaying(self) -> bool:
+        return self.clock.running
+
+    @property
+    def tempo(self) -> float:
+        return self.clock.tempo
+
+    @property
+    def currentTick(self) -> float:
+        return self.clock.position()
 
     @QtCore.pyqtSlot()
     def play(self):
-        self.lastTickTimestamp = None
-        self.timer.start()
+        self.clock.start()
+        self.playbackStarted.emit(self.currentTick)
 
     @QtCore.pyqtSlot()
     def pause(self):
-        self.timer.stop()
+        self.clock.pause()
+        self.playbackPaused.emit()
 
     @QtCore.pyqtSlot()
     def stop(self):
-        self.timer.stop()
-        self.currentTick = 0
+        self.clock.pause()
+        self.playbackPaused.emit()
+        self.clock.seek(0)
+        self.playbackSought.emit(self.currentTick)
         self.playbackPositionChanged.emit(self.currentTick)
 
     @QtCore.pyqtSlot(bool)
@@ -49,30 +74,24 @@ class PlaybackController(QtCore.QObject):
 
     @QtCore.pyqtSlot(float)
     def setPlaybackPosition(self, tick: float):
-        self.currentTick = max(0, tick)
+        self.clock.seek(max(0, tick))
+        self.playbackSought.emit(self.currentTick)
         self.playbackPositionChanged.emit(self.currentTick)
         self.callback(self.currentTick)
 
-    @QtCore.pyqtSlot()
-    def tickPlayback(self):
-        offset = self.tempo / TPS
-        currentTimeMs = time.time_ns() / 10**6
-
-        # Lag compensation
-        if self.lastTickTimestamp is not None:
-            timeDelta = currentTimeMs - self.lastTickTimestamp
-            tickCompensationFactor = timeDelta / MSPT
-            offset *= tickCompensationFactor
-
-        self.lastTickTimestamp = currentTimeMs
-
-        self.currentTick += offset
-        self.playbackPositionChanged.emit(self.currentTick)
-        self.callback(self.currentTick)
+    @QtCore.pyqtSlot(float)
+    def updatePlaybackPosition(self, tick: float) -> None:
+        """Report a playback position sent by the audio engine."""
+        if not self.isPlaying:
+            return
+        if abs(tick - self.currentTick) > self.maxPositionError * self.tempo:
+            return
+        self.playbackPositionChanged.emit(tick)
+        self.callback(tick)
 
     @QtCore.pyqtSlot(float)
     def setTempo(self, tempo: float):
-        self.tempo = tempo
+        self.clock.set_tempo(tempo)
         self.tempoChanged.emit(tempo)
 
     @QtCore.pyqtSlot(int)
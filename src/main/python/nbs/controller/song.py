@@ -5,11 +5,10 @@ from PyQt5 import QtCore
 from nbs.controller.instrument import InstrumentController
 from nbs.controller.layer import LayerController
 from nbs.controller.playback import PlaybackController
-from nbs.core.data import Song, SongHeader
+from nbs.core.data import NoteTable, Song, SongHeader
 
 
 class SongController(QtCore.QObject):
-
     """
     Object that manages the song data. Delegates updates made to
     the song to the appropriate controller objects. This object is
@@ -30,7 +29,7 @@ class SongController(QtCore.QObject):
         self.playbackController = playbackController
         self.song = Song(
             header=SongHeader(),
-            notes=[],
+            notes=NoteTable(),
             layers=layerController.layers,
             instruments=instrumentController.instruments,
         )
@@ -1,21 +1,189 @@
-from datetime import datetime, timedelta
-from typing import List, Optional, Sequence, Tuple
+import hashlib
+import heapq
+import itertools
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import (
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
+import numpy as np
 import soundfile as sf
 from openal.audio import SoundData, SoundSink, SoundSource
 from PyQt5 import QtCore
 
+from nbs.core.data import Layer, NoteTable, Song, note_parameters
+from nbs.core.scheduler import PlaybackScheduler
 from nbs.utils.file import PathLike
 
+logger = logging.getLogger(__name__)
+
 
 def key_to_pitch(key: float) -> float:
     return 2 ** (key / 12)
 
 
+def _decode_cached(path: PathLike, cache_dir: PathLike) -> Tuple[np.ndarray, int]:
+    """
+    Return the samples of the sound file at `path` from the decoded PCM saved in
+    `cache_dir`, decoding and saving them first if they aren't there. Entries are
+    keyed by a hash of the file's contents, so edited files are decoded again.
+    """
+    digest = hashlib.sha1(Path(path).read_bytes()).hexdigest()
+    # The sample rate is part of the file name, since reading it from the sound file
+    # takes about half as long as decoding it
+    for cache_path in Path(cache_dir).glob(f"{digest}-*.npy"):
+        try:
+            return np.load(cache_path), int(cache_path.stem.split("-")[1])
+        except (OSError, ValueError):
+            break
+    samples, samplerate = sf.read(path, dtype="int16", always_2d=True)
+    cache_path = Path(cache_dir, f"{digest}-{samplerate}.npy")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first, so concurrent loads never see a partial entry
+        with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as file:
+            np.save(file, samples)
+        os.replace(file.name, cache_path)
+    except OSError as e:
+        logger.warning("Couldn't cache decoded sound %s: %s", path, e)
+    return samples, samplerate
+
+
+def load_sound(path: PathLike, cache_dir: Optional[PathLike] = None) -> SoundData:
+    """
+    Decode the sound file at `path` into 16-bit PCM `SoundData`. If `cache_dir` is
+    given, the decoded samples are saved there, and later loads of the same file
+    read them back instead of decoding it again.
+    """
+    if cache_dir is None:
+        samples, samplerate = sf.read(path, dtype="int16", always_2d=True)
+    else:
+        samples, samplerate = _decode_cached(path, cache_dir)
+    buf = samples.tobytes("C")
+    channels = samples.shape[1]
+    bitrate = samples.dtype.itemsize * 8
+    return SoundData(buf, channels, bitrate, len(buf), samplerate)
+
+
+class _RegistryEntry:
+    __slots__ = ("sound", "refs")
+
+    def __init__(self) -> None:
+        self.sound: Optional[SoundData] = None
+        self.refs = 0
+
+
+class SoundRegistry:
+    """
+    The sounds of the instruments, keyed by a stable instrument ID (e.g. a UUID).
+
+    Instruments using the same sound file share a single decoded copy, which is kept
+    as long as at least one of them uses it. Lookups, replacements and removals take
+    constant time. `nbytes` is the total size of the decoded sounds held.
+    """
+
+    def __init__(self) -> None:
+        self.nbytes = 0
+        self._instruments: Dict[str, str] = {}
+        self._files: Dict[str, _RegistryEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._instruments)
+
+    def __contains__(self, id: str) -> bool:
+        return id in self._instruments
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._instruments)
+
+    @property
+    def file_count(self) -> int:
+        return len(self._files)
+
+    def assign(self, id: str, path: str) -> bool:
+        """
+        Use the sound file at `path` for the instrument `id`. Return whether the file
+        must be loaded, i.e. no other instrument uses it.
+        """
+        previous = self._instruments.get(id)
+        if previous == path:
+            return False
+        if previous is not None:
+            self._release(previous)
+        self._instruments[id] = path
+        entry = self._files.get(path)
+        is_new = entry is None
+        if is_new:
+            entry = self._files[path] = _RegistryEntry()
+        entry.refs += 1
+        return is_new
+
+    def remove(self, id: str) -> None:
+        self._release(self._instruments.pop(id))
+
+    def _release(self, path: str) -> None:
+        entry = self._files[path]
+        entry.refs -= 1
+        if entry.refs == 0:
+            del self._files[path]
+            if entry.sound is not None:
+                self.nbytes -= entry.sound.size
+
+    def set_sound(self, path: str, sound: SoundData) -> bool:
+        """
+        Store the decoded `sound` of the file at `path`. Return False (and don't keep
+        it) if no instrument uses that file anymore.
+        """
+        entry = self._files.get(path)
+        if entry is None:
+            return False
+        if entry.sound is not None:
+            self.nbytes -= entry.sound.size
+        entry.sound = sound
+        self.nbytes += sound.size
+        return True
+
+    def path(self, id: str) -> Optional[str]:
+        return self._instruments.get(id)
+
+    def get(self, id: str) -> Optional[SoundData]:
+        """Return the sound of instrument `id`, or None if it isn't loaded (yet)."""
+        path = self._instruments.get(id)
+        if path is None:
+            return None
+        return self._files[path].sound
+
+
 class NoSourceAvailableException(Exception):
     pass
 
 
+class VoiceStealingPolicy(Enum):
+    """
+    What `AudioOutputHandler` does with a new sound when all sources are busy.
+    """
+
+    NONE = 0  # Drop the new sound
+    OLDEST = 1  # Stop the sound that started first
+    QUIETEST = 2  # Stop the sound with the lowest volume
+    SAME_INSTRUMENT_FIRST = 3  # Stop the oldest sound of the same instrument, if any
+
+
 class SoundInstance:
     def __init__(
         self,
@@ -24,17 +192,26 @@ class SoundInstance:
         volume: float = 1.0,
         pitch: float = 1.0,
         pan: float = 0.0,
+        instrument: int = -1,
+        start_time: Optional[float] = None,
+        max_length: Optional[float] = None,
     ) -> None:
         self.sound = sound
         self.source = source
         self.volume = volume
         self.pitch = pitch
         self.pan = pan
+        self.instrument = instrument
+        self.playing = True
         sample_size = sound.channels * sound.bitrate // 8
         sample_rate = sound.frequency
         length_samples = sound.size * (1 / pitch)
         length_seconds = length_samples / (sample_size * sample_rate)
-        self.end_time = datetime.now() + timedelta(seconds=length_seconds)
+        if start_time is None:
+            start_time = time.monotonic()
+        self.end_time = start_time + length_seconds
+        if max_length is not None:
+            self.end_time = min(self.end_time, start_time + max_length)
 
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__} ({len(self.sound.data)} samples)>"
@@ -43,6 +220,8 @@ class SoundInstance:
 class AudioSourcePool:
     def __init__(self, sources: int = 256) -> None:
         self.free_sources = [SoundSource() for _ in range(sources)]
+        for source in self.free_sources:
+            source.looping = False
 
     def get_source(self) -> SoundSource:
         if self.free_sources:
@@ -55,51 +234,411 @@ class AudioSourcePool:
 
 
 class AudioOutputHandler:
-    def __init__(self):
-        self.active_sounds: List[SoundInstance] = []
+    def __init__(self, policy: VoiceStealingPolicy = VoiceStealingPolicy.OLDEST):
+        self.policy = policy
+        self.voice_count = 0
+        self.stolen_count = 0
+        self.dropped_count = 0
+
+        # Min-heap of (end time, insertion order, sound), so the sounds that finish
+        # first can be found without scanning every active sound
+        self.active_sounds: List[Tuple[float, int, SoundInstance]] = []
+        # The same sounds in the orders in which they can be stolen. Stolen sounds
+        # are only marked as stopped, and skipped when they reach the front
+        self._by_start: Deque[SoundInstance] = deque()
+        self._by_volume: List[Tuple[float, int, SoundInstance]] = []
+        self._by_instrument: Dict[int, Deque[SoundInstance]] = {}
+        # Sounds stopped since the queues were last compacted. Each leaves at most one
+        # stale entry in every queue, whichever of them the policy reads
+        self._stopped_count = 0
+        self._counter = itertools.count()
+        # Min-heap of (start time, insertion order, arguments) of scheduled sounds
+        self._scheduled: List[Tuple[float, int, tuple]] = []
+
         self.source_pool = AudioSourcePool()
         self.sink = SoundSink()
         self.sink.activate()
 
     def push_sound(
-        self, samples: SoundData, pitch: float, volume: float, panning: float
+        self,
+        samples: SoundData,
+        pitch: float,
+        volume: float,
+        panning: float,
+        instrument: int = -1,
+        onset: Optional[float] = None,
+    ) -> None:
+        """
+        Play `samples`, or schedule them to start at time `onset` (in seconds of
+        `time.monotonic`). Scheduled sounds are started by the first `update()` after
+        their onset, so they may start up to one update interval late.
+        """
+        now = time.monotonic()
+        if onset is not None and onset > now:
+            args = (samples, pitch, volume, panning, instrument, None)
+            heapq.heappush(self._scheduled, (onset, next(self._counter), args))
+            return
+        self._start_sound(samples, pitch, volume, panning, instrument, None, now)
+
+    def push_sounds(
+        self,
+        sounds: Sequence[SoundData],
+        pitches: Sequence[float],
+        volumes: Sequence[float],
+        pannings: Sequence[float],
+        instruments: Sequence[int],
+        onsets: Optional[Sequence[float]] = None,
+        max_length: Optional[float] = None,
+    ) -> None:
+        """
+        Play or schedule several sounds at once, like calling `push_sound` for each.
+        If `max_length` is given, sounds are stopped after that many seconds.
+        """
+        now = time.monotonic()
+        if onsets is None:
+            onsets = itertools.repeat(None)
+        notes = zip(sounds, pitches, volumes, pannings, instruments, onsets)
+        for samples, pitch, volume, panning, instrument, onset in notes:
+            args = (samples, pitch, volume, panning, instrument)
+            if onset is not None and onset > now:
+                heapq.heappush(
+                    self._scheduled, (onset, next(self._counter), (*args, max_length))
+                )
+            else:
+                self._start_sound(*args, max_length, now)
+
+    def _start_sound(
+        self,
+        samples: SoundData,
+        pitch: float,
+        volume: float,
+        panning: float,
+        instrument: int,
+        max_length: Optional[float],
+        now: float,
     ) -> None:
         try:
             source = self.source_pool.get_source()
         except NoSourceAvailableException:
-            # TODO: remove oldest sound from active_sounds and use that source
-            print("Skipping sound, no free sources available")
-            return
+            victim = self._find_victim(instrument)
+            if victim is None:
+                self.dropped_count += 1
+                return
+            self._stop_sound(victim)
+            self.stolen_count += 1
+            source = self.source_pool.get_source()
 
         source.gain = volume
         source.pitch = pitch
         source.position = [panning, 0, 0]
-        source.looping = False
         source.queue(samples)
 
-        sound = SoundInstance(samples, source, volume, pitch, panning)
-        self.active_sounds.insert(0, sound)
+        sound = SoundInstance(
+            samples, source, volume, pitch, panning, instrument, now, max_length
+        )
+        order = next(self._counter)
+        heapq.heappush(self.active_sounds, (sound.end_time, order, sound))
+        heapq.heappush(self._by_volume, (volume, order, sound))
+        self._by_start.append(sound)
+        self._by_instrument.setdefault(instrument, deque()).append(sound)
+        self.voice_count += 1
+        # Keep the stopped sounds left in the queues from piling up
+        if self._stopped_count > self.voice_count + 64:
+            self._compact()
 
         self.sink.play(source)
 
+    def _find_victim(self, instrument: int) -> Optional[SoundInstance]:
+        """Return the playing sound to stop according to `policy`, if any."""
+        if self.policy == VoiceStealingPolicy.NONE:
+            return None
+        if self.policy == VoiceStealingPolicy.SAME_INSTRUMENT_FIRST:
+            queue = self._by_instrument.get(instrument)
+            while queue and not queue[0].playing:
+                queue.popleft()
+            if queue:
+                return queue[0]
+        if self.policy == VoiceStealingPolicy.QUIETEST:
+            heap = self._by_volume
+            while heap and not heap[0][2].playing:
+                heapq.heappop(heap)
+            return heap[0][2] if heap else None
+        queue = self._by_start
+        while queue and not queue[0].playing:
+            queue.popleft()
+        return queue[0] if queue else None
+
+    def _stop_sound(self, sound: SoundInstance) -> None:
+        sound.playing = False
+        self.voice_count -= 1
+        self._stopped_count += 1
+        self.sink.stop(sound.source)
+        self.source_pool.release_source(sound.source)
+        sound.source.bufferqueue.clear()
+
+    def _compact(self) -> None:
+        self.active_sounds = [e for e in self.active_sounds if e[2].playing]
+        self._by_volume = [e for e in self._by_volume if e[2].playing]
+        heapq.heapify(self.active_sounds)
+        heapq.heapify(self._by_volume)
+        self._by_start = deque(s for s in self._by_start if s.playing)
+        by_instrument = {}
+        for sound in self._by_start:
+            by_instrument.setdefault(sound.instrument, deque()).append(sound)
+        self._by_instrument = by_instrument
+        self._stopped_count = 0
+
     def update(self):
-        # TODO: use a deque instead of a list / it might be possible
-        # to avoid checking every single sound, if they're sorted by
-        # end time
-        for sound in self.active_sounds:
-            # TODO: test polling the source state instead of using a timer
-            # if sound.source["dataproperties"]["source_state"] == al.PLAYING:
-            if datetime.now() >= sound.end_time:
-                self.active_sounds.remove(sound)
-                self.sink.stop(sound.source)
-                self.source_pool.release_source(sound.source)
-                sound.source.bufferqueue.clear()
+        # TODO: test polling the source state instead of using a timer
+        # if sound.source["dataproperties"]["source_state"] == al.PLAYING:
+        now = time.monotonic()
+        while self.active_sounds and self.active_sounds[0][0] <= now:
+            _, _, sound = heapq.heappop(self.active_sounds)
+            if sound.playing:
+                self._stop_sound(sound)
+        while self._scheduled and self._scheduled[0][0] <= now:
+            _, _, args = heapq.heappop(self._scheduled)
+            self._start_sound(*args, now)
+        self.sink.update()
+
+    def clear_scheduled(self) -> None:
+        """Drop the sounds scheduled to start in the future."""
+        self._scheduled.clear()
+
+
+class OutputMode(Enum):
+    """How `AudioEngine` sends sounds to the audio device."""
+
+    PER_SOURCE = 0  # One OpenAL source per sound (`AudioOutputHandler`)
+    SOFTWARE_MIXER = 1  # Mix all sounds into a single stream (`SoftwareMixerOutput`)
+
+
+class SoftwareMixerOutput:
+    """
+    Mix every active sound into fixed-size blocks with NumPy, and stream them through
+    a single OpenAL source. Unlike `AudioOutputHandler`, the number of sounds that can
+    play at once isn't limited by the number of OpenAL sources.
+
+    Sounds can be scheduled to start at a given time, which is rounded to the nearest
+    sample of the output stream.
+
+    Sounds are pushed already resampled to their pitch (see `SampleCache`), and copied
+    once into a bank shared by all voices, with a block of silence between sounds.
+    Mixing a block is then a single gather of one row per voice from a sliding window
+    view of the bank, and a (2, voices) x (voices, frames) matrix product.
+    """
+
+    def __init__(
+        self, sample_rate: int = 44100, block_size: int = 512, latency_blocks: int = 4
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.latency_blocks = latency_blocks
+        self.stolen_count = 0
+        self.dropped_count = 0
+
+        # Position in the bank of the first sample of each sound, by sound id
+        self._slots: Dict[int, Tuple[int, np.ndarray]] = {}
+        self._bank = np.zeros(0, dtype=np.float32)
+        self._bank_used = 0
+        self._resize_bank(block_size * 64)
+        # The bank starts with a block of silence, and each sound is followed by one
+        self._bank_used = block_size
+
+        # Bank position of each voice's next block, start and end of its sound, gains
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._starts = np.zeros(0, dtype=np.int64)
+        self._ends = np.zeros(0, dtype=np.int64)
+        self._gains = np.zeros((0, 2), dtype=np.float32)
+        # Start and end in the bank, gains and onset of voices yet to start
+        self._pending: List[Tuple[int, int, np.ndarray, Optional[float]]] = []
+
+        self._start_time: Optional[float] = None
+        self._frames_queued = 0
+
+        self.source = SoundSource()
+        self.source.looping = False
+        self.sink = SoundSink()
+        self.sink.activate()
+
+    @property
+    def voice_count(self) -> int:
+        return len(self._rows) + len(self._pending)
+
+    def push_sound(
+        self,
+        samples: np.ndarray,
+        volume: float,
+        panning: float,
+        onset: Optional[float] = None,
+    ) -> None:
+        """
+        Play `samples` from the next block that is mixed, or from time `onset` (in
+        seconds of `time.monotonic`) if given.
+        """
+        start = self._add_to_bank(samples)
+        gains = pan_gains(np.array([panning]))[0] * volume
+        self._pending.append((start, start + len(samples), gains, onset))
+
+    def push_sounds(
+        self,
+        samples: Sequence[np.ndarray],
+        volumes: np.ndarray,
+        pannings: np.ndarray,
+        onsets: Optional[Sequence[float]] = None,
+    ) -> None:
+        """Play or schedule several sounds at once, like calling `push_sound` for each."""
+        gains = pan_gains(pannings) * np.asarray(volumes, dtype=np.float32)[:, None]
+        if onsets is None:
+            onsets = itertools.repeat(None)
+        for sound, sound_gains, onset in zip(samples, gains, onsets):
+            # Add each voice before the next sound, since making room in the bank
+            # moves the sounds used by the pending voices
+            start = self._add_to_bank(sound)
+            self._pending.append((start, start + len(sound), sound_gains, onset))
+
+    def clear_scheduled(self) -> None:
+        """Drop the sounds scheduled to start in the future."""
+        self._pending = [voice for voice in self._pending if voice[3] is None]
+
+    def _resize_bank(self, capacity: int) -> None:
+        bank = np.zeros(capacity, dtype=np.float32)
+        bank[: self._bank_used] = self._bank[: self._bank_used]
+        self._bank = bank
+        self._windows = np.lib.stride_tricks.sliding_window_view(bank, self.block_size)
+
+    def _add_to_bank(self, samples: np.ndarray) -> int:
+        slot = self._slots.get(id(samples))
+        if slot is not None:
+            return slot[0]
+        needed = len(samples) + self.block_size
+        if self._bank_used + needed > len(self._bank):
+            self._compact_bank(needed)
+        start = self._bank_used
+        self._bank[start : start + len(samples)] = samples
+        self._bank_used += needed
+        # Keep a reference to the samples, so their id isn't reused while in the bank
+        self._slots[id(samples)] = (start, samples)
+        return start
+
+    def _compact_bank(self, needed: int) -> None:
+        """Drop the sounds no voice is playing from the bank, and make room."""
+        live = set(self._starts.tolist()) | {voice[0] for voice in self._pending}
+        slots = sorted(
+            (start, key, samples)
+            for key, (start, samples) in self._slots.items()
+            if start in live
+        )
+        used = self.block_size + sum(len(s) + self.block_size for _, _, s in slots)
+        capacity = max(len(self._bank), 2 * (used + needed))
+        old_bank = self._bank
+        self._bank = np.zeros(0, dtype=np.float32)
+        self._bank_used = 0
+        self._resize_bank(capacity)
+
+        moves = {}
+        self._slots = {}
+        position = self.block_size
+        for start, key, samples in slots:
+            self._bank[position : position + len(samples)] = old_bank[
+                start : start + len(samples)
+            ]
+            self._slots[key] = (position, samples)
+            moves[start] = position
+            position += len(samples) + self.block_size
+        self._bank_used = position
+
+        if len(self._starts):
+            old, new = zip(*sorted(moves.items()))
+            shift = np.array(new) - np.array(old)
+            offset = shift[np.searchsorted(old, self._starts)]
+            self._rows += offset
+            self._starts += offset
+            self._ends += offset
+        self._pending = [
+            (moves[start], end + moves[start] - start, gains, onset)
+            for start, end, gains, onset in self._pending
+        ]
+
+    def _start_pending(self) -> None:
+        """Start the pending voices whose onset falls within the next block."""
+        block_time = None
+        if self._start_time is not None:
+            block_time = self._start_time + self._frames_queued / self.sample_rate
+        voices = []
+        waiting = []
+        for voice in self._pending:
+            start, end, gains, onset = voice
+            offset = 0
+            if onset is not None and block_time is not None:
+                offset = max(round((onset - block_time) * self.sample_rate), 0)
+            if offset >= self.block_size:
+                waiting.append(voice)
+            else:
+                # Read from before the start of the sound, which is preceded by a
+                # block of silence, so it starts `offset` frames into the block
+                voices.append((start - offset, start, end, gains))
+        self._pending = waiting
+        if voices:
+            rows, starts, ends, gains = zip(*voices)
+            self._rows = np.concatenate((self._rows, rows))
+            self._starts = np.concatenate((self._starts, starts))
+            self._ends = np.concatenate((self._ends, ends))
+            self._gains = np.concatenate((self._gains, gains))
+
+    def mix_block(self) -> np.ndarray:
+        """Mix the next block of all active sounds, as a (frames, 2) float32 array."""
+        if self._pending:
+            self._start_pending()
+        if not len(self._rows):
+            return np.zeros((self.block_size, 2), dtype=np.float32)
+
+        block = self._windows[self._rows]
+        out = np.ascontiguousarray((self._gains.T @ block).T)
+
+        self._rows += self.block_size
+        playing = self._rows < self._ends
+        if not playing.all():
+            self._rows = self._rows[playing]
+            self._starts = self._starts[playing]
+            self._ends = self._ends[playing]
+            self._gains = self._gains[playing]
+        return out
+
+    def _queue_block(self) -> None:
+        block = self.mix_block()
+        pcm = (np.clip(block, -1, 1) * 32767).astype(np.int16)
+        buf = pcm.tobytes("C")
+        self.source.queue(SoundData(buf, 2, 16, len(buf), self.sample_rate))
+        self._frames_queued += self.block_size
+
+    def update(self):
+        now = time.monotonic()
+        if self._start_time is not None:
+            played = (now - self._start_time) * self.sample_rate
+            if played >= self._frames_queued:
+                # Every block queued so far has been played, so the source stopped
+                self._start_time = None
+        if self._start_time is None:
+            self._start_time = now
+            self._frames_queued = 0
+            for _ in range(self.latency_blocks):
+                self._queue_block()
+            self.sink.play(self.source)
+        else:
+            # Keep `latency_blocks` blocks queued ahead of the playback position
+            target = played + self.latency_blocks * self.block_size
+            while self._frames_queued < target:
+                self._queue_block()
         self.sink.update()
 
 
 class AudioEngine(QtCore.QObject):
     soundLoaded = QtCore.pyqtSignal(int, bool)
     soundCountUpdated = QtCore.pyqtSignal(int)
+    voiceCountersUpdated = QtCore.pyqtSignal(int, int)
+    soundMemoryChanged = QtCore.pyqtSignal(int)
+    playbackPositionChanged = QtCore.pyqtSignal(float)
     finished = QtCore.pyqtSignal()
 
     def __init__(
@@ -107,18 +646,46 @@ class AudioEngine(QtCore.QObject):
         parent: Optional[QtCore.QObject] = None,
         sample_rate: int = 44100,
         channels: int = 2,
+        voice_stealing: VoiceStealingPolicy = VoiceStealingPolicy.OLDEST,
+        output_mode: OutputMode = OutputMode.PER_SOURCE,
+        position_update_rate: float = 60.0,
+        cache_dir: Optional[PathLike] = None,
     ):
         super().__init__(parent)
         self.sample_rate = sample_rate
         self.channels = channels
         self.master_volume = 0.5
-        self.sounds = []
-        self.handler = AudioOutputHandler()
+        # Sounds are kept by instrument ID. `sounds` holds the sound of each instrument
+        # in the current order (notes refer to instruments by index), and is rebuilt
+        # whenever the instruments or their sounds change
+        self.registry = SoundRegistry()
+        self.instrument_ids: List[str] = []
+        self.sounds: List[Optional[SoundData]] = []
+        self._loaded = np.zeros(0, dtype=bool)
+        # Sounds are decoded in parallel, and may finish loading in any order
+        self.cache_dir = cache_dir
+        self._loader = ThreadPoolExecutor(thread_name_prefix="SoundLoader")
+        self._loads: Dict[Future, str] = {}
+        self.sample_cache = SampleCache(self.sounds, sample_rate)
+        self.scheduler = PlaybackScheduler()
+        self.output_mode = output_mode
+        if output_mode == OutputMode.SOFTWARE_MIXER:
+            self.handler = SoftwareMixerOutput(sample_rate)
+        else:
+            self.handler = AudioOutputHandler(voice_stealing)
+        self._voice_counters = (0, 0)
+        # The playback position is reported at most this often (e.g. at the display's
+        # refresh rate), so the GUI only repaints the playback marker when it's visible
+        self.position_interval = 1 / position_update_rate
+        self._next_position_update = 0.0
+        # Notes previewed while moving the playback position by hand are cut after
+        # this many seconds, so previews of nearby ticks don't pile up
+        self.preview_length = 0.25
 
         # Set up update timer
         self.update_timer = QtCore.QTimer()
         self.update_timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
-        self.update_timer.setInterval(16)
+        self.update_timer.setInterval(min(16, int(1000 * self.position_interval)))
         self.update_timer.timeout.connect(self._update)
         self.update_timer.start()
 
@@ -127,49 +694,523 @@ class AudioEngine(QtCore.QObject):
 
     def stop(self):
         print("Stopping audio engine")
+        self._loader.shutdown(wait=False, cancel_futures=True)
         self.finished.emit()
 
-    @QtCore.pyqtSlot(str)
-    def loadSound(self, path: PathLike) -> None:
-        # TODO: use unique ID as sound identifier instead of index
-        print("LOADING:", path)
-        try:
-            samples, samplerate = sf.read(path, dtype="int16", always_2d=True)
-        except sf.LibsndfileError:
-            self.sounds.append(None)
-            print("Failed to load sound")
-            return
-        buf = samples.tobytes("C")
-        channels = samples.shape[1]
-        bitrate = samples.dtype.itemsize * 8
+    @property
+    def sound_bytes(self) -> int:
+        """Total size of the decoded instrument sounds held, in bytes."""
+        return self.registry.nbytes
 
-        print(channels, bitrate, len(buf), samplerate)
-        data = SoundData(buf, channels, bitrate, len(buf), samplerate)
-        self.sounds.append(data)
+    @QtCore.pyqtSlot(list)
+    def setInstrumentSounds(self, instruments: Sequence[Tuple[str, str]]) -> None:
+        """
+        Set the instruments, as (ID, sound path) pairs in instrument order. Sound files
+        not used by any other instrument are loaded in the background; an instrument
+        is silent until `soundLoaded` is emitted for it.
+        """
+        ids = set()
+        for id, path in instruments:
+            if not path:
+                # Instruments without a sound are silent
+                continue
+            ids.add(id)
+            if self.registry.assign(id, path):
+                future = self._loader.submit(load_sound, path, self.cache_dir)
+                self._loads[future] = path
+        for id in [id for id in self.registry if id not in ids]:
+            self.registry.remove(id)
+        self.instrument_ids = [id for id, _ in instruments]
+        self._updateSounds()
+
+    def _updateSounds(self) -> None:
+        """Rebuild the list of sounds by instrument index after a change."""
+        sounds = [self.registry.get(id) for id in self.instrument_ids]
+        for index in range(max(len(sounds), len(self.sounds))):
+            old = self.sounds[index] if index < len(self.sounds) else None
+            new = sounds[index] if index < len(sounds) else None
+            if new is not old:
+                self.sample_cache.invalidate(index)
+        # Update in place, since the sample cache keeps a reference to the list
+        self.sounds[:] = sounds
+        self._loaded = np.array([sound is not None for sound in sounds], dtype=bool)
+        self.soundMemoryChanged.emit(self.registry.nbytes)
 
-        print(f"Loaded {path}")
-        self.soundLoaded.emit(len(self.sounds) - 1, True)
+    def _collectLoadedSounds(self) -> None:
+        done = [future for future in self._loads if future.done()]
+        if not done:
+            return
+        loaded = {}
+        for future in done:
+            path = self._loads.pop(future)
+            try:
+                sound = future.result()
+            except (sf.LibsndfileError, OSError):
+                logger.warning("Failed to load sound %s", path)
+                loaded[path] = False
+                continue
+            # The sound is dropped if all instruments using it were removed meanwhile
+            if self.registry.set_sound(path, sound):
+                loaded[path] = True
+        self._updateSounds()
+        for index, id in enumerate(self.instrument_ids):
+            path = self.registry.path(id)
+            if path in loaded:
+                self.soundLoaded.emit(index, loaded[path])
 
-    @QtCore.pyqtSlot(int)
-    def removeSound(self, index: int) -> None:
-        del self.sounds[index]
+    @QtCore.pyqtSlot(object)
+    def playNotes(self, notes: np.ndarray) -> None:
+        """Play a batch of notes, packed with `note_batch()`."""
+        self._pushNotes(
+            notes["instrument"], notes["key"], notes["volume"], notes["panning"]
+        )
 
-    @QtCore.pyqtSlot(int, float, float, float)
-    def playSound(self, index: int, volume: float, key: float, panning: float):
-        sound = self.sounds[index]
-        if sound is None:
+    @QtCore.pyqtSlot(object)
+    def previewNotes(self, notes: np.ndarray) -> None:
+        """
+        Play a batch of notes, packed with `note_batch()`, for at most
+        `preview_length` seconds.
+        """
+        self._pushNotes(
+            notes["instrument"],
+            notes["key"],
+            notes["volume"],
+            notes["panning"],
+            max_length=self.preview_length,
+        )
+
+    def _pushNotes(
+        self,
+        instruments: np.ndarray,
+        keys: np.ndarray,
+        volumes: np.ndarray,
+        pannings: np.ndarray,
+        onsets: Optional[np.ndarray] = None,
+        max_length: Optional[float] = None,
+    ) -> None:
+        """
+        Play (or schedule) notes given as arrays, with `keys` including the fine pitch.
+        The parameters of all notes are computed at once, so the only work left for
+        each note is handing it to the output. If `max_length` is given, the notes are
+        cut after that many seconds.
+        """
+        # Skip the notes of instruments that don't exist or aren't loaded
+        loaded = self._loaded
+        if len(loaded) == 0:
+            return
+        playable = (instruments < len(loaded)) & loaded[
+            np.minimum(instruments, len(loaded) - 1)
+        ]
+        if not playable.all():
+            instruments, keys = instruments[playable], keys[playable]
+            volumes, pannings = volumes[playable], pannings[playable]
+            if onsets is not None:
+                onsets = onsets[playable]
+        if len(instruments) == 0:
             return
-        # data = SoundData(*sound)
-        pitch = key_to_pitch(key)
-        volume *= self.master_volume
-        self.handler.push_sound(sound, pitch, volume, panning)
+        volumes = volumes * self.master_volume
+        instruments = instruments.tolist()
+        if onsets is not None:
+            onsets = onsets.tolist()
+        if self.output_mode == OutputMode.SOFTWARE_MIXER:
+            # Split keys into key and fine pitch, as `SampleCache` expects
+            keys, pitches = np.divmod(np.rint(keys * 100).astype(np.int64), 100)
+            get = self.sample_cache.get
+            samples = [
+                get(ins, key, pitch)
+                for ins, key, pitch in zip(instruments, keys.tolist(), pitches.tolist())
+            ]
+            if max_length is not None:
+                length = int(max_length * self.sample_rate)
+                fade = self.sample_rate // 100
+                samples = [fade_out(sound, length, fade) for sound in samples]
+            self.handler.push_sounds(samples, volumes, pannings, onsets)
+        else:
+            sounds = self.sounds
+            self.handler.push_sounds(
+                [sounds[ins] for ins in instruments],
+                (2 ** ((keys - 45) / 12)).tolist(),
+                volumes.tolist(),
+                pannings.tolist(),
+                instruments,
+                onsets,
+                max_length,
+            )
+
+    ########## Playback ##########
+
+    @QtCore.pyqtSlot(object, list)
+    def setPlaybackNotes(self, notes: NoteTable, layers: List[Layer]) -> None:
+        self.scheduler.set_notes(notes, layers)
+
+    @QtCore.pyqtSlot(list, object)
+    def replacePlaybackTicks(self, ticks: List[int], notes: NoteTable) -> None:
+        self.scheduler.replace_ticks(ticks, notes)
 
     @QtCore.pyqtSlot(list)
-    def playSounds(self, sounds: Sequence[Tuple[int, float, float, float]]):
-        for sound in sounds:
-            self.playSound(*sound)
+    def setPlaybackLayers(self, layers: List[Layer]) -> None:
+        self.scheduler.set_layers(layers)
+
+    @QtCore.pyqtSlot(float)
+    def startPlayback(self, tick: float) -> None:
+        self.scheduler.play(tick)
+
+    @QtCore.pyqtSlot()
+    def pausePlayback(self) -> None:
+        self.scheduler.pause()
+        self.handler.clear_scheduled()
+
+    @QtCore.pyqtSlot(float)
+    def seekPlayback(self, tick: float) -> None:
+        self.scheduler.seek(tick)
+        self.handler.clear_scheduled()
+
+    @QtCore.pyqtSlot(float)
+    def setTempo(self, tempo: float) -> None:
+        self.scheduler.set_tempo(tempo)
+
+    @QtCore.pyqtSlot(object)
+    def setLateThreshold(self, seconds: Optional[float]) -> None:
+        """
+        Drop the notes that should have started more than `seconds` ago when playback
+        falls behind, rather than playing them late. `None` plays every note.
+        """
+        self.scheduler.late_threshold = seconds
+
+    def _playScheduled(self) -> None:
+        notes = self.scheduler.poll()
+        if len(notes.times):
+            self._pushNotes(
+                notes.instruments,
+                notes.keys,
+                notes.volumes,
+                notes.pannings,
+                notes.times,
+            )
+
+    def _updatePosition(self) -> None:
+        if not self.scheduler.playing:
+            return
+        now = self.scheduler.clock.clock()
+        if now < self._next_position_update:
+            return
+        # Keep a steady rate, unless updates fell behind
+        self._next_position_update = max(
+            self._next_position_update + self.position_interval, now
+        )
+        self.playbackPositionChanged.emit(self.scheduler.position(now))
 
     @QtCore.pyqtSlot()
     def _update(self):
+        self._collectLoadedSounds()
+        self._playScheduled()
+        self._updatePosition()
         self.handler.update()
-        self.soundCountUpdated.emit(len(self.handler.active_sounds))
+        self.soundCountUpdated.emit(self.handler.voice_count)
+        counters = (self.handler.stolen_count, self.handler.dropped_count)
+        if counters != self._voice_counters:
+            self._voice_counters = counters
+            self.voiceCountersUpdated.emit(*counters)
+
+
+########## Offline rendering ##########
+
+
+def sound_to_array(sound: SoundData) -> np.ndarray:
+    """Return the samples in `sound` as a mono float32 array in the range [-1, 1]."""
+    samples = np.frombuffer(sound.data, dtype=np.int16).reshape(-1, sound.channels)
+    return samples.mean(axis=1, dtype=np.float32) / 32768
+
+
+def resample(samples: np.ndarray, ratio: float) -> np.ndarray:
+    """
+    Play back `samples` at `ratio` times its original speed, like setting the pitch of
+    an OpenAL source: the result is `1 / ratio` times as long. Uses linear interpolation.
+    """
+    length = int(len(samples) / ratio)
+    positions = np.arange(length, dtype=np.float64) * ratio
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+class SampleCache:
+    """
+    A bounded LRU cache of instrument samples already resampled to play at a given key,
+    for mixing notes in software. Entries are keyed by instrument index, key and fine
+    pitch (in cents, as in `Note.pitch`), and built lazily from `sounds`, which is kept
+    by reference (e.g. `AudioEngine.sounds`).
+
+    The `hits` and `misses` counters can be used to profile the cache.
+    """
+
+    def __init__(
+        self,
+        sounds: Sequence[Optional[SoundData]],
+        sample_rate: int = 44100,
+        max_bytes: int = 128 * 2**20,
+    ) -> None:
+        self.sounds = sounds
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple[int, int, int], np.ndarray] = OrderedDict()
+        self._sources: Dict[int, Tuple[np.ndarray, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def set_source(self, instrument: int, samples: np.ndarray, frequency: int) -> None:
+        """Use the already decoded mono `samples` as the sound of `instrument`."""
+        self.invalidate(instrument)
+        self._sources[instrument] = (samples, frequency)
+
+    def _get_source(self, instrument: int) -> Optional[Tuple[np.ndarray, int]]:
+        source = self._sources.get(instrument)
+        if source is None:
+            if instrument >= len(self.sounds) or self.sounds[instrument] is None:
+                return None
+            sound = self.sounds[instrument]
+            source = (sound_to_array(sound), sound.frequency)
+            self._sources[instrument] = source
+        return source
+
+    def get(self, instrument: int, key: int, pitch: int = 0) -> Optional[np.ndarray]:
+        """
+        Return the sound of `instrument` resampled to play at `key` (plus `pitch` cents)
+        as a mono float32 array, or None if the instrument has no sound loaded.
+        """
+        entry = (instrument, key, pitch)
+        samples = self._entries.get(entry)
+        if samples is not None:
+            self.hits += 1
+            self._entries.move_to_end(entry)
+            return samples
+
+        self.misses += 1
+        source = self._get_source(instrument)
+        if source is None:
+            return None
+        data, frequency = source
+        # Keys are relative to F#4 (45), the key in which instrument sounds are sampled
+        ratio = key_to_pitch(key + pitch / 100 - 45) * frequency / self.sample_rate
+        samples = resample(data, ratio)
+        self._entries[entry] = samples
+        self.nbytes += samples.nbytes
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return samples
+
+    def invalidate(self, instrument: Optional[int] = None) -> None:
+        """Drop the cached samples of `instrument`, or of all instruments if None."""
+        if instrument is None:
+            self._entries.clear()
+            self._sources.clear()
+            self.nbytes = 0
+            return
+        self._sources.pop(instrument, None)
+        for entry in [entry for entry in self._entries if entry[0] == instrument]:
+            self.nbytes -= self._entries.pop(entry).nbytes
+
+
+def fade_out(samples: np.ndarray, length: int, fade: int) -> np.ndarray:
+    """
+    Return the first `length` samples of `samples`, fading out linearly over the last
+    `fade` of them so the sound doesn't end with a click.
+    """
+    if len(samples) <= length:
+        return samples
+    samples = samples[:length].copy()
+    fade = min(fade, length)
+    samples[length - fade :] *= np.linspace(1, 0, fade, dtype=np.float32)
+    return samples
+
+
+def pan_gains(panning: np.ndarray) -> np.ndarray:
+    """
+    Return the (left, right) gain for each panning value in [-1, 1], using
+    a constant-power pan law. The result has shape (len(panning), 2).
+    """
+    angle = (np.clip(panning, -1, 1) + 1) * (np.pi / 4)
+    return np.stack((np.cos(angle), np.sin(angle)), axis=-1).astype(np.float32)
+
+
+class _MixPlan(NamedTuple):
+    """The notes to be mixed, ready for `_mix_notes()`."""
+
+    onsets: np.ndarray  # in samples
+    instruments: np.ndarray
+    keys: np.ndarray
+    pitches: np.ndarray
+    gains: np.ndarray  # (left, right) for each note
+
+
+def _plan_mix(
+    song: Song,
+    sounds: Sequence[Optional[SoundData]],
+    sample_rate: int,
+    master_volume: float,
+) -> _MixPlan:
+    notes = song.notes
+    audible, _, volume, panning = note_parameters(notes, song.layers)
+    loaded = np.zeros(max(len(sounds), int(notes.instrument.max(initial=0)) + 1), bool)
+    loaded[: len(sounds)] = [sound is not None for sound in sounds]
+    audible &= loaded[notes.instrument]
+
+    onsets = np.round(notes.tick[audible] / song.header.tempo * sample_rate)
+    gains = pan_gains(panning[audible]) * (volume[audible] * master_volume)[:, None]
+    return _MixPlan(
+        onsets=onsets.astype(np.int64),
+        instruments=notes.instrument[audible],
+        keys=notes.key[audible],
+        pitches=notes.pitch[audible],
+        gains=gains,
+    )
+
+
+def _mix_notes(
+    plan: _MixPlan, cache: SampleCache, start: Optional[int] = None
+) -> Tuple[int, np.ndarray]:
+    """
+    Mix the notes in `plan`, taking their samples from `cache`. Return the sample at
+    which the mix starts (`start`, or the first note's onset if not given), and the
+    mix itself.
+    """
+    onsets = plan.onsets.tolist()
+    if not onsets:
+        return start or 0, np.zeros((0, 2), dtype=np.float32)
+    notes = zip(plan.instruments.tolist(), plan.keys.tolist(), plan.pitches.tolist())
+    samples = [cache.get(ins, key, pitch) for ins, key, pitch in notes]
+
+    if start is None:
+        start = onsets[0]
+    length = max(onset + len(s) for onset, s in zip(onsets, samples)) - start
+    out = np.zeros((length, 2), dtype=np.float32)
+    for onset, sample, gain in zip(onsets, samples, plan.gains):
+        pos = onset - start
+        out[pos : pos + len(sample)] += sample[:, None] * gain
+    return start, out
+
+
+def mix_song(
+    song: Song,
+    sounds: Sequence[Optional[SoundData]],
+    sample_rate: int = 44100,
+    master_volume: float = 0.5,
+) -> np.ndarray:
+    """
+    Mix all notes in `song` into a stereo float32 buffer of shape (frames, 2), using
+    `sounds` (indexed by instrument, as in `AudioEngine.sounds`) as the instrument
+    samples. Notes whose instrument has no sound loaded are skipped.
+    """
+    plan = _plan_mix(song, sounds, sample_rate, master_volume)
+    _, mix = _mix_notes(plan, SampleCache(sounds, sample_rate), start=0)
+    return mix
+
+
+# Instrument samples shared with the current worker process by `mix_song_parallel()`
+_worker_cache: Optional[SampleCache] = None
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+
+
+def _attach_sources(
+    name: str, layout: Dict[int, Tuple[int, int, int]], sample_rate: int
+) -> None:
+    """Map the instrument samples in the shared memory block `name` in a worker."""
+    global _worker_cache, _worker_memory
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    buffer = np.ndarray(
+        (_worker_memory.size // 4,), dtype=np.float32, buffer=_worker_memory.buf
+    )
+    _worker_cache = SampleCache([], sample_rate)
+    for ins, (offset, length, frequency) in layout.items():
+        _worker_cache.set_source(ins, buffer[offset : offset + length], frequency)
+
+
+def _mix_chunk(plan: _MixPlan) -> Tuple[int, np.ndarray]:
+    assert _worker_cache is not None
+    return _mix_notes(plan, _worker_cache)
+
+
+def mix_song_parallel(
+    song: Song,
+    sounds: Sequence[Optional[SoundData]],
+    sample_rate: int = 44100,
+    master_volume: float = 0.5,
+    workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Same as `mix_song()`, but split the song into chunks of consecutive notes that are
+    mixed in parallel by a pool of `workers` processes (by default, one per CPU core).
+
+    The decoded instrument samples are placed in shared memory, so they're not copied
+    to every worker. Each chunk's mix extends past its last note for as long as the
+    sounds ring, and is added back on top of the overlapping chunks.
+    """
+    workers = workers or os.cpu_count() or 1
+    plan = _plan_mix(song, sounds, sample_rate, master_volume)
+    instruments = np.unique(plan.instruments).tolist()
+    samples = {ins: sound_to_array(sounds[ins]) for ins in instruments}
+
+    layout: Dict[int, Tuple[int, int, int]] = {}
+    offset = 0
+    for ins in instruments:
+        layout[ins] = (offset, len(samples[ins]), sounds[ins].frequency)
+        offset += len(samples[ins])
+    memory = shared_memory.SharedMemory(create=True, size=max(offset, 1) * 4)
+    try:
+        buffer = np.ndarray((offset,), dtype=np.float32, buffer=memory.buf)
+        for ins, (start, length, _) in layout.items():
+            buffer[start : start + length] = samples[ins]
+        del buffer
+
+        # A few chunks per worker evens out the load when notes are unevenly spread
+        chunks = np.array_split(np.arange(len(plan.onsets)), workers * 4)
+        chunks = [chunk for chunk in chunks if len(chunk)]
+        with ProcessPoolExecutor(
+            workers,
+            initializer=_attach_sources,
+            initargs=(memory.name, layout, sample_rate),
+        ) as pool:
+            futures = [
+                pool.submit(_mix_chunk, _MixPlan(*(a[chunk] for a in plan)))
+                for chunk in chunks
+            ]
+            mixes = [future.result() for future in futures]
+    finally:
+        memory.close()
+        memory.unlink()
+
+    length = max((start + len(mix) for start, mix in mixes), default=0)
+    out = np.zeros((length, 2), dtype=np.float32)
+    for start, mix in mixes:
+        out[start : start + len(mix)] += mix
+    return out
+
+
+def render_song(
+    song: Song,
+    sounds: Sequence[Optional[SoundData]],
+    path: PathLike,
+    sample_rate: int = 44100,
+    master_volume: float = 0.5,
+    workers: Optional[int] = 1,
+) -> None:
+    """
+    Render `song` to an audio file at `path`, without playing it. The file format
+    is chosen from the file extension (e.g. `.wav` or `.flac`). See `mix_song()`.
+
+    If `workers` is not 1, the song is mixed by several processes instead (by default,
+    one per CPU core). See `mix_song_parallel()`.
+    """
+    if workers == 1:
+        buffer = mix_song(song, sounds, sample_rate, master_volume)
+    else:
+        buffer = mix_song_parallel(song, sounds, sample_rate, master_volume, workers)
+    sf.write(path, np.clip(buffer, -1, 1), sample_rate)
@@ -0,0 +1,62 @@
+"""
+A playback clock that doesn't drift.
+
+The playback position is never accumulated frame by frame. It is derived from the
+last anchor (the time and tick at which playback was started, sought, or had its
+tempo changed) as `anchor_tick + (now - anchor_time) * tempo`, so the error doesn't
+grow with the length of the song, and system clock adjustments have no effect.
+"""
+
+import time
+from typing import Callable, Optional
+
+
+class PlaybackClock:
+    """
+    The playback position of a song, in ticks. Times are given by `clock`
+    (`time.monotonic` by default) and are in seconds.
+    """
+
+    def __init__(
+        self, clock: Callable[[], float] = time.monotonic, tempo: float = 10.0
+    ) -> None:
+        self.clock = clock
+        self.tempo = tempo
+        self.running = False
+        self._anchor_time = clock()
+        self._anchor_tick = 0.0
+
+    def _anchor(self, tick: float, now: Optional[float] = None) -> None:
+        self._anchor_time = self.clock() if now is None else now
+        self._anchor_tick = tick
+
+    def position(self, now: Optional[float] = None) -> float:
+        """Return the position at time `now`, or right now."""
+        if not self.running:
+            return self._anchor_tick
+        if now is None:
+            now = self.clock()
+        return self._anchor_tick + (now - self._anchor_time) * self.tempo
+
+    def time_at(self, tick: float) -> float:
+        """Return the time at which the position reaches (or reached) `tick`."""
+        return self._anchor_time + (tick - self._anchor_tick) / self.tempo
+
+    def start(self) -> None:
+        if not self.running:
+            self._anchor(self._anchor_tick)
+            self.running = True
+
+    def pause(self) -> None:
+        if self.running:
+            now = self.clock()
+            self._anchor(self.position(now), now)
+            self.running = False
+
+    def seek(self, tick: float) -> None:
+        self._anchor(tick)
+
+    def set_tempo(self, tempo: float) -> None:
+        now = self.clock()
+        self._anchor(self.position(now), now)
+        self.tempo = tempo
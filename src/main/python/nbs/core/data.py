@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union, overload
+
+import numpy as np
 
 NBS_VERSION = 5
 
@@ -34,6 +36,268 @@ class Note:
     pitch: int = 0
 
 
+NOTE_COLUMNS: Dict[str, np.dtype] = {
+    "tick": np.dtype(np.int32),
+    "layer": np.dtype(np.int32),
+    "instrument": np.dtype(np.int16),
+    "key": np.dtype(np.int16),
+    "velocity": np.dtype(np.uint8),
+    "panning": np.dtype(np.int8),
+    "pitch": np.dtype(np.int16),
+}
+
+
+class NoteTable:
+    """
+    A column-oriented collection of notes, stored as one NumPy array per `Note`
+    field and kept sorted by tick, then layer.
+
+    Iterating over (or indexing) the table yields `Note` objects built from the
+    underlying arrays, so it can be used anywhere a sequence of notes is expected.
+    Those objects are copies: changes to them are not written back to the table.
+    The column arrays are read-only; use `insert()` and `delete()` to modify them.
+    """
+
+    __slots__ = ("_columns",)
+
+    def __init__(self, notes: Iterable[Note] = ()) -> None:
+        notes = list(notes)
+        self._columns: Dict[str, np.ndarray] = {}
+        for name, dtype in NOTE_COLUMNS.items():
+            values = [getattr(note, name) for note in notes]
+            self._columns[name] = np.array(values, dtype=dtype)
+        self._sort()
+
+    @classmethod
+    def from_arrays(cls, **columns: Sequence[int]) -> "NoteTable":
+        """
+        Create a table from one sequence per note field. `tick`, `layer`,
+        `instrument` and `key` are required; the other fields take the same
+        defaults as `Note`.
+        """
+        size = len(columns["tick"])
+        defaults = {"velocity": 100, "panning": 0, "pitch": 0}
+        table = cls.__new__(cls)
+        table._columns = {}
+        for name, dtype in NOTE_COLUMNS.items():
+            if name in columns:
+                array = np.array(columns[name], dtype=dtype)
+                if len(array) != size:
+                    raise ValueError(f"Column '{name}' has the wrong length")
+            else:
+                array = np.full(size, defaults[name], dtype=dtype)
+            table._columns[name] = array
+        table._sort()
+        return table
+
+    def _sort(self) -> None:
+        keys = self._keys()
+        if len(keys) > 1 and np.any(keys[1:] < keys[:-1]):
+            order = np.argsort(keys, kind="stable")
+            self._columns = {name: col[order] for name, col in self._columns.items()}
+        self._freeze()
+
+    def _freeze(self) -> None:
+        for col in self._columns.values():
+            col.flags.writeable = False
+
+    def _keys(self) -> np.ndarray:
+        """Return the (tick, layer) sort key of every note packed into an int64."""
+        tick = self._columns["tick"].astype(np.int64)
+        layer = self._columns["layer"].astype(np.int64)
+        return (tick << 32) | (layer & 0xFFFFFFFF)
+
+    ########## Columns ##########
+
+    @property
+    def tick(self) -> np.ndarray:
+        return self._columns["tick"]
+
+    @property
+    def layer(self) -> np.ndarray:
+        return self._columns["layer"]
+
+    @property
+    def instrument(self) -> np.ndarray:
+        return self._columns["instrument"]
+
+    @property
+    def key(self) -> np.ndarray:
+        return self._columns["key"]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self._columns["velocity"]
+
+    @property
+    def panning(self) -> np.ndarray:
+        return self._columns["panning"]
+
+    @property
+    def pitch(self) -> np.ndarray:
+        return self._columns["pitch"]
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the column arrays, in bytes."""
+        return sum(col.nbytes for col in self._columns.values())
+
+    ########## Sequence protocol ##########
+
+    def __len__(self) -> int:
+        return len(self._columns["tick"])
+
+    def __iter__(self) -> Iterator[Note]:
+        columns = [col.tolist() for col in self._columns.values()]
+        for values in zip(*columns):
+            yield Note(*values)
+
+    @overload
+    def __getitem__(self, index: int) -> Note: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "NoteTable": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Note, "NoteTable"]:
+        if isinstance(index, slice):
+            return self._take(index)
+        return Note(*(col[index].item() for col in self._columns.values()))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, NoteTable):
+            return NotImplemented
+        return all(
+            np.array_equal(col, other._columns[name])
+            for name, col in self._columns.items()
+        )
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} ({len(self)} notes)>"
+
+    def _take(self, index: Union[slice, np.ndarray]) -> "NoteTable":
+        table = self.__class__.__new__(self.__class__)
+        table._columns = {name: col[index] for name, col in self._columns.items()}
+        table._freeze()
+        return table
+
+    ########## Queries ##########
+
+    def tick_range(self, start: int, stop: int) -> slice:
+        """
+        Return the slice of rows whose tick is in the half-open interval
+        [`start`, `stop`). Runs in O(log n).
+        """
+        tick = self._columns["tick"]
+        lo = int(np.searchsorted(tick, start, side="left"))
+        hi = int(np.searchsorted(tick, stop, side="left"))
+        return slice(lo, max(lo, hi))
+
+    def window(self, start: int, stop: int) -> "NoteTable":
+        """Return the notes with tick in [`start`, `stop`) as a new table (sharing memory)."""
+        return self._take(self.tick_range(start, stop))
+
+    def find(self, tick: int, layer: int) -> int:
+        """Return the row of the note at (`tick`, `layer`), or -1 if there's none."""
+        rows = self.tick_range(tick, tick + 1)
+        layers = self._columns["layer"][rows]
+        pos = int(np.searchsorted(layers, layer, side="left"))
+        if pos < len(layers) and layers[pos] == layer:
+            return rows.start + pos
+        return -1
+
+    ########## Modification ##########
+
+    def insert(self, notes: Union["NoteTable", Iterable[Note]]) -> np.ndarray:
+        """
+        Insert `notes` into the table, keeping it sorted. Runs in O(n + m log m)
+        for m inserted notes, instead of re-sorting the whole table.
+
+        Return the rows before which the notes were inserted, as expected by
+        `np.insert`, so arrays kept alongside the table can be updated the same way.
+        """
+        if not isinstance(notes, NoteTable):
+            notes = NoteTable(notes)
+        if len(notes) == 0:
+            return np.zeros(0, dtype=np.intp)
+        positions = np.searchsorted(self._keys(), notes._keys(), side="right")
+        self._columns = {
+            name: np.insert(col, positions, notes._columns[name])
+            for name, col in self._columns.items()
+        }
+        self._freeze()
+        return positions
+
+    def append(self, note: Note) -> None:
+        self.insert((note,))
+
+    def delete(self, rows: Union[int, slice, Sequence[int], np.ndarray]) -> None:
+        """Delete the notes at `rows` (an index, slice, index array or boolean mask)."""
+        if isinstance(rows, np.ndarray) and rows.dtype == np.bool_:
+            rows = np.flatnonzero(rows)
+        self._columns = {
+            name: np.delete(col, rows) for name, col in self._columns.items()
+        }
+        self._freeze()
+
+    def copy(self) -> "NoteTable":
+        return self._take(np.arange(len(self)))
+
+
+def note_parameters(
+    notes: NoteTable, layers: Sequence[Layer]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute, for every note, whether it's audible, and its key, volume and panning
+    after applying its layer's properties.
+    """
+    layer_ids = notes.layer
+    # Notes past the last layer belong to a layer with default properties
+    padded = max(len(layers), int(layer_ids.max()) + 1 if len(layer_ids) else 0)
+    all_layers = list(layers) + [Layer()] * (padded - len(layers))
+    lock = np.array([layer.lock for layer in all_layers], dtype=bool)
+    solo = np.array([layer.solo for layer in all_layers], dtype=bool)
+    layer_volume = np.array([layer.volume for layer in all_layers], dtype=np.float32)
+    layer_panning = np.array([layer.panning for layer in all_layers], dtype=np.float32)
+
+    if solo.any():
+        audible = solo[layer_ids]
+    else:
+        audible = ~lock[layer_ids]
+    key = notes.key + notes.pitch / 100
+    volume = (notes.velocity / 100) * (layer_volume[layer_ids] / 100)
+    note_panning = notes.panning / 100
+    layer_pan = layer_panning[layer_ids] / 100
+    panning = np.where(layer_pan == 0, note_panning, (note_panning + layer_pan) / 2)
+    return audible, key, volume, panning
+
+
+# A batch of notes to be played at once, as sent from the scene to the audio engine.
+# Keys include the fine pitch (e.g. 45.5 is F#4 plus 50 cents)
+NOTE_BATCH_DTYPE = np.dtype(
+    [
+        ("instrument", np.int16),
+        ("key", np.float32),
+        ("volume", np.float32),
+        ("panning", np.float32),
+    ]
+)
+
+
+def note_batch(
+    instruments: Sequence[int],
+    keys: Sequence[float],
+    volumes: Sequence[float],
+    pannings: Sequence[float],
+) -> np.ndarray:
+    """Pack the parameters of some notes into a structured array of `NOTE_BATCH_DTYPE`."""
+    batch = np.empty(len(instruments), dtype=NOTE_BATCH_DTYPE)
+    batch["instrument"] = instruments
+    batch["key"] = keys
+    batch["volume"] = volumes
+    batch["panning"] = pannings
+    return batch
+
+
 @dataclass
 class SongHeader:
     version: int = NBS_VERSION
@@ -58,7 +322,7 @@ class SongHeader:
 @dataclass
 class Song:
     header: SongHeader
-    notes: list[Note]
+    notes: NoteTable
     layers: list[Layer]
     instruments: list[Instrument]
 
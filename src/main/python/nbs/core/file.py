@@ -1,19 +1,59 @@
 """
 Deals with type conversions between the internal format and
-the actual data stored in the NBS file (parsed by `pynbs`).
+the actual data stored in the NBS file.
+
+Songs are read by `SongReader`, which decodes the file directly into the
+internal format. `pynbs` is used to save songs, and as a fallback to read
+files with a version we don't know how to decode.
 """
 
+import math
 import os
-from typing import Sequence, Union
+from array import array
+from bisect import bisect_right
+from mmap import ACCESS_READ, mmap
+from struct import Struct
+from typing import Iterable, Iterator, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import pynbs
 
-from nbs.core.data import NBS_VERSION, Instrument, Layer, Note, Song, SongHeader
+from nbs.core.data import (
+    NBS_VERSION,
+    Instrument,
+    Layer,
+    Note,
+    NoteTable,
+    Song,
+    SongHeader,
+)
 from nbs.utils.file import PathLike
 
+BYTE = Struct("<B")
+SHORT = Struct("<H")
+INT = Struct("<I")
+
+
+class UnsupportedVersionException(Exception):
+    pass
+
 
 def load_song(path: PathLike) -> Song:
-    return convert_file_to_song(pynbs.read(path))
+    """Load a song from a file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return SongReader(data).read_song()
+    except UnsupportedVersionException:
+        return convert_file_to_song(pynbs.read(path))
+
+
+def open_song(path: PathLike) -> "LazySong":
+    """
+    Open a song for reading without decoding it. Only the header is read upfront;
+    the rest of the file is decoded when it's accessed. See `LazySong`.
+    """
+    return LazySong(path)
 
 
 def save_song(song: Song, path: PathLike, version: int = NBS_VERSION):
@@ -60,21 +100,18 @@ def _parse_header(header: pynbs.Header) -> SongHeader:
     )
 
 
-def _parse_notes(notes: Sequence[pynbs.Note]) -> list[Note]:
-    """Parse notes from `pynbs.Note` to `nbs.Note`."""
+def _parse_notes(notes: Sequence[pynbs.Note]) -> NoteTable:
+    """Parse notes from `pynbs.Note` to a `nbs.NoteTable`."""
 
-    return [
-        Note(
-            tick=note.tick,
-            layer=note.layer,
-            instrument=note.instrument,
-            key=note.key,
-            velocity=note.velocity,
-            panning=note.panning,
-            pitch=note.pitch,
-        )
-        for note in notes
-    ]
+    return NoteTable.from_arrays(
+        tick=[note.tick for note in notes],
+        layer=[note.layer for note in notes],
+        instrument=[note.instrument for note in notes],
+        key=[note.key for note in notes],
+        velocity=[note.velocity for note in notes],
+        panning=[note.panning for note in notes],
+        pitch=[note.pitch for note in notes],
+    )
 
 
 def _parse_layers(layers: Sequence[pynbs.Layer]) -> list[Layer]:
@@ -129,7 +166,7 @@ def _save_header(header: SongHeader) -> pynbs.Header:
     )
 
 
-def _save_notes(notes: Sequence[Note]) -> list[pynbs.Note]:
+def _save_notes(notes: Iterable[Note]) -> list[pynbs.Note]:
     """Convert notes from `nbs.Note` to `pynbs.Note`."""
 
     return [
@@ -172,3 +209,342 @@ def _save_instruments(instruments: Sequence[Instrument]) -> list[pynbs.Instrumen
         )
         for i, ins in enumerate(instruments)
     ]
+
+
+class SongReader:
+    """
+    Decodes an NBS file (versions 0 to `NBS_VERSION`) from a bytes-like object.
+
+    Unlike `pynbs`, notes are never built as individual objects: the note section
+    is decoded in a single pass straight into the columns of a `NoteTable`.
+    The sections must be read in order, as each method continues reading from
+    where the previous one stopped.
+    """
+
+    def __init__(self, buffer: Union[bytes, bytearray, memoryview, mmap]) -> None:
+        self.buffer = buffer
+        self.pos = 0
+        self.version = 0
+        # Position inside the note section, so it can be read in several steps
+        self.tick = -1
+        self.notes_done = False
+
+    def read_song(self) -> Song:
+        header, layer_count = self.read_header()
+        notes = self.read_notes()
+        layers = self.read_layers(layer_count)
+        instruments = self.read_instruments()
+        return Song(header, notes, layers, instruments)
+
+    ########## Primitives ##########
+
+    def _read(self, fmt: Struct) -> int:
+        value = fmt.unpack_from(self.buffer, self.pos)[0]
+        self.pos += fmt.size
+        return value
+
+    def _read_string(self) -> str:
+        length = self._read(INT)
+        start = self.pos
+        self.pos += length
+        return bytes(self.buffer[start : self.pos]).decode(encoding="cp1252")
+
+    ########## Sections ##########
+
+    def read_header(self) -> Tuple[SongHeader, int]:
+        """Read the song header. Return it along with the number of layers in the song."""
+
+        song_length = self._read(SHORT)
+        if song_length == 0:
+            # A song length of 0 indicates the Open Note Block Studio format
+            self.version = self._read(BYTE)
+        else:
+            self.version = 0
+        version = self.version
+
+        if version > NBS_VERSION:
+            raise UnsupportedVersionException(f"Unsupported NBS version: {version}")
+
+        header = SongHeader(version=version)
+        header.default_instruments = self._read(BYTE) if version > 0 else 10
+        if version >= 3:
+            self._read(SHORT)  # song length
+        layer_count = self._read(SHORT)
+        header.title = self._read_string()
+        header.author = self._read_string()
+        header.original_author = self._read_string()
+        header.description = self._read_string()
+        header.tempo = self._read(SHORT) / 100
+        self._read(BYTE)  # auto-saving
+        self._read(BYTE)  # auto-saving duration
+        header.time_signature = self._read(BYTE)
+        header.minutes_spent = self._read(INT)
+        header.left_clicks = self._read(INT)
+        header.right_clicks = self._read(INT)
+        header.blocks_added = self._read(INT)
+        header.blocks_removed = self._read(INT)
+        header.song_origin = self._read_string()
+        if version >= 4:
+            header.loop = self._read(BYTE) == 1
+            header.max_loop_count = self._read(BYTE)
+            header.loop_start_tick = self._read(SHORT)
+        return header, layer_count
+
+    def read_notes(self, stop_tick: Optional[int] = None) -> NoteTable:
+        """
+        Decode the jump-encoded note section into a `NoteTable`. If `stop_tick`
+        is given, stop before the first tick at or after it, so that the next
+        call continues from there.
+        """
+
+        return self._gather_notes(*self._scan_notes(stop_tick))
+
+    def skip_notes(self, stop_tick: Optional[int] = None) -> None:
+        """Move past the note section (or up to `stop_tick`) without decoding it."""
+
+        self._scan_notes(stop_tick)
+
+    def _scan_notes(
+        self, stop_tick: Optional[int] = None
+    ) -> Tuple[array, array, array]:
+        """
+        Walk the note section, returning the tick and note count of every chord
+        (notes sharing a tick), and the byte offset of every note's fields.
+        """
+
+        # This is the hot loop when opening a song, so it does as little work
+        # per note as possible, and everything it touches is bound to a local name.
+        # Layers are recovered afterwards from the jumps preceding each offset.
+        unpack = SHORT.unpack_from
+        buffer = self.buffer
+        pos = self.pos
+        note_size = 6 if self.version >= 4 else 2
+        chord_ticks = array("i")
+        chord_sizes = array("i")
+        offsets = array("q")
+        add_offset = offsets.append
+        if self.notes_done:
+            return chord_ticks, chord_sizes, offsets
+        stop = math.inf if stop_tick is None else stop_tick
+
+        tick = self.tick
+        while True:
+            (jump,) = unpack(buffer, pos)
+            if not jump:
+                pos += 2
+                self.notes_done = True
+                break
+            if tick + jump >= stop:
+                break
+            pos += 2
+            tick += jump
+            count = len(offsets)
+            while True:
+                (jump,) = unpack(buffer, pos)
+                pos += 2
+                if not jump:
+                    break
+                add_offset(pos)
+                pos += note_size
+            chord_ticks.append(tick)
+            chord_sizes.append(len(offsets) - count)
+
+        self.pos = pos
+        self.tick = tick
+        return chord_ticks, chord_sizes, offsets
+
+    def _gather_notes(
+        self, chord_ticks: array, chord_sizes: array, offsets: array
+    ) -> NoteTable:
+        """Extract the per-note fields found by `_scan_notes()` in a vectorized way."""
+
+        raw = np.frombuffer(self.buffer, dtype=np.uint8)
+        pos = np.frombuffer(offsets, dtype=np.int64)
+        sizes = np.frombuffer(chord_sizes, dtype=np.int32)
+
+        # Layers are the running sum of the layer jumps, restarting at every chord
+        jumps = raw[pos - 2].astype(np.int64) | (raw[pos - 1].astype(np.int64) << 8)
+        total = np.cumsum(jumps)
+        chord_start = np.cumsum(sizes) - sizes
+        before_chord = np.concatenate(([0], total))[chord_start]
+        layer = total - np.repeat(before_chord, sizes) - 1
+
+        columns = {
+            "tick": np.repeat(np.frombuffer(chord_ticks, dtype=np.int32), sizes),
+            "layer": layer,
+            "instrument": raw[pos],
+            "key": raw[pos + 1],
+        }
+        if self.version >= 4:
+            columns["velocity"] = raw[pos + 2]
+            columns["panning"] = raw[pos + 3].astype(np.int16) - 100
+            pitch = raw[pos + 4].astype(np.uint16) | (
+                raw[pos + 5].astype(np.uint16) << 8
+            )
+            columns["pitch"] = pitch.view(np.int16)
+        return NoteTable.from_arrays(**columns)
+
+    def read_layers(self, count: int) -> list[Layer]:
+        layers = []
+        for _ in range(count):
+            name = self._read_string()
+            lock = self._read(BYTE) if self.version >= 4 else 0
+            volume = self._read(BYTE)
+            panning = self._read(BYTE) - 100 if self.version >= 2 else 0
+            layers.append(
+                Layer(
+                    name=name,
+                    lock=lock == 1,
+                    solo=lock == 2,  # Not specified in the NBS format
+                    volume=volume,
+                    panning=panning,
+                )
+            )
+        return layers
+
+    def read_instruments(self) -> list[Instrument]:
+        instruments = []
+        for _ in range(self._read(BYTE)):
+            name = self._read_string()
+            sound_path = self._read_string()
+            pitch = self._read(BYTE)
+            press = self._read(BYTE) == 1
+            instruments.append(
+                Instrument(name=name, sound_path=sound_path, pitch=pitch, press=press)
+            )
+        return instruments
+
+
+class LazySong:
+    """
+    A song backed by a memory-mapped NBS file, for when only part of it is needed
+    (e.g. browsing or previewing many files).
+
+    The header is parsed when the song is opened. The notes, layers and instruments
+    are decoded the first time they're accessed, and `windows()` can stream the
+    notes a few ticks at a time without ever decoding the whole note section.
+    The file stays open until `close()` is called, or the `with` block ends.
+    """
+
+    # Minimum distance, in bytes, between two places where decoding can resume
+    CHECKPOINT_SPACING = 64 * 1024
+
+    def __init__(self, path: PathLike) -> None:
+        with open(path, "rb") as f:
+            self._buffer = mmap(f.fileno(), 0, access=ACCESS_READ)
+        reader = SongReader(self._buffer)
+        self.header, self._layer_count = reader.read_header()
+        self.version = reader.version
+        self._notes: Optional[NoteTable] = None
+        self._layers: Optional[list[Layer]] = None
+        self._instruments: Optional[list[Instrument]] = None
+        self._layers_offset: Optional[int] = None
+        # (tick, offset, last tick read) where a reader may resume decoding notes
+        self._checkpoints = [(0, reader.pos, -1)]
+
+    def __enter__(self) -> "LazySong":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._buffer.close()
+
+    def _reader_at(self, offset: int, tick: int = -1) -> SongReader:
+        reader = SongReader(self._buffer)
+        reader.version = self.version
+        reader.pos = offset
+        reader.tick = tick
+        return reader
+
+    @property
+    def notes(self) -> NoteTable:
+        if self._notes is None:
+            _, offset, tick = self._checkpoints[0]
+            reader = self._reader_at(offset, tick)
+            self._notes = reader.read_notes()
+            self._layers_offset = reader.pos
+        return self._notes
+
+    @property
+    def layers(self) -> list[Layer]:
+        if self._layers is None:
+            self._layers, self._instruments = self._read_layers_and_instruments()
+        return self._layers
+
+    @property
+    def instruments(self) -> list[Instrument]:
+        if self._instruments is None:
+            self._layers, self._instruments = self._read_layers_and_instruments()
+        return self._instruments
+
+    def _read_layers_and_instruments(self) -> Tuple[list[Layer], list[Instrument]]:
+        if self._layers_offset is None:
+            # Layers come after the notes, so the note section must be walked through
+            _, offset, tick = self._checkpoints[-1]
+            reader = self._reader_at(offset, tick)
+            reader.skip_notes()
+            self._layers_offset = reader.pos
+        reader = self._reader_at(self._layers_offset)
+        return reader.read_layers(self._layer_count), reader.read_instruments()
+
+    def to_song(self) -> Song:
+        """Decode the rest of the file and return it as a regular `Song`."""
+        return Song(self.header, self.notes, self.layers, self.instruments)
+
+    def windows(
+        self, size: int, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[NoteTable]:
+        """
+        Iterate over the notes in [`start`, `stop`), `size` ticks at a time.
+        Each step yields a `NoteTable` with the notes in the next window (which
+        may be empty). Only the part of the note section being iterated is decoded,
+        so this is suitable for streaming playback of very large files.
+        """
+        if size <= 0:
+            raise ValueError("Window size must be positive")
+        if self._notes is not None:
+            yield from self._slice_windows(size, start, stop)
+            return
+
+        reader = self._resume_reader(start)
+        reader.skip_notes(start)
+        window_start = start
+        while stop is None or window_start < stop:
+            window_end = window_start + size
+            if stop is not None:
+                window_end = min(window_end, stop)
+            notes = reader.read_notes(window_end)
+            self._add_checkpoint(window_end, reader)
+            yield notes
+            if reader.notes_done:
+                self._layers_offset = reader.pos
+                if stop is None:
+                    break
+            window_start = window_end
+
+    def _slice_windows(
+        self, size: int, start: int, stop: Optional[int]
+    ) -> Iterator[NoteTable]:
+        notes = self.notes
+        if stop is None:
+            # Same as when streaming: stop after the window with the last note
+            last_tick = int(notes.tick[-1]) if len(notes) else start
+            stop = max(start, last_tick) + 1
+        for window_start in range(start, stop, size):
+            yield notes.window(window_start, min(window_start + size, stop))
+
+    def _resume_reader(self, tick: int) -> SongReader:
+        """Return a reader positioned at the last checkpoint before `tick`."""
+        index = bisect_right(self._checkpoints, (tick, math.inf)) - 1
+        _, offset, last_tick = self._checkpoints[index]
+        return self._reader_at(offset, last_tick)
+
+    def _add_checkpoint(self, tick: int, reader: SongReader) -> None:
+        if reader.notes_done:
+            return
+        index = bisect_right(self._checkpoints, (tick, math.inf))
+        previous_offset = self._checkpoints[index - 1][1]
+        if reader.pos - previous_offset >= self.CHECKPOINT_SPACING:
+            self._checkpoints.insert(index, (tick, reader.pos, reader.tick))
@@ -0,0 +1,153 @@
+"""
+A spatial index of items on the (tick, layer) grid of a song.
+
+Note blocks sit on an integer grid, so finding the block at a position, or the blocks
+in a tick or layer, doesn't need a general-purpose spatial index such as the BSP tree
+of `QGraphicsScene`. `GridIndex` keeps the items in each cell in a dict, along with
+the occupied cells of each tick and of each layer, so that checking a cell and adding,
+moving or removing an item are O(1), and finding the items in a tick or layer is O(k)
+for k items found.
+"""
+
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class GridIndex(Generic[T]):
+    """
+    Items placed on an integer (tick, layer) grid. A cell normally holds a single
+    item, but may hold several while they overlap (e.g. while a selection is moved
+    over other items). They're kept in the order they were added. Items are told
+    apart by identity, not equality.
+    """
+
+    def __init__(self) -> None:
+        self._cells: Dict[Tuple[int, int], List[T]] = {}
+        # The occupied layers in each tick, and ticks in each layer, used as ordered sets
+        self._ticks: Dict[int, Dict[int, None]] = {}
+        self._layers: Dict[int, Dict[int, None]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[T]:
+        for items in self._cells.values():
+            yield from items
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._ticks.clear()
+        self._layers.clear()
+        self._count = 0
+
+    def add(self, item: T, tick: int, layer: int) -> None:
+        items = self._cells.get((tick, layer))
+        if items is None:
+            self._cells[(tick, layer)] = [item]
+            self._ticks.setdefault(tick, {})[layer] = None
+            self._layers.setdefault(layer, {})[tick] = None
+        else:
+            items.append(item)
+        self._count += 1
+
+    def remove(self, item: T, tick: int, layer: int) -> None:
+        """Remove `item` from the cell at (`tick`, `layer`), where it must be."""
+        items = self._cells[(tick, layer)]
+        del items[self._position(items, item)]
+        if not items:
+            del self._cells[(tick, layer)]
+            self._discard(self._ticks, tick, layer)
+            self._discard(self._layers, layer, tick)
+        self._count -= 1
+
+    @staticmethod
+    def _position(items: List[T], item: T) -> int:
+        for position, other in enumerate(items):
+            if other is item:
+                return position
+        raise ValueError(f"{item!r} is not in the cell")
+
+    @staticmethod
+    def _discard(index: Dict[int, Dict[int, None]], key: int, value: int) -> None:
+        values = index[key]
+        del values[value]
+        if not values:
+            del index[key]
+
+    def move(
+        self, item: T, tick: int, layer: int, new_tick: int, new_layer: int
+    ) -> None:
+        """Move `item` from the cell at (`tick`, `layer`) to (`new_tick`, `new_layer`)."""
+        if (tick, layer) != (new_tick, new_layer):
+            self.remove(item, tick, layer)
+            self.add(item, new_tick, new_layer)
+
+    def replace(self, item: T, new_item: T, tick: int, layer: int) -> None:
+        """Put `new_item` in place of `item` in the cell at (`tick`, `layer`)."""
+        items = self._cells[(tick, layer)]
+        items[self._position(items, item)] = new_item
+
+    def is_occupied(self, tick: int, layer: int) -> bool:
+        return (tick, layer) in self._cells
+
+    def at(self, tick: int, layer: int) -> List[T]:
+        """Return the items in a cell, in the order they were added."""
+        return list(self._cells.get((tick, layer), ()))
+
+    def top(self, tick: int, layer: int) -> Optional[T]:
+        """Return the item added last to a cell, if any."""
+        items = self._cells.get((tick, layer))
+        return items[-1] if items else None
+
+    def in_tick(self, tick: int) -> List[T]:
+        """Return the items in `tick`."""
+        cells = self._cells
+        return [
+            item for layer in self._ticks.get(tick, ()) for item in cells[tick, layer]
+        ]
+
+    def in_layer(self, layer: int) -> List[T]:
+        """Return the items in `layer`."""
+        cells = self._cells
+        return [
+            item for tick in self._layers.get(layer, ()) for item in cells[tick, layer]
+        ]
+
+    def in_area(
+        self, tick_start: int, tick_stop: int, layer_start: int, layer_stop: int
+    ) -> List[T]:
+        """
+        Return the items in ticks [`tick_start`, `tick_stop`) and layers
+        [`layer_start`, `layer_stop`), column by column.
+        """
+        cells = self._cells
+        ticks = self._ticks
+        return [
+            item
+            for tick in range(tick_start, tick_stop)
+            if tick in ticks
+            for layer in ticks[tick]
+            if layer_start <= layer < layer_stop
+            for item in cells[tick, layer]
+        ]
+
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Return the smallest area holding every item, as (first tick, first layer,
+        tick stop, layer stop), or None if the grid is empty.
+        """
+        if not self._cells:
+            return None
+        ticks, layers = self._ticks.keys(), self._layers.keys()
+        return min(ticks), min(layers), max(ticks) + 1, max(layers) + 1
+
+    def in_layers(self, start: int, stop: Optional[int] = None) -> List[T]:
+        """Return the items in layers [`start`, `stop`), or from `start` onwards."""
+        return [
+            item
+            for layer in self._layers
+            if layer >= start and (stop is None or layer < stop)
+            for item in self.in_layer(layer)
+        ]
@@ -0,0 +1,138 @@
+"""
+Scheduling of the notes in a song during playback.
+
+Rather than playing each note as soon as the playback position is noticed to have
+reached its tick, the scheduler looks a short time ahead and returns the notes that
+are about to start together with the exact time at which they must be heard, so the
+audio output can start them at the right sample regardless of when it was polled.
+"""
+
+import time
+from typing import Callable, Iterable, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from nbs.core.clock import PlaybackClock
+from nbs.core.data import Layer, NoteTable
+from nbs.core.timeline import PlaybackTimeline
+
+
+class ScheduledNotes(NamedTuple):
+    """Notes that must start playing at the given `times` (in seconds)."""
+
+    times: np.ndarray
+    instruments: np.ndarray
+    keys: np.ndarray  # including the fine pitch
+    volumes: np.ndarray
+    pannings: np.ndarray
+
+
+class PlaybackScheduler:
+    """
+    Keep track of the playback position of a song with a `PlaybackClock`, and schedule
+    its notes `lookahead` seconds before they must start playing.
+
+    Times are given by `clock` (`time.monotonic` by default), so the onset of each note
+    doesn't depend on how often the scheduler is polled. If polling stalls, notes that
+    should have started more than `late_threshold` seconds ago (if set) are dropped
+    rather than played late.
+    """
+
+    def __init__(
+        self,
+        lookahead: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+        late_threshold: Optional[float] = None,
+    ) -> None:
+        self.lookahead = lookahead
+        self.late_threshold = late_threshold
+        self.clock = PlaybackClock(clock)
+        # All notes with a tick lower than this have already been scheduled
+        self._horizon = 0.0
+        self._next = 0
+        self.timeline = PlaybackTimeline()
+        self._notes = self.timeline.compiled()
+
+    @property
+    def playing(self) -> bool:
+        return self.clock.running
+
+    @property
+    def tempo(self) -> float:
+        return self.clock.tempo
+
+    def set_notes(self, notes: NoteTable, layers: Sequence[Layer]) -> None:
+        """Replace the notes to be played. Notes already scheduled aren't repeated."""
+        self.timeline.set_notes(notes, layers)
+        self._update_notes()
+
+    def replace_ticks(self, ticks: Iterable[int], notes: NoteTable) -> None:
+        """
+        Replace the notes in `ticks` with `notes`, which must only contain notes in
+        those ticks. Only the timeline is updated, not the whole song compiled again.
+        """
+        self.timeline.replace_ticks(ticks, notes)
+        self._update_notes()
+
+    def set_layers(self, layers: Sequence[Layer]) -> None:
+        """Update the layer properties the notes are played with."""
+        self.timeline.set_layers(layers)
+        self._update_notes()
+
+    def _update_notes(self) -> None:
+        self._notes = self.timeline.compiled()
+        self._next = int(np.searchsorted(self._notes.ticks, self._horizon))
+
+    def position(self, now: Optional[float] = None) -> float:
+        """Return the playback position (in ticks) at time `now`, or right now."""
+        return self.clock.position(now)
+
+    def time_at(self, tick: float) -> float:
+        """Return the time at which the playback position will reach `tick`."""
+        return self.clock.time_at(tick)
+
+    def play(self, tick: Optional[float] = None) -> None:
+        """Start playing from `tick`, or from the current position."""
+        if tick is not None:
+            self.seek(tick)
+        self.clock.start()
+
+    def pause(self) -> None:
+        """
+        Stop playing. Notes scheduled past the current position will be scheduled
+        again when playback resumes, so the output should drop them.
+        """
+        self.clock.pause()
+        self.seek(self.clock.position())
+
+    def seek(self, tick: float) -> None:
+        """Move the playback position to `tick`. Notes at `tick` will be played."""
+        self.clock.seek(tick)
+        self._horizon = tick
+        self._next = int(np.searchsorted(self._notes.ticks, tick))
+
+    def set_tempo(self, tempo: float) -> None:
+        self.clock.set_tempo(tempo)
+
+    def poll(self) -> ScheduledNotes:
+        """
+        Return the notes that start between the end of the last poll and `lookahead`
+        seconds from now, with the time at which each one must start. Notes later than
+        `late_threshold` are skipped.
+        """
+        start = self._next
+        if self.playing:
+            now = self.clock.clock()
+            self._horizon = self.position(now + self.lookahead)
+            self._next = int(np.searchsorted(self._notes.ticks, self._horizon))
+            if self.late_threshold is not None:
+                late = self.position(now - self.late_threshold)
+                start = max(start, int(np.searchsorted(self._notes.ticks, late)))
+        notes = slice(start, self._next)
+        return ScheduledNotes(
+            times=self.time_at(self._notes.ticks[notes]),
+            instruments=self._notes.instruments[notes],
+            keys=self._notes.keys[notes],
+            volumes=self._notes.volumes[notes],
+            pannings=self._notes.pannings[notes],
+        )
@@ -0,0 +1,143 @@
+"""
+A compiled playback timeline.
+
+Playing a tick used to mean looking up each note's layer, checking whether it's
+locked or muted by a solo layer, and combining the note's key, velocity and panning
+with the layer's properties, for every note, every time it's played. The timeline
+does that work once, when the song is loaded, and keeps the results in sorted
+arrays so that dispatching the notes in a range of ticks is a slice.
+
+Edits are applied incrementally: replacing the notes in some ticks only computes
+the parameters of the new notes, and changing a layer only recomputes the notes in
+that layer (or nothing at all, for lock and solo changes, which only affect which
+notes are audible).
+"""
+
+from dataclasses import replace
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from nbs.core.data import Layer, NoteTable, note_parameters
+
+
+class TimelineNotes(NamedTuple):
+    """The audible notes in a range of ticks, with their final mixing parameters."""
+
+    ticks: np.ndarray
+    layers: np.ndarray
+    instruments: np.ndarray
+    keys: np.ndarray  # including the fine pitch
+    volumes: np.ndarray
+    pannings: np.ndarray
+
+
+class PlaybackTimeline:
+    """
+    The notes of a song, sorted by tick, with the key, volume and panning each one
+    is played with after applying its layer's properties.
+    """
+
+    def __init__(
+        self, notes: Optional[NoteTable] = None, layers: Sequence[Layer] = ()
+    ) -> None:
+        self.set_notes(NoteTable() if notes is None else notes, layers)
+
+    @property
+    def notes(self) -> NoteTable:
+        return self._notes
+
+    def set_notes(self, notes: NoteTable, layers: Sequence[Layer]) -> None:
+        """Replace all notes and layers, and compile the whole timeline."""
+        self._notes = notes.copy()
+        self._layers: List[Layer] = [replace(layer) for layer in layers]
+        _, self._keys, self._volumes, self._pannings = note_parameters(
+            self._notes, self._layers
+        )
+        self._compiled = None
+
+    def replace_ticks(self, ticks: Iterable[int], notes: NoteTable) -> None:
+        """
+        Replace all notes in `ticks` with `notes`, which must only contain notes in
+        those ticks. Only the parameters of `notes` are computed.
+        """
+        ticks = np.fromiter(ticks, dtype=np.int64)
+        if len(ticks) == 0 and len(notes) == 0:
+            return
+        removed = np.isin(self._notes.tick, ticks)
+        if removed.any():
+            self._notes.delete(removed)
+            kept = ~removed
+            self._keys = self._keys[kept]
+            self._volumes = self._volumes[kept]
+            self._pannings = self._pannings[kept]
+        _, keys, volumes, pannings = note_parameters(notes, self._layers)
+        positions = self._notes.insert(notes)
+        self._keys = np.insert(self._keys, positions, keys)
+        self._volumes = np.insert(self._volumes, positions, volumes)
+        self._pannings = np.insert(self._pannings, positions, pannings)
+        self._compiled = None
+
+    def set_layers(self, layers: Sequence[Layer]) -> None:
+        """
+        Update the layer properties. Only the notes in layers whose volume or panning
+        changed have their parameters recomputed.
+        """
+        layers = [replace(layer) for layer in layers]
+        count = max(len(layers), len(self._layers))
+        default = Layer()
+        changed = []
+        audibility_changed = False
+        for id in range(count):
+            old = self._layers[id] if id < len(self._layers) else default
+            new = layers[id] if id < len(layers) else default
+            if old.volume != new.volume or old.panning != new.panning:
+                changed.append(id)
+            if old.lock != new.lock or old.solo != new.solo:
+                audibility_changed = True
+        self._layers = layers
+        if changed:
+            rows = np.flatnonzero(np.isin(self._notes.layer, changed))
+            _, _, volumes, pannings = note_parameters(self._notes._take(rows), layers)
+            self._volumes[rows] = volumes
+            self._pannings[rows] = pannings
+        if changed or audibility_changed:
+            self._compiled = None
+
+    def audible_layers(self) -> np.ndarray:
+        """
+        Return whether each layer is audible, with the current lock and solo states.
+        Layers past the end of the array have default properties and are audible
+        unless a layer is solo.
+        """
+        lock = np.array([layer.lock for layer in self._layers], dtype=bool)
+        solo = np.array([layer.solo for layer in self._layers], dtype=bool)
+        return solo if solo.any() else ~lock
+
+    def _audible(self) -> np.ndarray:
+        """Return whether each note is audible."""
+        layers = self.audible_layers()
+        solo = any(layer.solo for layer in self._layers)
+        # Notes past the last layer belong to a layer with default properties
+        padded = np.append(layers, not solo)
+        return padded[np.minimum(self._notes.layer, len(layers))]
+
+    def compiled(self) -> TimelineNotes:
+        """Return all audible notes. They're only gathered again after a change."""
+        if self._compiled is None:
+            audible = self._audible()
+            self._compiled = TimelineNotes(
+                ticks=self._notes.tick[audible],
+                layers=self._notes.layer[audible],
+                instruments=self._notes.instrument[audible],
+                keys=self._keys[audible],
+                volumes=self._volumes[audible],
+                pannings=self._pannings[audible],
+            )
+        return self._compiled
+
+    def window(self, start: float, stop: float) -> TimelineNotes:
+        """Return the audible notes with tick in [`start`, `stop`)."""
+        compiled = self.compiled()
+        first, last = np.searchsorted(compiled.ticks, (start, stop))
+        return TimelineNotes(*(column[first:last] for column in compiled))
@@ -1,15 +1,16 @@
-from pathlib import Path
+import os
+from dataclasses import replace
+from typing import List
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 from nbs.controller.clipboard import ClipboardController
-from nbs.controller.instrument import InstrumentController
+from nbs.controller.instrument import InstrumentController, InstrumentInstance
 from nbs.controller.layer import LayerController
 from nbs.controller.playback import PlaybackController
 from nbs.controller.song import SongController
-from nbs.core.audio import AudioEngine
-from nbs.core.context import appctxt
-from nbs.core.data import Song, default_instruments
+from nbs.core.audio import AudioEngine, OutputMode
+from nbs.core.data import NoteTable, Song, default_instruments, note_batch
 from nbs.core.file import load_song, save_song
 from nbs.ui.actions import (
     Actions,
@@ -23,14 +24,24 @@ from nbs.ui.status_bar import StatusBar
 from nbs.ui.toolbar import *
 from nbs.ui.workspace import *
 from nbs.ui.workspace.layers import LayerArea
-from nbs.ui.workspace.note_blocks import NoteBlockArea
+from nbs.ui.workspace.minimap import Minimap
+from nbs.ui.workspace.note_blocks import NoteBlockArea, RenderMode
 from nbs.ui.workspace.piano import HorizontalAutoScrollArea, PianoWidget
 from nbs.ui.workspace.time_bar import TimeBar
 from nbs.ui.workspace.workspace import Workspace
 
+# Notes are dropped if playback falls behind them by more than this many seconds
+PLAYBACK_LATE_THRESHOLD = 0.25
+
 
 class MainWindow(QtWidgets.QMainWindow):
-    soundLoadRequested = QtCore.pyqtSignal(str)
+    instrumentSoundsChanged = QtCore.pyqtSignal(list)
+    playbackNotesChanged = QtCore.pyqtSignal(object, list)
+    playbackLayersChanged = QtCore.pyqtSignal(list)
+    playbackTicksChanged = QtCore.pyqtSignal(list, object)
+    notesPlayRequested = QtCore.pyqtSignal(object)
+    notesPreviewRequested = QtCore.pyqtSignal(object)
+    playbackLateThresholdChanged = QtCore.pyqtSignal(object)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -52,12 +63,34 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def initAudio(self):
         self.audioThread = QtCore.QThread()
-        self.audioEngine = AudioEngine()
+        # e.g. NBS_AUDIO_OUTPUT=software_mixer to mix all sounds into a single stream
+        outputMode = OutputMode.__members__.get(
+            os.environ.get("NBS_AUDIO_OUTPUT", "").upper(), OutputMode.PER_SOURCE
+        )
+        # Playback positions are only worth reporting as often as they can be shown
+        refreshRate = QtWidgets.QApplication.primaryScreen().refreshRate()
+        # Decoded instrument sounds are kept on disk, so they load faster next time
+        cacheDir = QtCore.QStandardPaths.writableLocation(
+            QtCore.QStandardPaths.StandardLocation.CacheLocation
+        )
+        self.audioEngine = AudioEngine(
+            output_mode=outputMode,
+            position_update_rate=refreshRate or 60,
+            cache_dir=os.path.join(cacheDir, "sounds") if cacheDir else None,
+        )
         self.audioEngine.moveToThread(self.audioThread)
         self.audioThread.started.connect(self.audioEngine.run)
         QtCore.QCoreApplication.instance().aboutToQuit.connect(self.audioEngine.stop)
         self.audioEngine.finished.connect(self.audioThread.quit)
-        self.soundLoadRequested.connect(self.audioEngine.loadSound)
+        self.instrumentSoundsChanged.connect(self.audioEngine.setInstrumentSounds)
+        self.playbackNotesChanged.connect(self.audioEngine.setPlaybackNotes)
+        self.playbackLayersChanged.connect(self.audioEngine.setPlaybackLayers)
+        self.playbackTicksChanged.connect(self.audioEngine.replacePlaybackTicks)
+        # Notes cross to the audio thread as one packed batch per played tick
+        self.notesPlayRequested.connect(self.audioEngine.playNotes)
+        self.notesPreviewRequested.connect(self.audioEngine.previewNotes)
+        self.playbackLateThresholdChanged.connect(self.audioEngine.setLateThreshold)
+        self.playbackLateThresholdChanged.emit(PLAYBACK_LATE_THRESHOLD)
         self.audioThread.start()
 
     def initControllers(self):
@@ -90,17 +123,29 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setStatusBar(self.statusBar)
 
         self.audioEngine.soundCountUpdated.connect(self.statusBar.setSoundCount)
+        self.audioEngine.voiceCountersUpdated.connect(self.statusBar.setVoiceCounters)
+        self.audioEngine.soundMemoryChanged.connect(self.statusBar.setSoundMemory)
+        self.audioEngine.soundLoaded.connect(self.statusBar.setSoundLoaded)
 
         self.noteBlockAreaCtxMenu = EditMenu(isContextMenu=True)
+        # e.g. NBS_RENDER_MODE=virtual to only create items for the notes being
+        # interacted with, which loads large songs faster
+        renderMode = RenderMode.__members__.get(
+            os.environ.get("NBS_RENDER_MODE", "").upper(), RenderMode.ITEMS
+        )
         self.noteBlockArea = NoteBlockArea(
-            layers=self.layers, menu=self.noteBlockAreaCtxMenu
+            layers=self.layers, menu=self.noteBlockAreaCtxMenu, renderMode=renderMode
         )
         self.layerArea = LayerArea()
         self.timeBar = TimeBar()
         self.piano = PianoWidget(keyCount=88, offset=9, validRange=(33, 57))
         self.pianoContainer = HorizontalAutoScrollArea()
 
-        self.workspace = Workspace(self.noteBlockArea, self.layerArea, self.timeBar)
+        self.minimap = Minimap(self.noteBlockArea)
+
+        self.workspace = Workspace(
+            self.noteBlockArea, self.layerArea, self.timeBar, self.minimap
+        )
         self.centralArea = CentralArea(self.workspace, self.piano, self.pianoContainer)
 
         self.setCentralWidget(self.centralArea)
@@ -156,15 +201,31 @@ class MainWindow(QtWidgets.QMainWindow):
             self.playbackController.setPlaybackPosition
         )
 
+        # During playback, the audio engine schedules the notes ahead of time
+        pc = self.playbackController
+        pc.playbackStarted.connect(self.audioEngine.startPlayback)
+        pc.playbackPaused.connect(self.audioEngine.pausePlayback)
+        pc.playbackSought.connect(self.audioEngine.seekPlayback)
+        pc.tempoChanged.connect(self.audioEngine.setTempo)
+        self.audioEngine.playbackPositionChanged.connect(pc.updatePlaybackPosition)
+        # Its timeline is kept in sync with the scene: in full when a song is loaded,
+        # then only in the ticks edited
+        self.noteBlockArea.notesLoaded.connect(self.updatePlaybackNotes)
+        self.noteBlockArea.ticksEdited.connect(self.updatePlaybackTicks)
+
+        # The scene catches up on the ticks skipped between frames during playback, so
+        # none of their blocks and keys miss their glow
+        pc.playbackStarted.connect(lambda: self.noteBlockArea.setPlaying(True))
+        pc.playbackPaused.connect(lambda: self.noteBlockArea.setPlaying(False))
+        pc.playbackSought.connect(self.noteBlockArea.seekPlayback)
+
         # Sounds
         self.noteBlockArea.blockAdded.connect(
-            lambda ins, key: self.audioEngine.playSound(ins, 1.0, key - 45, 0)
-        )
-        self.noteBlockArea.tickPlayed.connect(
-            lambda sounds: self.audioEngine.playSounds(
-                ((ins, vol, key - 45, pan) for ins, key, vol, pan in sounds)
+            lambda note: self.notesPlayRequested.emit(
+                note_batch([note.instrument], [note.key + note.pitch / 100], [1], [0])
             )
         )
+        self.noteBlockArea.tickPlayed.connect(self.playTickSounds)
 
     def initLayers(self):
         lm = self.layerManager
@@ -208,6 +269,18 @@ class MainWindow(QtWidgets.QMainWindow):
         lm.layerSwapped.connect(nba.swapLayers)
         lm.layerLockChanged.connect(nba.setLayerLock)
         lm.layerSoloChanged.connect(nba.setLayerSolo)
+        lm.layerVolumeChanged.connect(nba.setLayerVolume)
+        lm.layerPanningChanged.connect(nba.setLayerPanning)
+
+        # Keep the layers the scheduled notes are played with up to date. Only the
+        # notes in layers whose volume or panning changed are compiled again
+        lm.layerAdded.connect(self.updatePlaybackLayers)
+        lm.layerRemoved.connect(self.updatePlaybackLayers)
+        lm.layerSwapped.connect(self.updatePlaybackLayers)
+        lm.layerVolumeChanged.connect(self.updatePlaybackLayers)
+        lm.layerPanningChanged.connect(self.updatePlaybackLayers)
+        lm.layerLockChanged.connect(self.updatePlaybackLayers)
+        lm.layerSoloChanged.connect(self.updatePlaybackLayers)
 
     def initTimeBar(self):
         tb = self.timeBar
@@ -228,18 +301,17 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Sounds
         self.piano.activeKeyChanged.connect(
-            lambda key: self.audioEngine.playSound(
-                self.instrumentController.currentInstrument,
-                1.0,
-                key - 45,
-                0,
+            lambda key: self.notesPlayRequested.emit(
+                note_batch(
+                    [self.instrumentController.currentInstrument], [key], [1], [0]
+                )
             )
         )
 
         # Playback
         # TODO: NoteBlockArea sends key and pitch combined into a single float. Needs to be split
         self.noteBlockArea.tickPlayed.connect(
-            lambda sounds: self.piano.playKeys((int(key)) for _, key, _, _ in sounds)
+            lambda notes: self.piano.playKeys(notes["key"].astype(int).tolist())
         )
 
     def initInstruments(self):
@@ -249,11 +321,8 @@ class MainWindow(QtWidgets.QMainWindow):
         changeInsManager = self.changeInstrumentActionManager
 
         # Audio engine
-        for ins in default_instruments:
-            sound_path = appctxt.get_resource(Path("sounds", ins.sound_path))
-            self.soundLoadRequested.emit(sound_path)
-
-        control.instrumentSoundLoadRequested.connect(self.soundLoadRequested)
+        control.instrumentListUpdated.connect(self.updateInstrumentSounds)
+        self.updateInstrumentSounds(control.instruments)
 
         # Set up initial state
         control.setCurrentInstrument(0)
@@ -273,8 +342,8 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Instrument bar
         self.instrumentBar.instrumentButtonPressed.connect(
-            lambda id_: self.audioEngine.playSound(
-                id_, 1.0, self.piano.activeKey - 45, 0
+            lambda id_: self.notesPlayRequested.emit(
+                note_batch([id_], [self.piano.activeKey], [1], [0])
             )
         )
         control.instrumentListUpdated.connect(
@@ -315,6 +384,41 @@ class MainWindow(QtWidgets.QMainWindow):
             self.instrumentSettingsDialog.show
         )
 
+    @QtCore.pyqtSlot(list)
+    def updateInstrumentSounds(self, instruments: List[InstrumentInstance]) -> None:
+        """Send the sound of each instrument, keyed by its UUID, to the audio engine."""
+        self.instrumentSoundsChanged.emit(
+            [
+                (str(ins.uuid), str(ins.absSoundPath) if ins.sound_path else "")
+                for ins in instruments
+            ]
+        )
+
+    @QtCore.pyqtSlot()
+    def updatePlaybackNotes(self):
+        """Send a snapshot of the song's notes and layers to the audio engine."""
+        notes = NoteTable(self.noteBlockArea.getNoteData())
+        layers = [replace(layer) for layer in self.layers]
+        self.playbackNotesChanged.emit(notes, layers)
+
+    @QtCore.pyqtSlot(list)
+    def updatePlaybackTicks(self, ticks: List[int]) -> None:
+        """Send the notes in the ticks edited to the audio engine's playback timeline."""
+        self.playbackTicksChanged.emit(ticks, self.noteBlockArea.getNotesInTicks(ticks))
+
+    @QtCore.pyqtSlot()
+    def updatePlaybackLayers(self) -> None:
+        """Send a copy of the layers to the audio engine's playback timeline."""
+        self.playbackLayersChanged.emit([replace(layer) for layer in self.layers])
+
+    @QtCore.pyqtSlot(object)
+    def playTickSounds(self, notes):
+        # Notes reached during playback are already scheduled by the audio engine,
+        # so only preview the ones reached by moving the playback position manually
+        if self.playbackController.isPlaying:
+            return
+        self.notesPreviewRequested.emit(notes)
+
     @QtCore.pyqtSlot()
     def loadSong(self):
         filename = getLoadSongDialog()
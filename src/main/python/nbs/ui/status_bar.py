@@ -35,6 +35,10 @@ class StatusBar(QtWidgets.QStatusBar):
         self.soundsLabel.setText("Sounds: 0 / 256")
         self.addPermanentWidget(self.soundsLabel, stretch=5)
 
+        self.soundMemoryLabel = QtWidgets.QLabel()
+        self.soundMemoryLabel.setText("Sound memory: 0.0 MB")
+        self.addPermanentWidget(self.soundMemoryLabel, stretch=5)
+
         self.midiDevicesLabel = QtWidgets.QLabel()
         self.midiDevicesLabel.setText("No connected MIDI devices")
         self.addWidget(self.midiDevicesLabel, stretch=10)
@@ -79,6 +83,23 @@ class StatusBar(QtWidgets.QStatusBar):
             self.soundsLabel.setStyleSheet("color: black")
         self.soundsLabel.setText(f"Sounds: {sounds} / 256")
 
+    @QtCore.pyqtSlot(int, int)
+    def setVoiceCounters(self, stolen: int, dropped: int):
+        self.soundsLabel.setToolTip(
+            f"Stolen voices: {stolen}\nDropped voices: {dropped}"
+        )
+
+    @QtCore.pyqtSlot(int)
+    def setSoundMemory(self, nbytes: int):
+        self.soundMemoryLabel.setText(f"Sound memory: {nbytes / 2**20:.1f} MB")
+
+    @QtCore.pyqtSlot(int, bool)
+    def setSoundLoaded(self, instrument: int, loaded: bool):
+        if not loaded:
+            self.showMessage(
+                f"Failed to load the sound of instrument {instrument + 1}", 5000
+            )
+
     @QtCore.pyqtSlot(list)
     def setMidiDevices(self, devices: List[str]):
         if not devices:
@@ -0,0 +1,205 @@
+"""
+An overview of a whole song, which doubles as a control to scroll the workspace.
+
+Even fully zoomed out, the note block view only shows part of a long song. The
+minimap shows all of it as a density image: ticks are binned into columns, and each
+pixel is shaded by the number of notes in its bin of a layer. The counts are binned
+from the note index with NumPy, and wrap a single `QImage`, which is then only
+updated in the columns of the ticks edited.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from .constants import *
+from .note_blocks import NoteBlockArea
+
+__all__ = ["Minimap"]
+
+
+# Ticks binned into each column of the density image
+MINIMAP_BIN_TICKS = 4
+MINIMAP_HEIGHT = 48
+
+MINIMAP_BACKGROUND_COLOR = QtGui.QColor(32, 32, 32)
+MINIMAP_NOTE_COLOR = QtGui.QColor(120, 200, 255)
+MINIMAP_FRAME_COLOR = QtCore.Qt.white
+# Even a single note in a bin is drawn at this opacity, so it doesn't go unnoticed
+MINIMAP_MIN_NOTE_ALPHA = 80
+
+
+def getDensityPalette(color: QtGui.QColor, levels: int) -> np.ndarray:
+    """
+    Return the ARGB pixels of bins holding 0 to `levels` notes: transparent when
+    empty, then increasingly opaque shades of `color`.
+    """
+    alphas = np.linspace(MINIMAP_MIN_NOTE_ALPHA, 255, levels).round().astype(np.uint32)
+    palette = np.zeros(levels + 1, dtype=np.uint32)
+    palette[1:] = (alphas << 24) | (color.rgb() & 0xFFFFFF)
+    return palette
+
+
+DENSITY_PALETTE = getDensityPalette(MINIMAP_NOTE_COLOR, MINIMAP_BIN_TICKS)
+
+
+class Minimap(QtWidgets.QWidget):
+    """
+    A density image of every note in a `NoteBlockArea`, with a frame around the part
+    shown by its view. Clicking or dragging over it centers the view there.
+    """
+
+    def __init__(self, noteBlockArea: NoteBlockArea, parent=None):
+        super().__init__(parent)
+        self.noteBlockArea = noteBlockArea
+        self.view = noteBlockArea.view
+        # Notes per (layer, column). Both grow with headroom as the song does, so
+        # that editing past its end doesn't rebuild the image every time
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+        self.pixels = np.zeros((0, 0), dtype=np.uint32)
+        self.image = QtGui.QImage()
+        self.setFixedHeight(MINIMAP_HEIGHT)
+        self.setCursor(QtCore.Qt.PointingHandCursor)
+
+        noteBlockArea.notesLoaded.connect(self.rebuild)
+        noteBlockArea.ticksEdited.connect(self.updateTicks)
+        noteBlockArea.sceneRectChanged.connect(self.updateFrame)
+        self.view.horizontalScrollBar().valueChanged.connect(self.updateFrame)
+        self.view.verticalScrollBar().valueChanged.connect(self.updateFrame)
+        self.view.scaleChanged.connect(self.updateFrame)
+        self.rebuild()
+
+    ########## DENSITY IMAGE ##########
+
+    @staticmethod
+    def countNotes(
+        layers: np.ndarray, columns: np.ndarray, shape: Tuple[int, int]
+    ) -> np.ndarray:
+        """Return the number of notes in each (layer, column) of an array of `shape`."""
+        rows, columnCount = shape
+        bins = layers * columnCount + columns
+        return np.bincount(bins, minlength=rows * columnCount).reshape(shape)
+
+    @staticmethod
+    def getPositions(blocks: List) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the ticks and layers of entries in the note index."""
+        count = len(blocks)
+        ticks = np.fromiter((block.tick for block in blocks), np.int64, count)
+        layers = np.fromiter((block.layer for block in blocks), np.int64, count)
+        return ticks, layers
+
+    def reserveBins(self, rows: int, columns: int) -> None:
+        """Make room for the bins up to `rows` and `columns`, keeping the counts."""
+        oldRows, oldColumns = self.counts.shape
+        if rows <= oldRows and columns <= oldColumns:
+            return
+        counts = np.zeros(
+            (max(rows, oldRows * 2), max(columns, oldColumns * 2)), dtype=np.int64
+        )
+        counts[:oldRows, :oldColumns] = self.counts
+        self.counts = counts
+        self.updatePixels()
+
+    def updatePixels(self) -> None:
+        """Shade every bin, and wrap the pixels in a new image."""
+        self.pixels = DENSITY_PALETTE[np.minimum(self.counts, MINIMAP_BIN_TICKS)]
+        rows, columns = self.pixels.shape
+        if not self.pixels.size:
+            self.image = QtGui.QImage()
+            return
+        self.image = QtGui.QImage(
+            self.pixels.data, columns, rows, columns * 4, QtGui.QImage.Format_ARGB32
+        )
+
+    @QtCore.pyqtSlot()
+    def rebuild(self) -> None:
+        """Bin every note in the song again."""
+        ticks, layers = self.getPositions(list(self.noteBlockArea.grid))
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+        if len(ticks):
+            self.reserveBins(layers.max() + 1, ticks.max() // MINIMAP_BIN_TICKS + 1)
+            self.counts = self.countNotes(
+                layers, ticks // MINIMAP_BIN_TICKS, self.counts.shape
+            )
+        self.updatePixels()
+        self.update()
+
+    @QtCore.pyqtSlot(list)
+    def updateTicks(self, ticks: List[int]) -> None:
+        """Bin the notes in the columns of `ticks` again."""
+        columns = np.unique(np.array(ticks, dtype=np.int64) // MINIMAP_BIN_TICKS)
+        grid = self.noteBlockArea.grid
+        blocks = [
+            block
+            for column in columns.tolist()
+            for tick in range(
+                column * MINIMAP_BIN_TICKS, (column + 1) * MINIMAP_BIN_TICKS
+            )
+            for block in grid.in_tick(tick)
+        ]
+        ticks, layers = self.getPositions(blocks)
+        self.reserveBins(layers.max() + 1 if len(layers) else 0, columns.max() + 1)
+        # Only the columns edited are counted, as columns of their own
+        self.counts[:, columns] = self.countNotes(
+            layers,
+            np.searchsorted(columns, ticks // MINIMAP_BIN_TICKS),
+            (self.counts.shape[0], len(columns)),
+        )
+        # Shading in place also updates the image, which shares its pixels
+        self.pixels[:, columns] = DENSITY_PALETTE[
+            np.minimum(self.counts[:, columns], MINIMAP_BIN_TICKS)
+        ]
+        self.update()
+
+    ########## PAINTING ##########
+
+    def getSceneTransform(self) -> QtGui.QTransform:
+        """Return the transform mapping the whole scene to the minimap."""
+        sceneRect = self.noteBlockArea.sceneRect()
+        transform = QtGui.QTransform.fromScale(
+            self.width() / sceneRect.width(), self.height() / sceneRect.height()
+        )
+        return transform.translate(-sceneRect.x(), -sceneRect.y())
+
+    def paintEvent(self, event: QtGui.QPaintEvent) -> None:
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), MINIMAP_BACKGROUND_COLOR)
+        painter.setTransform(self.getSceneTransform())
+        rows, columns = self.counts.shape
+        target = QtCore.QRectF(
+            0, 0, columns * MINIMAP_BIN_TICKS * BLOCK_SIZE, rows * BLOCK_SIZE
+        )
+        painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
+        painter.drawImage(target, self.image)
+
+        pen = QtGui.QPen(MINIMAP_FRAME_COLOR)
+        pen.setCosmetic(True)
+        painter.setPen(pen)
+        painter.setBrush(QtCore.Qt.NoBrush)
+        painter.drawRect(self.getVisibleSceneRect())
+        painter.end()
+
+    @QtCore.pyqtSlot()
+    def updateFrame(self) -> None:
+        """Repaint the frame around the part of the scene shown by the view."""
+        self.update()
+
+    def getVisibleSceneRect(self) -> QtCore.QRectF:
+        """Return the part of the scene shown by the view."""
+        return self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+
+    ########## NAVIGATION ##########
+
+    def scrollTo(self, pos: QtCore.QPoint) -> None:
+        """Center the view on the part of the song at `pos` in the minimap."""
+        transform, _ = self.getSceneTransform().inverted()
+        self.view.centerOn(transform.map(QtCore.QPointF(pos)))
+
+    def mousePressEvent(self, event: QtGui.QMouseEvent) -> None:
+        if event.button() == QtCore.Qt.LeftButton:
+            self.scrollTo(event.pos())
+
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent) -> None:
+        if event.buttons() & QtCore.Qt.LeftButton:
+            self.scrollTo(event.pos())
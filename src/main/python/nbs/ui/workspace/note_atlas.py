@@ -0,0 +1,234 @@
+"""
+Prebuilt images of every look a note block can have.
+
+A note block's look only depends on its instrument's color, its key, and whether
+the key is out of range. Rather than rendering and caching each look on demand, under
+a string key, every look is rendered at once into an atlas: a single image per zoom
+level, where each look is a cell addressed by an integer index. Painting a block is
+then a single blit from the atlas.
+
+Atlases are rendered into `QImage`s on a background thread, as `QPixmap`s can only
+be used on the GUI thread, and only converted to a pixmap once they're needed.
+
+The atlas is only used at medium zoom levels (see `DetailLevel`): blocks too small to
+read are drawn as flat rects in their instrument's color, and blocks larger than the
+largest atlas are rendered directly, so their text stays crisp.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+from typing import Dict, List, NamedTuple, Optional
+
+from PyQt5 import QtCore, QtGui
+
+from nbs.core.context import appctxt
+from nbs.core.data import default_instruments
+
+from .constants import *
+
+__all__ = [
+    "Atlas",
+    "DetailLevel",
+    "FLAT_COLORS",
+    "NoteBlockAtlas",
+    "NOTE_BLOCK_ATLAS",
+    "atlasIndex",
+    "getClicks",
+    "getDetailLevel",
+    "getLabel",
+    "renderNoteBlock",
+]
+
+
+NOTE_BLOCK_IMAGE = QtGui.QImage(appctxt.get_resource("images/note_block_grayscale.png"))
+
+instrument_data = default_instruments  # TODO: replace with actual data
+
+LABEL_COLOR = QtCore.Qt.yellow
+NUMBER_COLOR = QtCore.Qt.white
+FONT_POINT_SIZE = 9  # at BLOCK_SIZE
+
+# Keys 0 to 87 (A0 to C8) are covered by the atlas. Instruments past the first 16
+# share the color of the last one, as in `NoteBlock`
+KEY_COUNT = 88
+COLOR_COUNT = 16
+
+# The size in pixels of the blocks in each atlas. A block drawn at another size is
+# scaled down from the next larger atlas
+ATLAS_BLOCK_SIZES = (16, 32, 64)
+
+# Blocks smaller than this on screen, in pixels, are drawn without details
+FLAT_DETAIL_MAX_BLOCK_SIZE = 12
+
+FLAT_COLORS = [
+    QtGui.QColor(*instrument.color) for instrument in instrument_data[:COLOR_COUNT]
+]
+
+
+class DetailLevel(Enum):
+    """How note blocks are drawn, depending on their size on screen."""
+
+    FLAT = 0  # Plain rects in the color of their instrument
+    PIXMAP = 1  # Cells of the atlas
+    VECTOR = 2  # Rendered directly, with text drawn at the screen's resolution
+
+
+def getDetailLevel(blockSize: float) -> DetailLevel:
+    """Return the detail level of blocks `blockSize` pixels wide on screen."""
+    if blockSize < FLAT_DETAIL_MAX_BLOCK_SIZE:
+        return DetailLevel.FLAT
+    if blockSize > ATLAS_BLOCK_SIZES[-1]:
+        return DetailLevel.VECTOR
+    return DetailLevel.PIXMAP
+
+
+def getLabel(key: int) -> str:
+    """Return the name and octave of a key, as shown on note blocks."""
+    octave, key = divmod(key + 9, 12)
+    label = KEY_LABELS[key] + str(octave)
+    return label
+
+
+def getClicks(key: int) -> str:
+    """Return the number of clicks needed to tune a note block to a key."""
+    # TODO: replace hardcoded values with the note instrument's valid range
+    if key < 33:
+        return "<"
+    elif key > 57:
+        return ">"
+    else:
+        return str(key - 33)
+
+
+def atlasIndex(instrument: int, key: int, isOutOfRange: bool = False) -> int:
+    """Return the cell of a note block's look in the atlas, or -1 if it has none."""
+    if not 0 <= key < KEY_COUNT:
+        return -1
+    return (min(instrument, COLOR_COUNT - 1) * 2 + isOutOfRange) * KEY_COUNT + key
+
+
+def renderNoteBlock(
+    painter: QtGui.QPainter,
+    rect: QtCore.QRect,
+    instrument: int,
+    key: int,
+    isOutOfRange: bool = False,
+) -> None:
+    """Draw the look of a note block in `rect`. Safe to call from any thread."""
+    painter.save()
+    painter.setClipRect(rect)
+    overlayColor = QtGui.QColor(*instrument_data[min(instrument, 15)].color)
+    painter.drawImage(rect, NOTE_BLOCK_IMAGE)
+    painter.setPen(QtCore.Qt.NoPen)
+    painter.setBrush(QtGui.QBrush(overlayColor, QtCore.Qt.SolidPattern))
+    painter.setCompositionMode(QtGui.QPainter.CompositionMode_Overlay)
+    painter.drawRect(rect)
+    painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
+
+    font = QtGui.QFont()
+    font.setPointSizeF(FONT_POINT_SIZE * rect.height() / BLOCK_SIZE)
+    painter.setFont(font)
+    topRect = QtCore.QRect(rect.x(), rect.y(), rect.width(), rect.height() // 2)
+    bottomRect = topRect.translated(0, rect.height() // 2)
+    painter.setPen(LABEL_COLOR)
+    painter.drawText(
+        topRect, QtCore.Qt.AlignHCenter + QtCore.Qt.AlignBottom, getLabel(key)
+    )
+    painter.setPen(NUMBER_COLOR)
+    painter.drawText(
+        bottomRect, QtCore.Qt.AlignHCenter + QtCore.Qt.AlignTop, getClicks(key)
+    )
+
+    if isOutOfRange:
+        painter.setPen(QtCore.Qt.red)
+        painter.setBrush(QtCore.Qt.NoBrush)
+        painter.drawRect(rect.adjusted(0, 0, -1, -1))
+    painter.restore()
+
+
+def renderAtlas(blockSize: int) -> QtGui.QImage:
+    """Render every look of a note block into a grid of `blockSize`-pixel cells."""
+    image = QtGui.QImage(
+        KEY_COUNT * blockSize,
+        COLOR_COUNT * 2 * blockSize,
+        QtGui.QImage.Format_ARGB32_Premultiplied,
+    )
+    image.fill(QtCore.Qt.transparent)
+    painter = QtGui.QPainter(image)
+    for instrument in range(COLOR_COUNT):
+        for isOutOfRange in (False, True):
+            for key in range(KEY_COUNT):
+                renderNoteBlock(
+                    painter,
+                    cellRect(atlasIndex(instrument, key, isOutOfRange), blockSize),
+                    instrument,
+                    key,
+                    isOutOfRange,
+                )
+    painter.end()
+    return image
+
+
+def cellRect(index: int, blockSize: int) -> QtCore.QRect:
+    row, column = divmod(index, KEY_COUNT)
+    return QtCore.QRect(column * blockSize, row * blockSize, blockSize, blockSize)
+
+
+class Atlas(NamedTuple):
+    """An atlas ready to paint from, with the source rect of each of its cells."""
+
+    pixmap: QtGui.QPixmap
+    rects: List[QtCore.QRectF]
+
+
+class NoteBlockAtlas:
+    """
+    The atlases of note block looks, one per size in `ATLAS_BLOCK_SIZES`. They're
+    built in the background, starting with `prepare` or on first use.
+    """
+
+    def __init__(self) -> None:
+        self._atlases: Dict[int, Atlas] = {}
+        self._builds: Dict[int, Future] = {}
+        self._builder = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="NoteBlockAtlas"
+        )
+
+    @staticmethod
+    def levelFor(blockSize: float) -> int:
+        """Return the size of the atlas to draw blocks `blockSize` pixels wide from."""
+        for level in ATLAS_BLOCK_SIZES:
+            if blockSize <= level:
+                return level
+        return ATLAS_BLOCK_SIZES[-1]
+
+    def prepare(self, blockSize: float = BLOCK_SIZE) -> None:
+        """Start building the atlas for blocks `blockSize` pixels wide, if needed."""
+        level = self.levelFor(blockSize)
+        if level not in self._atlases and level not in self._builds:
+            self._builds[level] = self._builder.submit(renderAtlas, level)
+
+    def get(self, blockSize: float = BLOCK_SIZE, wait: bool = False) -> Optional[Atlas]:
+        """
+        Return the atlas for blocks `blockSize` pixels wide. Unless `wait` is set,
+        return None if it isn't built yet, and start building it if needed.
+        """
+        level = self.levelFor(blockSize)
+        atlas = self._atlases.get(level)
+        if atlas is not None:
+            return atlas
+        self.prepare(blockSize)
+        build = self._builds[level]
+        if not (wait or build.done()):
+            return None
+        pixmap = QtGui.QPixmap.fromImage(build.result())
+        rects = [
+            QtCore.QRectF(cellRect(index, level))
+            for index in range(COLOR_COUNT * 2 * KEY_COUNT)
+        ]
+        atlas = self._atlases[level] = Atlas(pixmap, rects)
+        del self._builds[level]
+        return atlas
+
+
+NOTE_BLOCK_ATLAS = NoteBlockAtlas()
@@ -6,29 +6,66 @@ import time
 from copy import copy
 from dataclasses import dataclass
 from enum import Enum
-from typing import Callable, Dict, Generator, List, Optional, Sequence, Set, Union
+from typing import (
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+)
 
+import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
 
-from nbs.core.context import appctxt
-from nbs.core.data import Instrument, Layer, Note, default_instruments
+from nbs.core.data import (
+    Instrument,
+    Layer,
+    Note,
+    NoteTable,
+    default_instruments,
+    note_batch,
+)
+from nbs.core.grid import GridIndex
+from nbs.core.timeline import PlaybackTimeline
 from nbs.core.utils import *
 from nbs.ui.utils.cache import ScrollingPaintCache
 
 from .constants import *
+from .note_atlas import (
+    FLAT_COLORS,
+    NOTE_BLOCK_ATLAS,
+    DetailLevel,
+    atlasIndex,
+    getClicks,
+    getDetailLevel,
+    getLabel,
+    renderNoteBlock,
+)
 
-__all__ = ["NoteBlockArea"]
+__all__ = ["NoteBlockArea", "RenderMode"]
 
 
+# Only used for the blocks whose look isn't in the atlas, e.g. with keys outside the
+# piano's range, and while the atlas is being built
 PIXMAP_CACHE = QtGui.QPixmapCache()
-NOTE_BLOCK_PIXMAP = QtGui.QPixmap(
-    appctxt.get_resource("images/note_block_grayscale.png")
-)
+
+# The colors of `FLAT_COLORS` as 32-bit ARGB pixels
+FLAT_PIXELS = np.array([color.rgba() for color in FLAT_COLORS], dtype=np.uint32)
 
 BLOCK_GLOW_DURATION_SECS = 1.0
 BLOCK_GLOW_MAX_OPACITY = 1.0
 BLOCK_GLOW_BASE_OPACITY = 0.6
 BLOCK_GLOW_HOVER_OPACITY = 1.0
+# The glow fades slowly enough that updating it at 30 fps looks as smooth as at 60
+BLOCK_GLOW_FRAME_INTERVAL_MSECS = 33
+
+# While the marker is dragged, the view only scrolls to follow it once it has
+# stopped moving for this long
+SCRUB_SCROLL_DELAY_MSECS = 150
 
 
 instrument_data = default_instruments  # TODO: replace with actual data
@@ -140,6 +177,8 @@ class TimeRuler(QtWidgets.QWidget):
 
 class Marker(QtWidgets.QWidget):
     moved = QtCore.pyqtSignal(float)
+    dragStarted = QtCore.pyqtSignal()
+    dragFinished = QtCore.pyqtSignal()
 
     def __init__(self, parent: Optional[QtCore.QObject] = None) -> None:
         super().__init__(parent)
@@ -173,6 +212,14 @@ class Marker(QtWidgets.QWidget):
         path.addRegion(region)
         return path
 
+    def mousePressEvent(self, event: QtGui.QMouseEvent) -> None:
+        if event.button() == QtCore.Qt.MouseButton.LeftButton:
+            self.dragStarted.emit()
+
+    def mouseReleaseEvent(self, event: QtGui.QMouseEvent) -> None:
+        if event.button() == QtCore.Qt.MouseButton.LeftButton:
+            self.dragFinished.emit()
+
     def mouseMoveEvent(self, event: QtGui.QMouseEvent) -> None:
         # The event pos is relative to the bounding box of the widget, so we calculate
         # how much it should move based on how far from the center the mouse moved
@@ -216,6 +263,13 @@ class ScrollMode(Enum):
     TICK_BY_TICK = 2
 
 
+class RenderMode(Enum):
+    """How `NoteBlockArea` draws the notes in a song."""
+
+    ITEMS = 0  # One `NoteBlock` item per note
+    VIRTUAL = 1  # Notes drawn from the grid index, with items only where needed
+
+
 class NoteBlockView(QtWidgets.QGraphicsView):
     scaleChanged = QtCore.pyqtSignal(float)
     playbackPositionChanged = QtCore.pyqtSignal(float)
@@ -226,6 +280,11 @@ class NoteBlockView(QtWidgets.QGraphicsView):
         self.scrollMode = ScrollMode.PAGE_BY_PAGE
         self.ruler = TimeRuler(parent=self)
         self.marker = Marker(parent=self)
+        self.isScrubbing = False
+        self.scrubScrollTimer = QtCore.QTimer(self)
+        self.scrubScrollTimer.setSingleShot(True)
+        self.scrubScrollTimer.setInterval(SCRUB_SCROLL_DELAY_MSECS)
+        self.scrubScrollTimer.timeout.connect(self.scrollToMarker)
 
         self.setViewportMargins(0, 32, 0, 0)
         self.setTransformationAnchor(
@@ -243,6 +302,8 @@ class NoteBlockView(QtWidgets.QGraphicsView):
 
         self.ruler.clicked.connect(self.playbackPositionChanged)
         self.marker.moved.connect(self.playbackPositionChanged)
+        self.marker.dragStarted.connect(self.startScrubbing)
+        self.marker.dragFinished.connect(self.finishScrubbing)
 
     @QtCore.pyqtSlot(float)
     def setTempo(self, tempo: float) -> None:
@@ -252,7 +313,25 @@ class NoteBlockView(QtWidgets.QGraphicsView):
     def setPlaybackPosition(self, tick):
         self.marker.setTick(tick)
         self.scene().doPlayback(tick)
-        self.updateScroll(int(tick * BLOCK_SIZE))
+        if self.isScrubbing:
+            # Scrolling repaints the whole viewport, so wait until the marker stops
+            self.scrubScrollTimer.start()
+        else:
+            self.updateScroll(int(tick * BLOCK_SIZE))
+
+    @QtCore.pyqtSlot()
+    def startScrubbing(self) -> None:
+        self.isScrubbing = True
+
+    @QtCore.pyqtSlot()
+    def finishScrubbing(self) -> None:
+        self.isScrubbing = False
+        self.scrubScrollTimer.stop()
+        self.scrollToMarker()
+
+    @QtCore.pyqtSlot()
+    def scrollToMarker(self) -> None:
+        self.updateScroll(int(self.marker.tick * BLOCK_SIZE))
 
     @QtCore.pyqtSlot()
     def setScale(self, value):
@@ -344,12 +423,22 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
     selectAllRightActionEnabled = QtCore.pyqtSignal(bool)
     blockCountChanged = QtCore.pyqtSignal(int)
     blockAdded = QtCore.pyqtSignal(object)
-    tickPlayed = QtCore.pyqtSignal(list)
+    tickPlayed = QtCore.pyqtSignal(object)
+    # The ticks where notes were added, moved or removed, once per batch of edits
+    ticksEdited = QtCore.pyqtSignal(list)
+    notesLoaded = QtCore.pyqtSignal()
 
-    def __init__(self, layers: List[Layer], menu: QtWidgets.QMenu, parent=None):
+    def __init__(
+        self,
+        layers: List[Layer],
+        menu: QtWidgets.QMenu,
+        parent=None,
+        renderMode: RenderMode = RenderMode.ITEMS,
+    ):
         super().__init__(parent, objectName=__class__.__name__)
         self.view = NoteBlockView(self)
         self.layers = layers  # read-only!
+        self.renderMode = renderMode
         self.menu = menu
         self.selection = QtWidgets.QRubberBand(
             QtWidgets.QRubberBand.Shape.Rectangle, parent=self.view.viewport()
@@ -360,6 +449,9 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         self.isDraggingSelection = False
         self.isClearingSelection = False
         self.isMovingBlocks = False
+        # Set while selecting blocks one by one, so the selection status is only
+        # updated once at the end instead of after every block
+        self.isSelectingBlocks = False
         self.isRemovingNote = False
         self.isClosingMenu = False
         self.isTriggeringMenu = False
@@ -367,15 +459,51 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         self.scrollSpeedX = 0
         self.scrollSpeedY = 0
         self.activeKey = 45
-        self.playingBlocks: Set[NoteBlock] = set()
+        # Played blocks glow through a single animator, rather than one animation each
+        self.glowAnimator = GlowAnimator(self)
+        self.glowAnimator.finished.connect(self.onGlowsFinished)
+        # Blocks are deleted with the scene, so their glows mustn't outlive it
+        self.destroyed.connect(self.glowAnimator.stop)
         self.previousPlaybackPosition = 0
+        self.isPlaying = False
+        # Moving the playback position by hand plays the tick reached at most once
+        # per interval (in seconds). The last tick skipped is played when it's over
+        self.previewInterval = 0.05
+        self.nextPreviewTime = 0.0
+        self.pendingPreviewTick: Optional[int] = None
+        self.previewTimer = QtCore.QTimer(self)
+        self.previewTimer.setSingleShot(True)
+        self.previewTimer.timeout.connect(self.playPendingPreview)
         self.currentInstrument = 0
         self.minimumLayerCount = 0
         self.soloLayerIds: Set[int] = set()
-        # A value of 12 will generate segments of approximately 4x4 grid spaces,
-        # which can be guaranteed to contain 0-10 notes on average.
-        # See: https://doc.qt.io/qt-6/qgraphicsscene.html#bspTreeDepth-prop
-        self.setBspTreeDepth(12)
+        # In virtual rendering mode, notes without an item are kept as plain `Note`s
+        self.grid: GridIndex[Union[NoteBlock, Note]] = GridIndex()
+        self.hoveredBlock: Optional[NoteBlock] = None
+        self.blocksToRelease: Set[NoteBlock] = set()
+        self.releaseTimer = QtCore.QTimer(self)
+        self.releaseTimer.setSingleShot(True)
+        self.releaseTimer.timeout.connect(self.releaseBlocks)
+        # Cells changed in virtual mode are repainted together, once control returns
+        # to the event loop
+        self.dirtyRect = QtCore.QRectF()
+        self.repaintTimer = QtCore.QTimer(self)
+        self.repaintTimer.setSingleShot(True)
+        # Edits are reported together too, so views of the whole song (e.g. the
+        # minimap) are updated once per batch rather than once per note
+        self.editedTicks: Set[int] = set()
+        self.editTimer = QtCore.QTimer(self)
+        self.editTimer.setSingleShot(True)
+        self.editTimer.timeout.connect(self.emitEditedTicks)
+        self.repaintTimer.timeout.connect(self.repaintDirtyRect)
+        # Blocks are looked up in `grid` rather than through Qt's BSP tree, which is
+        # costly to keep up to date as blocks are added and moved. Qt only needs to
+        # find items for painting and hover events, where a linear scan is enough.
+        # See: https://doc.qt.io/qt-5/qgraphicsscene.html#ItemIndexMethod-enum
+        self.setItemIndexMethod(QtWidgets.QGraphicsScene.ItemIndexMethod.NoIndex)
+        # Render the looks of note blocks in the background, so they're ready by the
+        # time the first blocks are painted
+        NOTE_BLOCK_ATLAS.prepare()
         self.initUI()
 
         self.fps = QtWidgets.QLabel(parent=self.view)
@@ -390,7 +518,11 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         self.timer.setInterval(250)
         self.timer.start()
 
-        self.tickIndex: Dict[int, List[NoteBlock]] = {}
+        # Notes are played from a compiled timeline, which is updated with the ticks
+        # and layers that changed since the last time it was used
+        self.timeline = PlaybackTimeline()
+        self.changedTicks: Set[int] = set()
+        self.layersChanged = False
 
         # Connect Qt's selectionChanged signal to our own slot
         # to do stuff when the selection changes
@@ -437,6 +569,9 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
             painter.drawLine(
                 x * BLOCK_SIZE, round(rect.y()), x * BLOCK_SIZE, round(rect.bottom())
             )
+        # Notes without an item are part of the background, so items are drawn above
+        if self.renderMode == RenderMode.VIRTUAL:
+            self.drawNotes(painter, rect)
 
     def drawForeground(self, painter: QtGui.QPainter, rect: QtCore.QRectF) -> None:
         self.numFrames += 1
@@ -484,9 +619,9 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         self.isTriggeringMenu = True
 
     def toggleSelectLeftRightActions(self, pos: int):
-        if not self.items():
+        if not len(self.grid):
             return
-        bbox = self.itemsBoundingRect()
+        bbox = self.blocksBoundingRect()
         self.selectAllLeftActionEnabled.emit(pos > bbox.left())
         self.selectAllRightActionEnabled.emit(pos < bbox.right())
 
@@ -502,11 +637,21 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
 
     ########## COORDINATE TRANSFORMATION ##########
 
+    def blocksBoundingRect(self) -> QtCore.QRectF:
+        """Return the smallest rect containing every block in the scene."""
+        bounds = self.grid.bounds()
+        if bounds is None:
+            return QtCore.QRectF(0, 0, 0, 0)
+        tickStart, layerStart, tickStop, layerStop = bounds
+        return QtCore.QRectF(
+            tickStart * BLOCK_SIZE,
+            layerStart * BLOCK_SIZE,
+            (tickStop - tickStart) * BLOCK_SIZE,
+            (layerStop - layerStart) * BLOCK_SIZE,
+        )
+
     def updateSceneSize(self):
-        if len(self.items()) >= 1:
-            bbox = self.itemsBoundingRect()
-        else:
-            bbox = QtCore.QRectF(0, 0, 0, 0)
+        bbox = self.blocksBoundingRect()
         viewSize = self.view.rect()
         width = math.ceil((bbox.right() + viewSize.width()) / BLOCK_SIZE)
         height = math.ceil((bbox.bottom() + viewSize.height()) / BLOCK_SIZE)
@@ -542,10 +687,19 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         """Return the top left scene position of a set of grid coordinates."""
         return QtCore.QPoint(x * BLOCK_SIZE, y * BLOCK_SIZE)
 
-    def blockAtPos(self, pos: Union[QtCore.QPoint, QtCore.QPointF]):
-        viewPos = self.view.mapFromScene(pos)
-        viewTransform = self.view.transform()
-        return self.itemAt(viewPos, viewTransform)
+    def getCellRect(self, x: int, y: int) -> QtCore.QRectF:
+        """Return the area of the scene taken by a grid cell."""
+        return QtCore.QRectF(x * BLOCK_SIZE, y * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
+
+    def blockAtPos(
+        self, pos: Union[QtCore.QPoint, QtCore.QPointF]
+    ) -> Optional[Union[NoteBlock, Note]]:
+        """
+        Return the block at a position in the scene, if any. In virtual mode, this may
+        be a `Note` without an item.
+        """
+        x, y = self.getGridPos(pos)
+        return self.grid.top(int(x), int(y))
 
     ########## SONG ##########
 
@@ -557,14 +711,28 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
 
     def loadNoteData(self, blocks: Sequence[Note]) -> None:
         self.reset()
-        for block in blocks:
-            self.addBlock(block.tick, block.layer, block)
+        if self.renderMode == RenderMode.VIRTUAL:
+            for note in blocks:
+                self.grid.add(note, note.tick, note.layer)
+            self.update()
+        else:
+            for block in blocks:
+                self.addBlock(block.tick, block.layer, block)
+        self.timeline.set_notes(NoteTable(blocks), self.layers)
+        self.changedTicks.clear()
+        self.editedTicks.clear()
+        self.editTimer.stop()
+        self.notesLoaded.emit()
         self.updateBlockCount()
         self.updateSceneSize()
 
-    def getNoteData(self) -> List[NoteBlock]:
-        blocks = [block.note for block in self.items()]
-        return blocks
+    def getNoteData(self) -> List[Note]:
+        return [self.getNote(block) for block in self.grid]
+
+    @staticmethod
+    def getNote(block: Union[NoteBlock, Note]) -> Note:
+        """Return the note of an entry in the grid, whether it has an item or not."""
+        return block.note if isinstance(block, NoteBlock) else block
 
     ########## ATOMIC OPERATIONS ##########
 
@@ -572,33 +740,60 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
     # through these methods. This is to ensure that the scene is always in a valid
     # state, and that the index is always up to date.
 
-    def _doAddBlock(self, block: NoteBlock):
+    def _doAddBlock(self, block: Union[NoteBlock, Note]):
         """Add a note block at the specified position. This operation must always
         be called when adding a block."""
-        self.addItem(block)
+        if isinstance(block, NoteBlock):
+            self.addItem(block)
+        else:
+            self.invalidateCell(block.tick, block.layer)
         tick = block.tick
-        if tick not in self.tickIndex:
-            self.tickIndex[tick] = []
-        self.tickIndex[tick].append(block)
+        self.grid.add(block, tick, block.layer)
+        self.changedTicks.add(tick)
+        self.markTickEdited(tick)
 
-    def _doMoveBlock(self, block: NoteBlock, x: int, y: int):
+    def _doMoveBlock(self, block: Union[NoteBlock, Note], x: int, y: int):
         """Move a note block by the specified number of grid spaces. This operation must always
         be called when moving a block."""
-        prevTick = block.tick
-        block.moveBy(x * BLOCK_SIZE, y * BLOCK_SIZE)
-        if x != 0:
-            self.tickIndex[prevTick].remove(block)
-            nextTick = block.tick
-            if nextTick not in self.tickIndex:
-                self.tickIndex[nextTick] = []
-            self.tickIndex[nextTick].append(block)
-
-    def _doRemoveBlock(self, block: NoteBlock):
+        prevTick, prevLayer = block.tick, block.layer
+        if isinstance(block, NoteBlock):
+            block.moveBy(x * BLOCK_SIZE, y * BLOCK_SIZE)
+        else:
+            block.tick += x
+            block.layer += y
+            self.invalidateCell(prevTick, prevLayer)
+            self.invalidateCell(block.tick, block.layer)
+        self.changedTicks.add(prevTick)
+        self.changedTicks.add(block.tick)
+        self.markTickEdited(prevTick)
+        self.markTickEdited(block.tick)
+        self.grid.move(block, prevTick, prevLayer, block.tick, block.layer)
+
+    def _doRemoveBlock(self, block: Union[NoteBlock, Note]):
         """Remove a note block from the scene. This operation must always
         be called when removing a block."""
-        self.removeItem(block)
+        if isinstance(block, NoteBlock):
+            self.removeItem(block)
+            if block is self.hoveredBlock:
+                self.hoveredBlock = None
+        else:
+            self.invalidateCell(block.tick, block.layer)
         tick = block.tick
-        self.tickIndex[tick].remove(block)
+        self.grid.remove(block, tick, block.layer)
+        self.changedTicks.add(tick)
+        self.markTickEdited(tick)
+
+    def markTickEdited(self, tick: int) -> None:
+        """Report an edit to `tick` with the others made until control returns to
+        the event loop."""
+        self.editedTicks.add(tick)
+        if not self.editTimer.isActive():
+            self.editTimer.start()
+
+    @QtCore.pyqtSlot()
+    def emitEditedTicks(self) -> None:
+        ticks, self.editedTicks = sorted(self.editedTicks), set()
+        self.ticksEdited.emit(ticks)
 
     ########## NOTE BLOCKS ##########
 
@@ -608,8 +803,9 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
 
     def clear(self):
         """Clear all note blocks in the scene."""
-        for item in self.items():
-            self._doRemoveBlock(item)
+        self.glowAnimator.stop()
+        for block in list(self.grid):
+            self._doRemoveBlock(block)
 
     def addBlock(self, x: int, y: int, note: Note) -> NoteBlock:
         """Add a note block at the specified position."""
@@ -633,23 +829,30 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
 
     def removeBlockAt(self, x: int, y: int) -> None:
         """Remove the note block at the specified position."""
-        pos = self.getScenePos(x, y)
-        itemAtPos = self.itemAt(pos, self.view.transform())
-        if itemAtPos is not None:
-            self._doRemoveBlock(itemAtPos)
+        block = self.grid.top(x, y)
+        if block is not None:
+            self._doRemoveBlock(block)
 
     def removeBlockManual(self, x: int, y: int) -> None:
         self.removeBlockAt(x, y)
         self.updateSceneSize()
 
     def updateBlockCount(self):
-        self.blockCountChanged.emit(len(self.items()))
+        self.blockCountChanged.emit(len(self.grid))
 
     ########## SELECTION ##########
 
-    def setBlocksSelected(self, blocks: Sequence[NoteBlock], selected: bool = True):
+    def setBlocksSelected(
+        self, blocks: Sequence[Union[NoteBlock, Note]], selected: bool = True
+    ):
+        self.isSelectingBlocks = True
         for block in blocks:
-            block.setSelected(selected)
+            if selected:
+                self.materialize(block).setSelected(True)
+            elif isinstance(block, NoteBlock):
+                block.setSelected(False)
+                self.releaseBlock(block)
+        self.isSelectingBlocks = False
         self.updateSelectionStatus()
 
     def setAreaSelected(
@@ -670,6 +873,11 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
             else:
                 raise TypeError("Invalid type for area:", type(area))
             selectionType = QtCore.Qt.ItemSelectionMode.IntersectsItemShape
+            if self.renderMode == RenderMode.VIRTUAL:
+                # Qt can only select items, so the notes in the area get one first.
+                # Those left unselected are released afterwards
+                for block in self.selectedItems() + self.materializeArea(path):
+                    self.releaseBlock(block)
             self.setSelectionArea(path, selectionType)
         else:
             self.setBlocksSelected(self.items(area), False)
@@ -679,10 +887,12 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         return len(self.selectedItems()) > 0
 
     def updateSelectionStatus(self):
-        if len(self.items()) == 0:
+        if self.isSelectingBlocks:
+            return
+        if len(self.grid) == 0:
             self.selectionStatus = -2
         elif self.hasSelection():
-            if len(self.selectedItems()) == len(self.items()):
+            if len(self.selectedItems()) == len(self.grid):
                 self.selectionStatus = 1
             else:
                 self.selectionStatus = 0
@@ -729,8 +939,10 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
     def deselectAll(self):  # clearSelection/placeSelection
         if self.hasSelection():
             self._clearBlocksUnderSelection()
-            # TODO: Collision check takes too long
+            blocks = self.selectedItems()
             self.clearSelection()
+            for block in blocks:
+                self.releaseBlock(block)
             self.updateSceneSize()
 
     @QtCore.pyqtSlot()
@@ -741,18 +953,35 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
             self.isClearingSelection = True
             self.deselectAll()
 
+    def collidingBlocks(self, block: NoteBlock) -> List[NoteBlock]:
+        """Return the other blocks in the same grid cell as `block`."""
+        return [
+            other
+            for other in self.grid.at(block.tick, block.layer)
+            if other is not block
+        ]
+
     def _clearBlocksUnderSelection(self):
-        for item in self.selectedItems():
-            for i in item.collidingItems():
-                self.removeBlock(i)
+        """
+        Remove the unselected blocks in the cells the selection is placed on. Each
+        selected block only looks up its own cell, so this is linear in the size of
+        the selection.
+        """
+        grid = self.grid
+        for block in self.selectedItems():
+            for other in grid.at(block.tick, block.layer):
+                if other is block:
+                    continue
+                if not (isinstance(other, NoteBlock) and other.isSelected()):
+                    self._doRemoveBlock(other)
+        self.updateBlockCount()
 
     @QtCore.pyqtSlot()
     def invertSelection(self):
-        unselected = []
-        for block in self.items():
-            if not block.isSelected():
-                unselected.append(block)
+        selected = {id(block) for block in self.selectedItems()}
+        # Placing the selection may remove blocks, so look for the others afterwards
         self.deselectAll()
+        unselected = [block for block in self.grid if id(block) not in selected]
         self.setBlocksSelected(unselected, True)
 
     def moveSelection(self, x: int, y: int):
@@ -803,14 +1032,21 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
             distance = int((-relativePosX / 2) // BLOCK_SIZE)
             self._doMoveBlock(block, distance, 0)
 
+        # Move each block that landed on another straight to the first free layer
+        # below it, rather than one layer at a time
         for block in self.selectedItems():
-            while block.collidingItems():
-                self._doMoveBlock(block, 0, 1)
+            if not self.collidingBlocks(block):
+                continue
+            tick, layer = block.tick, block.layer + 1
+            while self.grid.is_occupied(tick, layer):
+                layer += 1
+            self._doMoveBlock(block, 0, layer - block.layer)
 
     @QtCore.pyqtSlot()
     def deleteSelection(self):
         for block in self.selectedItems():
-            self.removeBlock(block)
+            self._doRemoveBlock(block)
+        self.updateBlockCount()
         self.updateSelectionStatus()
         self.updateSceneSize()
 
@@ -838,9 +1074,8 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
 
     @QtCore.pyqtSlot()
     def loadSelection(self, notes: List[Note]) -> None:
-        for note in notes:
-            block = self.addBlock(note.tick, note.layer, note)
-            block.setSelected(True)
+        blocks = [self.addBlock(note.tick, note.layer, note) for note in notes]
+        self.setBlocksSelected(blocks)
         self.updateBlockCount()
         self.updateSelectionStatus()
         self.selectionChanged_.emit(self.selectionStatus)
@@ -929,17 +1164,15 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         return region
 
     def getBlocksInLayer(self, id: int) -> List[NoteBlock]:
-        layerRegion = self.getLayerRegion(id)
-        blocks = self.items(layerRegion)
-        return blocks
+        return self.grid.in_layer(id)
 
     def getBlocksBelowLayer(self, id: int) -> List[NoteBlock]:
-        region = self.getRegionBelowLayer(id)
-        blocks = self.items(region)
-        return blocks
+        """Return the blocks in layer `id` and all layers below it."""
+        return self.grid.in_layers(id)
 
     @QtCore.pyqtSlot(int, bool)
     def setLayerLock(self, id: int, lock: bool) -> None:
+        self.layersChanged = True
         self.update()
 
     @QtCore.pyqtSlot(int, bool)
@@ -951,13 +1184,23 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
                 self.soloLayerIds.remove(id)
             except KeyError:
                 pass
+        self.layersChanged = True
         self.update()
 
+    @QtCore.pyqtSlot(int, int)
+    def setLayerVolume(self, id: int, volume: int) -> None:
+        self.layersChanged = True
+
+    @QtCore.pyqtSlot(int, int)
+    def setLayerPanning(self, id: int, panning: int) -> None:
+        self.layersChanged = True
+
     @QtCore.pyqtSlot(int)
     def addLayer(self, id: int):
         blocksToShift = self.getBlocksBelowLayer(id)
         for block in blocksToShift:
             self._doMoveBlock(block, 0, 1)
+        self.layersChanged = True
         self.updateSceneSize()
 
     @QtCore.pyqtSlot(int)
@@ -970,6 +1213,7 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         blocksToShift = self.getBlocksBelowLayer(id)
         for block in blocksToShift:
             self._doMoveBlock(block, 0, -1)
+        self.layersChanged = True
         self.updateSceneSize()
 
     @QtCore.pyqtSlot(int)
@@ -994,43 +1238,266 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         for block in blocks2:
             self._doMoveBlock(block, 0, distance)
 
+    ########## VIRTUAL RENDERING ##########
+
+    # In virtual mode, notes are drawn straight from the grid index, and only get a
+    # `NoteBlock` item while one is needed: when they're selected, hovered, or playing
+    # their glow animation. Once none of these apply, the item is released, and the
+    # note goes back to being drawn with the background.
+
+    def drawNotes(self, painter: QtGui.QPainter, rect: QtCore.QRectF) -> None:
+        """Draw the notes in `rect` that don't have an item."""
+        notes = self.grid.in_area(
+            int(rect.left() // BLOCK_SIZE),
+            int(rect.right() // BLOCK_SIZE) + 1,
+            int(rect.top() // BLOCK_SIZE),
+            int(rect.bottom() // BLOCK_SIZE) + 1,
+        )
+        notes = [note for note in notes if not isinstance(note, NoteBlock)]
+        blockSize = painter.worldTransform().m11() * BLOCK_SIZE
+        detailLevel = getDetailLevel(blockSize)
+        painter.save()
+        painter.setOpacity(BLOCK_GLOW_BASE_OPACITY)
+        if detailLevel == DetailLevel.FLAT:
+            self.drawFlatNotes(painter, notes)
+        elif detailLevel == DetailLevel.VECTOR:
+            for note in notes:
+                rect = self.getCellRect(note.tick, note.layer).toAlignedRect()
+                renderNoteBlock(painter, rect, note.instrument, note.key)
+        else:
+            atlas = NOTE_BLOCK_ATLAS.get(blockSize)
+            # The atlas may be drawn from at a different size than it was rendered at
+            painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
+            for note in notes:
+                x, y = note.tick * BLOCK_SIZE, note.layer * BLOCK_SIZE
+                index = atlasIndex(note.instrument, note.key)
+                if atlas is not None and index >= 0:
+                    target = QtCore.QRectF(x, y, BLOCK_SIZE, BLOCK_SIZE)
+                    painter.drawPixmap(target, atlas.pixmap, atlas.rects[index])
+                else:
+                    pixmap = NoteBlock.getPixmap(note.instrument, note.key)
+                    painter.drawPixmap(x, y, pixmap)
+        painter.restore()
+
+    def drawFlatNotes(self, painter: QtGui.QPainter, notes: List[Note]) -> None:
+        """
+        Draw notes as rects in the color of their instrument. Rather than one rect
+        per note, or even per color, they're drawn as a single image with a pixel
+        per grid cell, scaled up to the size of a block.
+        """
+        if not notes:
+            return
+        count = len(notes)
+        ticks = np.fromiter((note.tick for note in notes), np.int64, count)
+        layers = np.fromiter((note.layer for note in notes), np.int64, count)
+        colors = np.fromiter((note.instrument for note in notes), np.int64, count)
+        left, top = int(ticks.min()), int(layers.min())
+        width, height = int(ticks.max()) - left + 1, int(layers.max()) - top + 1
+        pixels = np.zeros((height, width), dtype=np.uint32)
+        pixels[layers - top, ticks - left] = FLAT_PIXELS[
+            np.minimum(colors, len(FLAT_PIXELS) - 1)
+        ]
+        image = QtGui.QImage(
+            pixels.data,
+            width,
+            height,
+            width * 4,
+            QtGui.QImage.Format_ARGB32_Premultiplied,
+        )
+        target = QtCore.QRectF(
+            left * BLOCK_SIZE, top * BLOCK_SIZE, width * BLOCK_SIZE, height * BLOCK_SIZE
+        )
+        # Without smoothing, each pixel is scaled up to a sharp block
+        painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform, False)
+        painter.drawImage(target, image)
+
+    def invalidateCell(self, x: int, y: int) -> None:
+        """Repaint a grid cell once control returns to the event loop."""
+        self.dirtyRect = self.dirtyRect.united(self.getCellRect(x, y))
+        if not self.repaintTimer.isActive():
+            self.repaintTimer.start()
+
+    @QtCore.pyqtSlot()
+    def repaintDirtyRect(self) -> None:
+        self.update(self.dirtyRect)
+        self.dirtyRect = QtCore.QRectF()
+
+    def materialize(self, block: Union[NoteBlock, Note]) -> NoteBlock:
+        """Return the item of a block in the grid, creating it if it has none."""
+        if isinstance(block, NoteBlock):
+            return block
+        note = block
+        block = NoteBlock(note)
+        block.setPos(self.getScenePos(note.tick, note.layer))
+        self.addItem(block)
+        self.grid.replace(note, block, note.tick, note.layer)
+        # Stop drawing the note with the background
+        self.invalidateCell(note.tick, note.layer)
+        return block
+
+    def materializeArea(self, area: QtGui.QPainterPath) -> List[NoteBlock]:
+        """Give every note intersecting `area` an item, and return them."""
+        rect = area.boundingRect()
+        blocks = self.grid.in_area(
+            int(rect.left() // BLOCK_SIZE),
+            int(rect.right() // BLOCK_SIZE) + 1,
+            int(rect.top() // BLOCK_SIZE),
+            int(rect.bottom() // BLOCK_SIZE) + 1,
+        )
+        return [
+            self.materialize(block)
+            for block in blocks
+            if area.intersects(self.getCellRect(block.tick, block.layer))
+        ]
+
+    def releaseBlock(self, block: NoteBlock) -> None:
+        """
+        Release the item of `block` once control returns to the event loop, unless
+        it's still needed then. Has no effect outside of virtual mode.
+        """
+        if self.renderMode != RenderMode.VIRTUAL:
+            return
+        self.blocksToRelease.add(block)
+        if not self.releaseTimer.isActive():
+            self.releaseTimer.start()
+
+    @QtCore.pyqtSlot()
+    def releaseBlocks(self) -> None:
+        blocks, self.blocksToRelease = self.blocksToRelease, set()
+        for block in blocks:
+            if (
+                block.scene() is not self
+                or block.isSelected()
+                or block is self.hoveredBlock
+                or self.glowAnimator.isGlowing(block)
+            ):
+                continue
+            tick, layer = block.tick, block.layer
+            note = block.note
+            note.tick, note.layer = tick, layer
+            self.removeItem(block)
+            self.grid.replace(block, note, tick, layer)
+            self.invalidateCell(tick, layer)
+
+    @QtCore.pyqtSlot(list)
+    def onGlowsFinished(self, blocks: List[NoteBlock]) -> None:
+        for block in blocks:
+            self.releaseBlock(block)
+
+    def updateHoveredBlock(self, pos: QtCore.QPointF) -> None:
+        """Give the note under the mouse an item, so it reacts to hover and wheel events."""
+        block = self.blockAtPos(pos)
+        if block is not None:
+            block = self.materialize(block)
+        if block is not self.hoveredBlock:
+            if self.hoveredBlock is not None:
+                self.releaseBlock(self.hoveredBlock)
+            self.hoveredBlock = block
+
     ########## PLAYBACK ##########
 
+    @QtCore.pyqtSlot(bool)
+    def setPlaying(self, playing: bool) -> None:
+        self.isPlaying = playing
+
+    @QtCore.pyqtSlot(float)
+    def seekPlayback(self, tick: float) -> None:
+        """
+        Move the playback position without playing the ticks in between. Only needed
+        during playback: otherwise, only the tick reached is played anyway.
+        """
+        if self.isPlaying:
+            self.previousPlaybackPosition = tick
+
     @QtCore.pyqtSlot(float)
     def doPlayback(self, currentPlaybackPosition: float):
-        if math.floor(self.previousPlaybackPosition) != math.floor(
-            currentPlaybackPosition
-        ):
-            self.playTick(math.floor(currentPlaybackPosition))
+        previousTick = math.floor(self.previousPlaybackPosition)
+        currentTick = math.floor(currentPlaybackPosition)
+        if self.isPlaying and currentTick > previousTick:
+            # Play every tick reached since the last frame, so none are skipped when
+            # a frame takes longer than a tick
+            self.playTicks(previousTick + 1, currentTick + 1)
+        elif currentTick != previousTick and self.isPlaying:
+            self.playTick(currentTick)
+        elif currentTick != previousTick:
+            self.previewTick(currentTick)
         self.previousPlaybackPosition = currentPlaybackPosition
 
+    def previewTick(self, tick: int) -> None:
+        """
+        Play `tick`, reached by moving the playback position by hand. When scrubbing,
+        ticks are reached faster than they can be told apart, so they're played at
+        most once every `previewInterval` seconds.
+        """
+        now = time.monotonic()
+        if now >= self.nextPreviewTime:
+            self.nextPreviewTime = now + self.previewInterval
+            self.pendingPreviewTick = None
+            self.previewTimer.stop()
+            self.playTick(tick)
+        else:
+            self.pendingPreviewTick = tick
+            if not self.previewTimer.isActive():
+                delay = math.ceil((self.nextPreviewTime - now) * 1000)
+                self.previewTimer.start(delay)
+
+    @QtCore.pyqtSlot()
+    def playPendingPreview(self) -> None:
+        tick, self.pendingPreviewTick = self.pendingPreviewTick, None
+        if tick is not None and not self.isPlaying:
+            self.previewTick(tick)
+
     def getBlocksInTick(self, tick: int) -> List[NoteBlock]:
-        return self.tickIndex.get(tick) or []
+        return self.grid.in_tick(tick)
+
+    def invalidateTick(self, tick: int) -> None:
+        """Mark the notes in `tick` as changed, so they're compiled again before playing."""
+        self.changedTicks.add(tick)
+        self.markTickEdited(tick)
+
+    def getNotesInTicks(self, ticks: Iterable[int]) -> NoteTable:
+        """Return the notes in `ticks`, as a table."""
+        return NoteTable(
+            self.getNote(block)
+            for tick in ticks
+            for block in self.getBlocksInTick(tick)
+        )
 
-    def playBlocks(self, blocks: Sequence[NoteBlock]) -> None:
+    def updateTimeline(self) -> PlaybackTimeline:
+        """Apply the changes made since the timeline was last used, and return it."""
+        if self.layersChanged:
+            self.timeline.set_layers(self.layers)
+            self.layersChanged = False
+        if self.changedTicks:
+            notes = self.getNotesInTicks(self.changedTicks)
+            self.timeline.replace_ticks(self.changedTicks, notes)
+            self.changedTicks.clear()
+        return self.timeline
+
+    def playTicks(self, start: int, stop: int) -> None:
+        """
+        Play the notes in ticks [`start`, `stop`) at once, in a single `tickPlayed`
+        payload.
+        """
         # TODO: business logic should be in a controller
-        payload = []
-        lockedCheck = self._getLayerLockedCheck()
-        for block in blocks:
-            layer = self.layers[int(block.y() // BLOCK_SIZE)]
-            if lockedCheck(layer):
-                continue
-            note = block.note
-            instrument = note.instrument
-            key = note.key + note.pitch / 100
-            volume = (note.velocity / 100) * (layer.volume / 100)
-            if layer.panning == 0:
-                panning = note.panning / 100
-            else:
-                panning = ((note.panning / 100) + (layer.panning / 100)) / 2
-            block.triggerPlaybackAnimation()
-            payload.append((instrument, key, volume, panning))
-        self.tickPlayed.emit(payload)
+        notes = self.updateTimeline().window(start, stop)
+        if len(notes.ticks) == 0:
+            return
+        audibleLayers = set(notes.layers.tolist())
+        self.glowAnimator.start(
+            [
+                self.materialize(block)
+                for tick in range(start, stop)
+                for block in self.getBlocksInTick(tick)
+                if block.layer in audibleLayers
+            ]
+        )
+        self.tickPlayed.emit(
+            note_batch(notes.instruments, notes.keys, notes.volumes, notes.pannings)
+        )
 
     def playTick(self, tick: int) -> None:
-        blocks = self.getBlocksInTick(tick)
-        if blocks:
-            self.playBlocks(blocks)
+        self.playTicks(tick, tick + 1)
 
     ########## EVENTS ##########
 
@@ -1046,8 +1513,8 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         if event.button() == QtCore.Qt.RightButton:
             self.selection.setStyleSheet("selection-background-color: rgb(255, 0, 0);")
         elif event.button() == QtCore.Qt.LeftButton:
-            clickedItem = self.itemAt(event.scenePos(), QtGui.QTransform())
-            if clickedItem is not None and clickedItem.isSelected():
+            clickedItem = self.blockAtPos(event.scenePos())
+            if isinstance(clickedItem, NoteBlock) and clickedItem.isSelected():
                 self.isMovingBlocks = True
                 self.movedItem = clickedItem
             else:
@@ -1086,9 +1553,11 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
             if event.button() == QtCore.Qt.LeftButton:
                 self.removeBlockManual(x, y)
                 self.addBlockManual(x, y, self.activeKey, self.currentInstrument)
+                if self.renderMode == RenderMode.VIRTUAL:
+                    self.updateHoveredBlock(clickPos)
             elif event.button() == QtCore.Qt.RightButton:
                 if not self.hasSelection():  # Should open the menu otherwise
-                    if self.blockAtPos(event.pos()) is not None:
+                    if self.blockAtPos(clickPos) is not None:
                         self.removeBlockManual(x, y)
                         self.isRemovingNote = True
 
@@ -1139,6 +1608,8 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
             selectionRect = selectionRect.intersected(self.sceneRect().toRect())
             self.selection.setGeometry(selectionRect)
         else:
+            if self.renderMode == RenderMode.VIRTUAL:
+                self.updateHoveredBlock(event.scenePos())
             # call the parent's mouseMoveEvent to allow
             # the scene items to detect hover events
             super().mouseMoveEvent(event)
@@ -1165,19 +1636,93 @@ class NoteBlockArea(QtWidgets.QGraphicsScene):
         return False
 
 
+class GlowAnimator(QtCore.QObject):
+    """
+    Make played note blocks glow, fading from full to base opacity.
+
+    Glowing blocks are kept in a list, with the times their glow started in an array
+    alongside, and their opacities are all updated together from a single timer. A
+    block needs no animation object of its own, and a chord of hundreds of notes
+    starts no more timers than a single note.
+    """
+
+    finished = QtCore.pyqtSignal(list)
+
+    def __init__(
+        self,
+        parent: Optional[QtCore.QObject] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(parent)
+        self.clock = clock
+        self.duration = BLOCK_GLOW_DURATION_SECS
+        self.blocks: List[NoteBlock] = []
+        self.startTimes = np.empty(0)
+        # The position of each block in `blocks`, by identity
+        self.positions: Dict[int, int] = {}
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(BLOCK_GLOW_FRAME_INTERVAL_MSECS)
+        self.timer.timeout.connect(self.advance)
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def isGlowing(self, block: NoteBlock) -> bool:
+        return id(block) in self.positions
+
+    def start(self, blocks: Sequence[NoteBlock]) -> None:
+        """Make `blocks` glow, restarting the glow of those already glowing."""
+        now = self.clock()
+        newBlocks = []
+        for block in blocks:
+            position = self.positions.get(id(block))
+            if position is None:
+                self.positions[id(block)] = len(self.blocks) + len(newBlocks)
+                newBlocks.append(block)
+            elif position < len(self.startTimes):
+                self.startTimes[position] = now
+            block.setOpacity(BLOCK_GLOW_MAX_OPACITY)
+        self.blocks.extend(newBlocks)
+        self.startTimes = np.append(self.startTimes, np.full(len(newBlocks), now))
+        if self.blocks and not self.timer.isActive():
+            self.timer.start()
+
+    @QtCore.pyqtSlot()
+    def stop(self) -> None:
+        """Stop every glow where it is, e.g. when the blocks are about to be deleted."""
+        self.timer.stop()
+        self.blocks = []
+        self.startTimes = np.empty(0)
+        self.positions = {}
+
+    @QtCore.pyqtSlot()
+    def advance(self) -> None:
+        """Update the opacity of every glowing block, and stop those that are done."""
+        progress = np.minimum((self.clock() - self.startTimes) / self.duration, 1)
+        opacities = BLOCK_GLOW_MAX_OPACITY + progress * (
+            BLOCK_GLOW_BASE_OPACITY - BLOCK_GLOW_MAX_OPACITY
+        )
+        # Mapping the unbound method saves an attribute lookup and a Python-level
+        # call per block, which adds up with thousands of glowing blocks per frame
+        list(map(NoteBlock.setOpacity, self.blocks, opacities.tolist()))
+        done = progress >= 1
+        if not done.any():
+            return
+        blocks = self.blocks
+        finished = [blocks[i] for i in np.flatnonzero(done).tolist()]
+        self.blocks = [blocks[i] for i in np.flatnonzero(~done).tolist()]
+        self.startTimes = self.startTimes[~done]
+        self.positions = {id(block): i for i, block in enumerate(self.blocks)}
+        if not self.blocks:
+            self.timer.stop()
+        for block in finished:
+            block.hoverCheck()
+        self.finished.emit(finished)
+
+
 class NoteBlock(QtWidgets.QGraphicsObject):
     # Geometry
     RECT = QtCore.QRectF(0, 0, BLOCK_SIZE, BLOCK_SIZE)
-    TOP_RECT = QtCore.QRect(0, 0, BLOCK_SIZE, BLOCK_SIZE // 2)
-    BOTTOM_RECT = QtCore.QRect(0, BLOCK_SIZE // 2, BLOCK_SIZE, BLOCK_SIZE // 2)
-
-    # Colors
-    LABEL_COLOR = QtCore.Qt.yellow
-    NUMBER_COLOR = QtCore.Qt.white
-
-    # Font
-    FONT = QtGui.QFont()
-    FONT.setPointSize(9)
 
     def __init__(self, note: Note, parent: Optional[QtWidgets.QGraphicsItem] = None):
         super().__init__(parent)
@@ -1194,13 +1739,6 @@ class NoteBlock(QtWidgets.QGraphicsObject):
         self.selected = False
         self.setAcceptHoverEvents(True)
         self.setFlag(QtWidgets.QGraphicsItem.ItemIsSelectable, True)
-        # TODO: ItemCoordinateCache makes items pixelated. Invalidate the cache
-        # when zooming very close as few notes are being drawn.
-        self.setCacheMode(QtWidgets.QGraphicsItem.ItemCoordinateCache)
-
-        # OPACITY CONTROLS
-        self.animation = QtCore.QPropertyAnimation(self, b"opacity")
-        self.animation.setDuration(round(BLOCK_GLOW_DURATION_SECS * 1000))
 
         # Update initial opacity based on hover status
         self.hoverCheck()
@@ -1226,11 +1764,30 @@ class NoteBlock(QtWidgets.QGraphicsObject):
         return self.RECT
 
     def paint(self, painter, option, widget):
-        pixmap = PIXMAP_CACHE.find(self.cacheKey)
-        if pixmap is None:
-            pixmap = self.getPixmap()
-            PIXMAP_CACHE.insert(self.cacheKey, pixmap)
-        painter.drawPixmap(0, 0, pixmap)
+        # Blocks aren't cached by Qt, as a cache made at one zoom level gets
+        # pixelated at the next: they're drawn in the detail level that suits it
+        note = self.note
+        blockSize = painter.worldTransform().m11() * BLOCK_SIZE
+        detailLevel = getDetailLevel(blockSize)
+        if detailLevel == DetailLevel.FLAT:
+            painter.fillRect(self.RECT, FLAT_COLORS[min(note.instrument, 15)])
+        elif detailLevel == DetailLevel.VECTOR:
+            renderNoteBlock(
+                painter,
+                self.RECT.toAlignedRect(),
+                note.instrument,
+                note.key,
+                self.isOutOfRange,
+            )
+        else:
+            index = atlasIndex(note.instrument, note.key, self.isOutOfRange)
+            atlas = NOTE_BLOCK_ATLAS.get(blockSize)
+            if atlas is not None and index >= 0:
+                painter.drawPixmap(self.RECT, atlas.pixmap, atlas.rects[index])
+            else:
+                painter.drawPixmap(
+                    0, 0, self.getPixmap(note.instrument, note.key, self.isOutOfRange)
+                )
 
         selectedColor = QtGui.QColor(255, 255, 255, 180)
         if self.isSelected():
@@ -1238,40 +1795,47 @@ class NoteBlock(QtWidgets.QGraphicsObject):
             painter.setBrush(selectedColor)
             painter.drawRect(self.RECT)
 
-    def getPixmap(self) -> QtGui.QPixmap:
-        pixmap = QtGui.QPixmap(BLOCK_SIZE, BLOCK_SIZE)
-        painter = QtGui.QPainter(pixmap)
+    @classmethod
+    def getPixmap(
+        cls, instrument: int, key: int, isOutOfRange: bool = False
+    ) -> QtGui.QPixmap:
+        """
+        Return the pixmap of a note block with the given look, for the blocks that
+        can't be painted from the atlas. It's shared by every block that looks the same.
+        """
+        cacheKey = cls.getCacheKey(instrument, key, isOutOfRange)
+        pixmap = PIXMAP_CACHE.find(cacheKey)
+        if pixmap is None:
+            pixmap = cls.renderPixmap(instrument, key, isOutOfRange)
+            PIXMAP_CACHE.insert(cacheKey, pixmap)
+        return pixmap
 
-        rect = self.RECT.toAlignedRect()
-        painter.drawPixmap(rect, NOTE_BLOCK_PIXMAP)
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.setBrush(QtGui.QBrush(self.overlayColor, QtCore.Qt.SolidPattern))
-        painter.setCompositionMode(QtGui.QPainter.CompositionMode_Overlay)
-        painter.drawRect(rect)
-        painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
-        painter.setFont(self.FONT)
-        painter.setPen(self.LABEL_COLOR)
-        painter.drawText(
-            self.TOP_RECT, QtCore.Qt.AlignHCenter + QtCore.Qt.AlignBottom, self.label
+    @classmethod
+    def renderPixmap(
+        cls, instrument: int, key: int, isOutOfRange: bool = False
+    ) -> QtGui.QPixmap:
+        # Rendered the same way as the atlas, so both look exactly the same
+        image = QtGui.QImage(
+            BLOCK_SIZE, BLOCK_SIZE, QtGui.QImage.Format_ARGB32_Premultiplied
         )
-        painter.setPen(self.NUMBER_COLOR)
-        painter.drawText(
-            self.BOTTOM_RECT, QtCore.Qt.AlignHCenter + QtCore.Qt.AlignTop, self.clicks
+        image.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(image)
+        renderNoteBlock(
+            painter, cls.RECT.toAlignedRect(), instrument, key, isOutOfRange
         )
-        if self.isOutOfRange:
-            painter.setPen(QtCore.Qt.red)
-            painter.setBrush(QtCore.Qt.NoBrush)
-            painter.drawRect(rect)
-
         painter.end()
-        return pixmap
+        return QtGui.QPixmap.fromImage(image)
 
     def resetCache(self):
         PIXMAP_CACHE.remove(self.cacheKey)
 
+    @staticmethod
+    def getCacheKey(instrument: int, key: int, isOutOfRange: bool = False) -> str:
+        return f"note_{instrument}_{key}_{int(isOutOfRange)}"
+
     @property
     def cacheKey(self) -> str:
-        return f"note_{self.note.instrument}_{self.note.key}"
+        return self.getCacheKey(self.note.instrument, self.note.key, self.isOutOfRange)
 
     def hoverCheck(self):
         """Update the opacity of the note block based on its hover status.
@@ -1297,36 +1861,34 @@ class NoteBlock(QtWidgets.QGraphicsObject):
 
     def changeKey(self, steps):
         self.note.key += steps
+        self.invalidatePlayback()
         self.refresh()
 
+    def invalidatePlayback(self) -> None:
+        """Recompile this block's tick in the scene's timeline, after editing its note."""
+        scene = self.scene()
+        if scene is not None:
+            scene.invalidateTick(self.tick)
+
     def refresh(self):
         self.label = self.getLabel()
         self.clicks = self.getClicks()
         self.update()
 
     def getLabel(self):
-        octave, key = divmod(self.note.key + 9, 12)
-        label = KEY_LABELS[key] + str(octave)
-        return label
+        return getLabel(self.note.key)
 
     def getClicks(self):
-        # TODO: replace hardcoded values with the note instrument's valid range
-        if self.note.key < 33:
-            return "<"
-        elif self.note.key > 57:
-            return ">"
-        else:
-            return str(self.note.key - 33)
+        return getClicks(self.note.key)
 
     def triggerPlaybackAnimation(self):
-        if self.animation.state() == QtCore.QAbstractAnimation.State.Running:
-            self.animation.stop()
-        self.animation.setStartValue(BLOCK_GLOW_MAX_OPACITY)
-        self.animation.setEndValue(BLOCK_GLOW_BASE_OPACITY)
-        self.animation.start(QtCore.QAbstractAnimation.DeletionPolicy.KeepWhenStopped)
+        scene = self.scene()
+        if scene is not None:
+            scene.glowAnimator.start([self])
 
     def setInstrument(self, id_: int):
         self.note.instrument = id_
+        self.invalidatePlayback()
         instrument = instrument_data[id_]
         self.overlayColor = QtGui.QColor(*instrument.color)
         self.update()
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from PyQt5 import QtCore, QtWidgets
 
 from .constants import *
@@ -8,7 +10,7 @@ __all__ = ["CentralArea"]
 class Workspace(QtWidgets.QSplitter):
     """
     A splitter holding a layer area on the left and a note
-    block area on the right.
+    block area on the right, with an optional minimap below it.
     """
 
     def __init__(
@@ -16,12 +18,14 @@ class Workspace(QtWidgets.QSplitter):
         noteBlockWidget: QtCore.QObject,
         layerWidget: QtCore.QObject,
         timeBar=QtCore.QObject,
+        minimap: Optional[QtWidgets.QWidget] = None,
         parent=None,
     ):
         super().__init__(parent)
         self.noteBlockWidget = noteBlockWidget
         self.layerWidget = layerWidget
         self.timeBar = timeBar
+        self.minimap = minimap
 
         layout = QtWidgets.QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
@@ -29,7 +33,7 @@ class Workspace(QtWidgets.QSplitter):
         layout.addWidget(self.timeBar)
         layout.addWidget(self.layerWidget)
 
-        # fill vertical space taken by horizontal scrollbar
+        # fill vertical space taken by horizontal scrollbar (and the minimap)
         spacer = QtWidgets.QWidget()
         spacer.setFixedHeight(SCROLL_BAR_SIZE)
         layout.addWidget(spacer)
@@ -39,7 +43,18 @@ class Workspace(QtWidgets.QSplitter):
         leftPanel.setLayout(layout)
 
         self.addWidget(leftPanel)
-        self.addWidget(self.noteBlockWidget.view)
+        if self.minimap is None:
+            self.addWidget(self.noteBlockWidget.view)
+        else:
+            spacer.setFixedHeight(SCROLL_BAR_SIZE + self.minimap.height())
+            rightLayout = QtWidgets.QVBoxLayout()
+            rightLayout.setContentsMargins(0, 0, 0, 0)
+            rightLayout.setSpacing(0)
+            rightLayout.addWidget(self.noteBlockWidget.view)
+            rightLayout.addWidget(self.minimap)
+            rightPanel = QtWidgets.QWidget()
+            rightPanel.setLayout(rightLayout)
+            self.addWidget(rightPanel)
         self.setHandleWidth(2)
 
         self.noteBlockWidget.view.verticalScrollBar().valueChanged.connect(
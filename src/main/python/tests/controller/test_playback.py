@@ -0,0 +1,55 @@
+from nbs.controller.playback import PlaybackController
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def testPlaybackPositionDoesNotDrift(qapp) -> None:
+    clock = FakeClock()
+    controller = PlaybackController(clock=clock)
+    positions = []
+    controller.playbackPositionChanged.connect(positions.append)
+    controller.setTempo(7.5)
+    controller.play()
+    for _ in range(3600 * 60):
+        clock.now += 1 / 60
+        # As reported by the audio engine, from a clock of its own
+        controller.updatePlaybackPosition(clock.now * 7.5)
+    assert controller.currentTick == clock.now * 7.5
+    controller.pause()
+    assert len(positions) == 3600 * 60
+    assert abs(positions[-1] - 3600 * 7.5) < 1e-6
+
+
+def testSeekWhilePlaying(qapp) -> None:
+    clock = FakeClock()
+    controller = PlaybackController(clock=clock)
+    controller.play()
+    clock.now += 10
+    controller.setPlaybackPosition(5)
+    clock.now += 1
+    assert controller.currentTick == 15
+    controller.stop()
+    assert controller.currentTick == 0
+
+
+def testPositionUpdatesFromAudioEngine(qapp) -> None:
+    clock = FakeClock()
+    controller = PlaybackController(clock=clock)
+    positions = []
+    controller.playbackPositionChanged.connect(positions.append)
+    controller.updatePlaybackPosition(1)
+    controller.play()
+    clock.now += 0.5
+    controller.updatePlaybackPosition(5.01)
+    # An update sent before seeking is ignored
+    controller.setPlaybackPosition(100)
+    controller.updatePlaybackPosition(5.02)
+    controller.pause()
+    controller.updatePlaybackPosition(100)
+    assert positions == [5.01, 100]
@@ -0,0 +1,342 @@
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("openal")
+
+import soundfile as sf
+from openal.audio import SoundData
+
+from nbs.core.audio import (
+    AudioEngine,
+    AudioOutputHandler,
+    AudioSourcePool,
+    SampleCache,
+    SoftwareMixerOutput,
+    SoundRegistry,
+    VoiceStealingPolicy,
+    fade_out,
+    load_sound,
+    mix_song,
+    mix_song_parallel,
+    note_parameters,
+    render_song,
+    resample,
+)
+from nbs.core.data import Layer, Note, NoteTable, Song, SongHeader
+
+
+def make_sound(samples: np.ndarray, frequency: int = 100) -> SoundData:
+    buf = (samples * 32767).astype(np.int16).tobytes()
+    return SoundData(buf, 1, 16, len(buf), frequency)
+
+
+@pytest.fixture
+def song() -> Song:
+    notes = NoteTable(
+        [
+            Note(tick=0, layer=0, instrument=0, key=45),
+            Note(tick=2, layer=1, instrument=0, key=45, velocity=50, panning=100),
+            Note(tick=4, layer=2, instrument=0, key=57),
+        ]
+    )
+    layers = [Layer(), Layer(volume=50), Layer(lock=True)]
+    return Song(SongHeader(tempo=10), notes, layers, [])
+
+
+def test_note_parameters(song: Song) -> None:
+    audible, key, volume, panning = note_parameters(song.notes, song.layers)
+    assert audible.tolist() == [True, True, False]
+    assert key.tolist() == [45, 45, 57]
+    assert volume.tolist() == [1.0, 0.25, 1.0]
+    assert panning.tolist() == [0.0, 1.0, 0.0]
+
+
+def test_note_parameters_solo(song: Song) -> None:
+    song.layers[1].solo = True
+    audible, _, _, _ = note_parameters(song.notes, song.layers)
+    assert audible.tolist() == [False, True, False]
+
+
+def test_resample() -> None:
+    samples = np.arange(8, dtype=np.float32)
+    assert resample(samples, 2).tolist() == [0, 2, 4, 6]
+    assert len(resample(samples, 0.5)) == 16
+
+
+def test_fade_out() -> None:
+    samples = np.ones(8, dtype=np.float32)
+    assert fade_out(samples, 5, 3).tolist() == [1, 1, 1, 0.5, 0]
+    assert fade_out(samples, 10, 3) is samples
+
+
+def test_load_sound_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "sound.wav"
+    cache_dir = tmp_path / "cache"
+    samples = np.array([[0, 1], [2, 3], [4, 5]], dtype=np.int16)
+    sf.write(path, samples, 8000, subtype="PCM_16")
+    sound = load_sound(path, cache_dir)
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # Later loads don't decode the file again
+    def read(*args, **kwargs):
+        raise AssertionError("Sound decoded again")
+
+    with monkeypatch.context() as m:
+        m.setattr(sf, "read", read)
+        cached = load_sound(path, cache_dir)
+    assert cached.data == sound.data == samples.tobytes()
+    assert (cached.channels, cached.frequency) == (2, 8000)
+
+    # Changing the file invalidates its entry
+    sf.write(path, samples * 2, 8000, subtype="PCM_16")
+    assert load_sound(path, cache_dir).data == (samples * 2).tobytes()
+    assert len(list(cache_dir.iterdir())) == 2
+
+
+def test_load_sound_cache_not_writable(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    path = tmp_path / "sound.wav"
+    samples = np.array([[0, 1], [2, 3]], dtype=np.int16)
+    sf.write(path, samples, 8000, subtype="PCM_16")
+    # The cache directory can't be created where a file already is
+    cache_dir = tmp_path / "cache"
+    cache_dir.touch()
+    assert load_sound(path, cache_dir).data == samples.tobytes()
+    assert "Couldn't cache decoded sound" in caplog.text
+
+
+def test_sound_registry() -> None:
+    registry = SoundRegistry()
+    sound = make_sound(np.zeros(10))
+    assert registry.assign("a", "harp.ogg")
+    # Instruments using the same file share it
+    assert not registry.assign("b", "harp.ogg")
+    assert registry.get("a") is None
+    assert registry.set_sound("harp.ogg", sound)
+    assert registry.get("b") is sound
+    assert (registry.file_count, registry.nbytes) == (1, 20)
+
+    registry.remove("a")
+    assert registry.get("b") is sound and registry.nbytes == 20
+    assert registry.assign("b", "bass.ogg")
+    assert "a" not in registry and len(registry) == 1
+    assert (registry.file_count, registry.nbytes) == (1, 0)
+    # A sound that finishes loading after all its instruments were removed is dropped
+    assert not registry.set_sound("harp.ogg", sound)
+    assert registry.nbytes == 0
+
+
+@pytest.fixture
+def handler() -> AudioOutputHandler:
+    try:
+        handler = AudioOutputHandler()
+    except Exception:
+        pytest.skip("No audio output device available")
+    handler.source_pool = AudioSourcePool(sources=3)
+    return handler
+
+
+@pytest.mark.parametrize(
+    "policy, stolen",
+    [
+        (VoiceStealingPolicy.OLDEST, 0),
+        (VoiceStealingPolicy.QUIETEST, 1),
+        (VoiceStealingPolicy.SAME_INSTRUMENT_FIRST, 2),
+    ],
+)
+def test_voice_stealing(
+    handler: AudioOutputHandler, policy: VoiceStealingPolicy, stolen: int
+) -> None:
+    handler.policy = policy
+    sound = make_sound(np.zeros(1000))
+    for volume, instrument in [(1.0, 0), (0.2, 1), (0.5, 2)]:
+        handler.push_sound(sound, 1, volume, 0, instrument)
+    voices = [entry[2] for entry in sorted(handler.active_sounds, key=lambda e: e[1])]
+
+    handler.push_sound(sound, 1, 1.0, 0, instrument=2)
+    assert [voice.playing for voice in voices].index(False) == stolen
+    assert handler.voice_count == 3
+    assert (handler.stolen_count, handler.dropped_count) == (1, 0)
+
+
+def test_push_sounds_max_length(handler: AudioOutputHandler) -> None:
+    # 10 seconds long at 100 Hz, cut after 0.5 seconds
+    sound = make_sound(np.zeros(1000))
+    start = time.monotonic()
+    handler.push_sounds([sound, sound], [1, 1], [1, 1], [0, 0], [0, 1], max_length=0.5)
+    for end, _, _ in handler.active_sounds:
+        assert start + 0.5 <= end < start + 1
+
+
+def test_voice_stealing_compacts_queues(handler: AudioOutputHandler) -> None:
+    sound = make_sound(np.zeros(1000))
+    for instrument in range(1000):
+        handler.push_sound(sound, 1, 1.0, 0, instrument % 5)
+    assert handler.stolen_count == 997
+    # Stolen sounds are left behind in every queue until they're compacted away
+    limit = handler.voice_count * 2 + 64
+    assert len(handler.active_sounds) <= limit
+    assert len(handler._by_volume) <= limit
+    assert sum(map(len, handler._by_instrument.values())) <= limit
+
+
+def test_voice_stealing_disabled(handler: AudioOutputHandler) -> None:
+    handler.policy = VoiceStealingPolicy.NONE
+    sound = make_sound(np.zeros(1000))
+    for _ in range(5):
+        handler.push_sound(sound, 1, 1.0, 0)
+    assert handler.voice_count == 3
+    assert (handler.stolen_count, handler.dropped_count) == (0, 2)
+
+
+def test_engine_drops_late_notes(qapp) -> None:
+    try:
+        engine = AudioEngine()
+    except Exception:
+        pytest.skip("No audio output device available")
+    engine.update_timer.stop()
+    now = 100.0
+    engine.scheduler.clock.clock = lambda: now
+    notes = [Note(tick=tick, layer=0, instrument=0, key=45) for tick in (0, 1, 3)]
+    engine.setPlaybackNotes(NoteTable(notes), [Layer()])
+    engine.setLateThreshold(0.25)
+    engine.startPlayback(0)
+    # A stall of half a second: only the note less than 0.25 seconds late is played
+    now += 0.5
+    assert engine.scheduler.poll().times.tolist() == pytest.approx([100.3])
+    engine.stop()
+
+
+@pytest.fixture
+def mixer() -> SoftwareMixerOutput:
+    try:
+        return SoftwareMixerOutput(sample_rate=100, block_size=4)
+    except Exception:
+        pytest.skip("No audio output device available")
+
+
+def test_software_mixer(mixer: SoftwareMixerOutput) -> None:
+    ramp = np.arange(1, 7, dtype=np.float32)
+    mixer.push_sound(ramp, 1.0, 0)
+    first = mixer.mix_block()
+    mixer.push_sound(ramp, 0.5, 1)
+    mixer.push_sound(np.ones(2, dtype=np.float32), 1.0, -1)
+    assert mixer.voice_count == 3
+
+    center = np.cos(np.pi / 4)
+    assert first[:, 0] == pytest.approx(ramp[:4] * center)
+    second = mixer.mix_block()
+    assert second[:, 0] == pytest.approx([5 * center + 1, 6 * center + 1, 0, 0])
+    assert second[:, 1] == pytest.approx([5 * center + 0.5, 6 * center + 1, 1.5, 2])
+    assert mixer.voice_count == 1
+    mixer.mix_block()
+    assert mixer.voice_count == 0
+
+
+def test_software_mixer_batch(mixer: SoftwareMixerOutput) -> None:
+    sounds = [np.arange(1, 7, dtype=np.float32), np.ones(2, dtype=np.float32)]
+    volumes = np.array([0.5, 1.0])
+    pannings = np.array([1.0, -1.0])
+    for sound, volume, panning in zip(sounds, volumes, pannings):
+        mixer.push_sound(sound, volume, panning)
+    expected = [mixer.mix_block() for _ in range(2)]
+    mixer.push_sounds(sounds, volumes, pannings)
+    assert mixer.voice_count == 2
+    for block in expected:
+        assert mixer.mix_block() == pytest.approx(block)
+
+
+def test_software_mixer_onset(mixer: SoftwareMixerOutput) -> None:
+    # Pretend the stream started playing at time 50
+    mixer._start_time = 50.0
+    ones = np.ones(8, dtype=np.float32)
+    mixer.push_sound(ones, 1.0, 1, onset=50.02)
+    mixer.push_sound(ones, 1.0, -1, onset=50.07)
+    # Sounds start at the sample closest to their onset
+    assert mixer.mix_block()[:, 1].tolist() == [0, 0, 1, 1]
+    assert mixer.voice_count == 2
+
+    mixer.clear_scheduled()
+    assert mixer.voice_count == 1
+
+
+def test_software_mixer_compacts_bank(mixer: SoftwareMixerOutput) -> None:
+    # The bank initially holds 4 of these sounds, so it's compacted while they play
+    sounds = [np.full(48, i, dtype=np.float32) for i in range(20)]
+    for i, sound in enumerate(sounds):
+        mixer.push_sound(sound, 1.0, 1)
+        # Each sound lasts 12 blocks
+        expected = sum(range(max(0, i - 11), i + 1))
+        assert mixer.mix_block()[:, 1] == pytest.approx(np.full(4, expected))
+    mixer._compact_bank(0)
+    assert len(mixer._slots) == mixer.voice_count == 11
+
+
+def test_sample_cache() -> None:
+    sounds = [make_sound(np.full(10, 0.5)), None]
+    cache = SampleCache(sounds, sample_rate=100)
+    assert len(cache.get(0, 45)) == 10
+    assert len(cache.get(0, 57)) == 5
+    assert len(cache.get(0, 45, pitch=1200)) == 5
+    assert cache.get(0, 45) is cache.get(0, 45)
+    assert cache.get(1, 45) is None
+    assert (cache.hits, cache.misses) == (2, 4)
+    assert len(cache) == 3
+
+    cache.invalidate(0)
+    assert len(cache) == cache.nbytes == 0
+
+
+def test_sample_cache_eviction() -> None:
+    cache = SampleCache([make_sound(np.full(100, 0.5))], sample_rate=100, max_bytes=800)
+    first = cache.get(0, 45)
+    cache.get(0, 46)
+    cache.get(0, 45)
+    cache.get(0, 47)
+    # The least recently used entry (key 46) was evicted to stay under the limit
+    assert cache.nbytes <= 800
+    assert cache.get(0, 45) is first
+    cache.get(0, 46)
+    assert cache.misses == 4
+
+
+def test_mix_song(song: Song) -> None:
+    sound = make_sound(np.full(10, 0.5))
+    mix = mix_song(song, [sound], sample_rate=100, master_volume=1)
+    # Notes are 0.2s (20 samples) apart, and the locked layer is skipped
+    assert mix.shape == (30, 2)
+    center = 0.5 * np.cos(np.pi / 4)
+    assert mix[0] == pytest.approx([center, center], abs=1e-3)
+    assert mix[15] == pytest.approx([0, 0])
+    assert mix[20] == pytest.approx([0, 0.5 * 0.25], abs=1e-3)
+
+
+def test_mix_song_missing_sound(song: Song) -> None:
+    assert mix_song(song, [None]).shape == (0, 2)
+
+
+def test_render_song(song: Song, tmp_path: Path) -> None:
+    path = tmp_path / "song.flac"
+    render_song(song, [make_sound(np.full(10, 0.5))], path, sample_rate=8000)
+    data, sample_rate = sf.read(path)
+    assert sample_rate == 8000
+    assert data.shape[1] == 2
+
+
+def test_mix_song_parallel(song: Song) -> None:
+    rng = np.random.default_rng(0)
+    song.notes = NoteTable.from_arrays(
+        tick=rng.integers(0, 100, 200),
+        layer=rng.integers(0, 3, 200),
+        instrument=rng.integers(0, 2, 200),
+        key=rng.integers(33, 58, 200),
+        panning=rng.integers(-100, 101, 200),
+    )
+    sounds = [make_sound(rng.uniform(-1, 1, 50)), make_sound(np.full(30, 0.5), 200)]
+    expected = mix_song(song, sounds, sample_rate=100)
+    mix = mix_song_parallel(song, sounds, sample_rate=100, workers=2)
+    assert mix == pytest.approx(expected, abs=1e-5)
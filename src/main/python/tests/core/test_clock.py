@@ -0,0 +1,58 @@
+import pytest
+
+from nbs.core.clock import PlaybackClock
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def test_no_drift_over_an_hour(clock: FakeClock) -> None:
+    playback = PlaybackClock(clock, tempo=10)
+    playback.start()
+    # Uneven frame times, which add up to exactly one hour
+    frames = [1 / 64, 3 / 128, 1 / 128, 1 / 64] * (3600 * 16)
+    previous = 0.0
+    for frame in frames:
+        clock.now += frame
+        position = playback.position()
+        assert position >= previous
+        previous = position
+    assert clock.now == 1000 + 3600
+    assert playback.position() == 36000
+    assert playback.time_at(36000) == clock.now
+
+
+def test_seek_and_tempo_change(clock: FakeClock) -> None:
+    playback = PlaybackClock(clock, tempo=10)
+    playback.start()
+    clock.now += 1800
+    playback.seek(100)
+    assert playback.position() == 100
+    clock.now += 60
+    playback.set_tempo(20)
+    clock.now += 1740
+    assert playback.position() == 100 + 60 * 10 + 1740 * 20
+
+
+def test_pause(clock: FakeClock) -> None:
+    playback = PlaybackClock(clock)
+    clock.now += 5
+    assert playback.position() == 0
+    playback.start()
+    clock.now += 2
+    playback.pause()
+    clock.now += 100
+    assert playback.position() == 20
+    playback.start()
+    clock.now += 1
+    assert playback.position() == 30
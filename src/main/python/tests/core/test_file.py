@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import Optional
+
+import pynbs
+import pytest
+
+from nbs.core.data import Layer, NoteTable
+from nbs.core.file import convert_file_to_song, load_song, open_song
+
+
+def write_song(path: Path, version: int) -> None:
+    file = pynbs.new_file(
+        song_name="Test song",
+        song_author="Author",
+        description="Ünïcödé",
+        tempo=12.5,
+        loop=True,
+        loop_start=3,
+    )
+    file.notes.extend(
+        [
+            pynbs.Note(tick=0, layer=0, instrument=0, key=45),
+            pynbs.Note(tick=0, layer=2, instrument=3, key=33, velocity=50),
+            pynbs.Note(tick=7, layer=1, instrument=15, key=57, panning=-100),
+            pynbs.Note(tick=300, layer=0, instrument=5, key=87, pitch=-1200),
+            pynbs.Note(tick=300, layer=2, instrument=1, key=0, pitch=1200),
+        ]
+    )
+    file.layers = [
+        pynbs.Layer(id=0, name="Layer 1", volume=100, panning=0),
+        pynbs.Layer(id=1, name="Layer 2", lock=True, volume=50, panning=100),
+        pynbs.Layer(id=2, name="Layer 3", volume=75, panning=-50),
+    ]
+    file.instruments = [
+        pynbs.Instrument(id=0, name="Custom", file="custom.ogg", pitch=50),
+    ]
+    file.save(path, version=version)
+
+
+@pytest.mark.parametrize("version", range(0, 6))
+def test_load_song_matches_pynbs(tmp_path: Path, version: int) -> None:
+    path = tmp_path / "song.nbs"
+    write_song(path, version)
+    song = load_song(path)
+    expected = convert_file_to_song(pynbs.read(path))
+
+    assert song.notes == expected.notes
+    assert song.layers == expected.layers
+    assert song.instruments == expected.instruments
+    assert song.header.version == version
+    assert song.header.tempo == expected.header.tempo
+    assert song.header.description == "Ünïcödé"
+    assert song.header.loop == expected.header.loop
+    assert song.header.loop_start_tick == expected.header.loop_start_tick
+
+
+def test_load_song_solo_layer(tmp_path: Path) -> None:
+    path = tmp_path / "song.nbs"
+    write_song(path, 5)
+    data = bytearray(path.read_bytes())
+    # The lock byte of the first layer follows its name
+    name_end = data.index(b"Layer 1") + len("Layer 1")
+    data[name_end] = 2
+    path.write_bytes(data)
+
+    assert load_song(path).layers[0] == Layer(name="Layer 1", solo=True)
+
+
+def test_load_song_unsupported_version(tmp_path: Path) -> None:
+    path = tmp_path / "song.nbs"
+    write_song(path, 5)
+    data = bytearray(path.read_bytes())
+    data[2] = 6
+    path.write_bytes(data)
+
+    # Falls back to pynbs, which reads it as the latest version it knows
+    assert len(load_song(path).notes) == 5
+
+
+def test_open_song_header(tmp_path: Path) -> None:
+    path = tmp_path / "song.nbs"
+    write_song(path, 5)
+    with open_song(path) as song:
+        assert song.header.title == "Test song"
+        assert song.header.tempo == 12.5
+
+
+def test_open_song_sections(tmp_path: Path) -> None:
+    path = tmp_path / "song.nbs"
+    write_song(path, 5)
+    expected = load_song(path)
+    with open_song(path) as song:
+        # Layers can be read before the notes are decoded
+        assert song.layers == expected.layers
+        assert song.instruments == expected.instruments
+        assert song.notes == expected.notes
+        assert song.to_song() == expected
+
+
+@pytest.mark.parametrize("start, stop", [(0, None), (0, 400), (5, 301), (299, None)])
+def test_open_song_windows(tmp_path: Path, start: int, stop: Optional[int]) -> None:
+    path = tmp_path / "song.nbs"
+    write_song(path, 4)
+    notes = load_song(path).notes
+    end = 301 if stop is None else stop
+
+    with open_song(path) as song:
+        windows = list(song.windows(2, start, stop))
+        assert all(
+            len(window.tick) == 0 or window.tick[0] >= start for window in windows
+        )
+        streamed = NoteTable(note for window in windows for note in window)
+        assert streamed == notes.window(start, end)
+
+        # Once decoded, windows are sliced from the note table instead
+        song.notes
+        assert list(song.windows(2, start, stop)) == windows
+
+
+def test_open_song_windows_resume(tmp_path: Path) -> None:
+    path = tmp_path / "song.nbs"
+    write_song(path, 5)
+    with open_song(path) as song:
+        song.CHECKPOINT_SPACING = 1
+        first = list(song.windows(1, 0, 10))
+        assert len(first) == 10
+        assert [len(window) for window in first[:3]] == [2, 0, 0]
+        assert len(song._checkpoints) > 1
+        assert list(song.windows(1, 7, 8))[0].layer.tolist() == [1]
+        assert [len(window) for window in song.windows(100, 100)] == [0, 0, 2]
@@ -0,0 +1,56 @@
+import pytest
+
+from nbs.core.grid import GridIndex
+
+
+@pytest.fixture
+def grid() -> GridIndex:
+    grid = GridIndex()
+    for tick, layer in [(0, 0), (0, 2), (1, 0), (3, 1), (3, 4)]:
+        grid.add(f"{tick},{layer}", tick, layer)
+    return grid
+
+
+def test_lookup(grid: GridIndex) -> None:
+    assert len(grid) == 5
+    assert grid.top(3, 1) == "3,1"
+    assert grid.top(3, 2) is None
+    assert grid.is_occupied(0, 2)
+    assert not grid.is_occupied(2, 0)
+    assert sorted(grid.in_tick(0)) == ["0,0", "0,2"]
+    assert sorted(grid.in_layer(0)) == ["0,0", "1,0"]
+    assert sorted(grid.in_layers(1)) == ["0,2", "3,1", "3,4"]
+    assert sorted(grid.in_layers(1, 4)) == ["0,2", "3,1"]
+
+
+def test_overlap(grid: GridIndex) -> None:
+    grid.add("new", 0, 0)
+    assert grid.at(0, 0) == ["0,0", "new"]
+    assert grid.top(0, 0) == "new"
+    grid.remove("new", 0, 0)
+    assert grid.at(0, 0) == ["0,0"]
+
+
+def test_move_and_remove(grid: GridIndex) -> None:
+    grid.move(grid.top(3, 4), 3, 4, 5, 0)
+    assert grid.in_tick(3) == ["3,1"]
+    assert sorted(grid.in_layer(0)) == ["0,0", "1,0", "3,4"]
+    assert grid.in_layers(2) == ["0,2"]
+    grid.remove(grid.top(0, 2), 0, 2)
+    assert grid.in_layers(2) == []
+    assert not grid.is_occupied(0, 2)
+    assert len(grid) == 4
+    with pytest.raises(KeyError):
+        grid.remove("0,2", 0, 2)
+
+
+def test_area_and_bounds(grid: GridIndex) -> None:
+    assert sorted(grid.in_area(0, 2, 0, 2)) == ["0,0", "1,0"]
+    assert sorted(grid.in_area(0, 4, 1, 5)) == ["0,2", "3,1", "3,4"]
+    assert grid.bounds() == (0, 0, 4, 5)
+    grid.replace(grid.top(3, 4), "new", 3, 4)
+    assert grid.at(3, 4) == ["new"]
+    # Items are told apart by identity
+    with pytest.raises(ValueError):
+        grid.remove("".join(["0,", "0"]), 0, 0)
+    assert GridIndex().bounds() is None
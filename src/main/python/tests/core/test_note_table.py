@@ -0,0 +1,105 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from nbs.core.data import Note, NoteTable
+
+
+@pytest.fixture
+def notes() -> NoteTable:
+    return NoteTable(
+        [
+            Note(tick=4, layer=1, instrument=2, key=51, velocity=75, panning=100),
+            Note(tick=0, layer=3, instrument=0, key=39),
+            Note(tick=4, layer=0, instrument=5, key=45, pitch=-50),
+            Note(tick=0, layer=0, instrument=1, key=33, panning=-100),
+            Note(tick=10, layer=2, instrument=15, key=57),
+        ]
+    )
+
+
+def test_sorted_by_tick_and_layer(notes: NoteTable) -> None:
+    assert notes.tick.tolist() == [0, 0, 4, 4, 10]
+    assert notes.layer.tolist() == [0, 3, 0, 1, 2]
+
+
+def test_note_facade(notes: NoteTable) -> None:
+    assert notes[2] == Note(tick=4, layer=0, instrument=5, key=45, pitch=-50)
+    assert list(notes)[1] == Note(tick=0, layer=3, instrument=0, key=39)
+    assert len(list(notes)) == len(notes) == 5
+
+
+def test_columns_are_read_only(notes: NoteTable) -> None:
+    with pytest.raises(ValueError):
+        notes.key[0] = 40
+
+
+def test_from_arrays_defaults() -> None:
+    table = NoteTable.from_arrays(
+        tick=[2, 1], layer=[0, 0], instrument=[0, 1], key=[45, 46]
+    )
+    assert table.tick.tolist() == [1, 2]
+    assert table.velocity.tolist() == [100, 100]
+    assert table.panning.tolist() == [0, 0]
+    assert table.pitch.tolist() == [0, 0]
+
+
+def test_from_arrays_wrong_length() -> None:
+    with pytest.raises(ValueError):
+        NoteTable.from_arrays(tick=[0, 1], layer=[0], instrument=[0, 0], key=[45, 45])
+
+
+def test_tick_range(notes: NoteTable) -> None:
+    assert notes.tick_range(0, 1) == slice(0, 2)
+    assert notes.tick_range(1, 4) == slice(2, 2)
+    assert notes.tick_range(4, 11) == slice(2, 5)
+    assert notes.window(3, 5).layer.tolist() == [0, 1]
+
+
+def test_find(notes: NoteTable) -> None:
+    assert notes.find(4, 1) == 3
+    assert notes.find(4, 2) == -1
+    assert notes.find(7, 0) == -1
+
+
+def test_insert_keeps_order(notes: NoteTable) -> None:
+    notes.insert(
+        [
+            Note(tick=4, layer=5, instrument=0, key=45),
+            Note(tick=2, layer=0, instrument=0, key=45),
+            Note(tick=20, layer=0, instrument=0, key=45),
+        ]
+    )
+    assert notes.tick.tolist() == [0, 0, 2, 4, 4, 4, 10, 20]
+    assert notes.layer.tolist() == [0, 3, 0, 0, 1, 5, 2, 0]
+
+
+def test_delete(notes: NoteTable) -> None:
+    notes.delete(notes.instrument == 0)
+    assert len(notes) == 4
+    notes.delete(notes.tick_range(4, 5))
+    assert notes.tick.tolist() == [0, 10]
+
+
+def test_slice_and_equality(notes: NoteTable) -> None:
+    copy = notes.copy()
+    assert copy == notes
+    assert notes[1:3] == NoteTable(list(notes)[1:3])
+    copy.delete(0)
+    assert copy != notes
+
+
+def test_pickle(notes: NoteTable) -> None:
+    assert pickle.loads(pickle.dumps(notes)) == notes
+
+
+def test_memory_per_note() -> None:
+    size = 1000
+    table = NoteTable.from_arrays(
+        tick=np.arange(size),
+        layer=np.zeros(size),
+        instrument=np.zeros(size),
+        key=np.zeros(size),
+    )
+    assert table.nbytes == 16 * size
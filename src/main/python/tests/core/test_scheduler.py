@@ -0,0 +1,141 @@
+import pytest
+
+from nbs.core.data import Layer, Note, NoteTable
+from nbs.core.scheduler import PlaybackScheduler
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock: FakeClock) -> PlaybackScheduler:
+    scheduler = PlaybackScheduler(lookahead=0.1, clock=clock)
+    notes = NoteTable(
+        [
+            Note(tick=0, layer=0, instrument=1, key=45),
+            Note(tick=1, layer=0, instrument=2, key=46, pitch=50),
+            Note(tick=1, layer=1, instrument=3, key=47),
+            Note(tick=3, layer=0, instrument=4, key=48, velocity=50),
+            Note(tick=10, layer=0, instrument=5, key=49),
+        ]
+    )
+    scheduler.set_notes(notes, [Layer(), Layer(lock=True)])
+    return scheduler
+
+
+def test_poll_lookahead(scheduler: PlaybackScheduler, clock: FakeClock) -> None:
+    assert len(scheduler.poll().times) == 0
+    scheduler.play(0)
+    # At 10 ticks per second, the lookahead covers one tick
+    notes = scheduler.poll()
+    assert notes.times.tolist() == [100.0]
+    assert notes.instruments.tolist() == [1]
+
+    clock.now += 0.05
+    notes = scheduler.poll()
+    # The note in the locked layer is skipped
+    assert notes.times.tolist() == [100.1]
+    assert notes.keys.tolist() == [46.5]
+    assert len(scheduler.poll().times) == 0
+
+    clock.now += 0.2
+    notes = scheduler.poll()
+    assert notes.times.tolist() == [pytest.approx(100.3)]
+    assert notes.volumes.tolist() == [0.5]
+
+
+def test_onset_times_independent_of_polling(
+    scheduler: PlaybackScheduler, clock: FakeClock
+) -> None:
+    scheduler.play(0)
+    clock.now += 0.5
+    assert scheduler.poll().times.tolist() == pytest.approx([100, 100.1, 100.3])
+    assert scheduler.position() == pytest.approx(5)
+
+
+def test_drop_late_notes(scheduler: PlaybackScheduler, clock: FakeClock) -> None:
+    scheduler.late_threshold = 0.25
+    scheduler.play(0)
+    # A stall of half a second: only the note less than 0.25 seconds late is played
+    clock.now += 0.5
+    assert scheduler.poll().times.tolist() == pytest.approx([100.3])
+
+
+def test_seek(scheduler: PlaybackScheduler, clock: FakeClock) -> None:
+    scheduler.play(0)
+    scheduler.poll()
+    clock.now += 1
+    scheduler.seek(1)
+    notes = scheduler.poll()
+    assert notes.instruments.tolist() == [2]
+    assert notes.times.tolist() == [101.0]
+
+
+def test_pause_reschedules_upcoming_notes(
+    scheduler: PlaybackScheduler, clock: FakeClock
+) -> None:
+    scheduler.play(0.5)
+    assert scheduler.poll().instruments.tolist() == [2]
+    clock.now += 0.02
+    scheduler.pause()
+    clock.now += 5
+    assert len(scheduler.poll().times) == 0
+    assert scheduler.position() == pytest.approx(0.7)
+
+    scheduler.play()
+    notes = scheduler.poll()
+    assert notes.instruments.tolist() == [2]
+    assert notes.times.tolist() == [pytest.approx(105.05)]
+
+
+def test_set_tempo(scheduler: PlaybackScheduler, clock: FakeClock) -> None:
+    scheduler.play(0)
+    assert scheduler.poll().times.tolist() == [100]
+    clock.now += 0.1
+    scheduler.set_tempo(20)
+    clock.now += 0.05
+    assert scheduler.position() == pytest.approx(2)
+    assert scheduler.poll().times.tolist() == pytest.approx([100.1, 100.2])
+
+
+def test_set_notes_while_playing(
+    scheduler: PlaybackScheduler, clock: FakeClock
+) -> None:
+    scheduler.play(0)
+    scheduler.poll()
+    notes = NoteTable(
+        [
+            Note(tick=0, layer=0, instrument=1, key=45),
+            Note(tick=2, layer=0, instrument=6, key=45),
+        ]
+    )
+    scheduler.set_notes(notes, [])
+    clock.now += 0.2
+    # The note at tick 0 was already scheduled, and isn't repeated
+    assert scheduler.poll().instruments.tolist() == [6]
+
+
+def test_incremental_updates_while_playing(
+    scheduler: PlaybackScheduler, clock: FakeClock
+) -> None:
+    scheduler.play(0)
+    scheduler.poll()
+    scheduler.replace_ticks(
+        [3], NoteTable([Note(tick=3, layer=1, instrument=6, key=45)])
+    )
+    # The notes in layer 1, including the new one, are heard once it's unlocked
+    scheduler.set_layers([Layer(), Layer(volume=50)])
+    clock.now += 0.5
+    notes = scheduler.poll()
+    assert notes.instruments.tolist() == [2, 3, 6]
+    assert notes.volumes.tolist() == [1, 0.5, 0.5]
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from nbs.core.data import Layer, Note, NoteTable
+from nbs.core.timeline import PlaybackTimeline, TimelineNotes
+
+
+def make_notes(count: int, seed: int = 0) -> NoteTable:
+    rng = np.random.default_rng(seed)
+    return NoteTable.from_arrays(
+        tick=rng.integers(0, count // 4, count),
+        layer=rng.integers(0, 6, count),
+        instrument=rng.integers(0, 16, count),
+        key=rng.integers(33, 58, count),
+        velocity=rng.integers(0, 101, count),
+        panning=rng.integers(-100, 101, count),
+        pitch=rng.integers(-100, 101, count),
+    )
+
+
+def assert_same(actual: TimelineNotes, expected: TimelineNotes) -> None:
+    for name in TimelineNotes._fields:
+        np.testing.assert_allclose(getattr(actual, name), getattr(expected, name))
+
+
+@pytest.fixture
+def layers() -> list:
+    return [Layer(), Layer(volume=50, panning=-100), Layer(lock=True), Layer()]
+
+
+def test_window(layers: list) -> None:
+    notes = NoteTable(
+        [
+            Note(tick=0, layer=0, instrument=1, key=45, pitch=50),
+            Note(tick=1, layer=1, instrument=2, key=46, panning=100),
+            Note(tick=1, layer=2, instrument=3, key=47),
+            Note(tick=2, layer=5, instrument=4, key=48, velocity=20),
+        ]
+    )
+    timeline = PlaybackTimeline(notes, layers)
+    window = timeline.window(1, 3)
+    # The note in the locked layer is skipped
+    assert window.ticks.tolist() == [1, 2]
+    assert window.instruments.tolist() == [2, 4]
+    assert window.keys.tolist() == [46, 48]
+    assert window.volumes.tolist() == pytest.approx([0.5, 0.2])
+    assert window.pannings.tolist() == [0, 0]
+    assert timeline.window(0, 1).keys.tolist() == [45.5]
+
+
+def test_replace_ticks(layers: list) -> None:
+    notes = make_notes(400)
+    timeline = PlaybackTimeline(notes, layers)
+    replacement = make_notes(400, seed=1).window(10, 20)
+    timeline.replace_ticks(range(5, 20), replacement)
+
+    expected = notes.copy()
+    expected.delete(notes.tick_range(5, 20))
+    expected.insert(replacement)
+    assert timeline.notes == expected
+    assert_same(timeline.compiled(), PlaybackTimeline(expected, layers).compiled())
+
+
+def test_set_layers(layers: list) -> None:
+    notes = make_notes(400)
+    timeline = PlaybackTimeline(notes, layers)
+    timeline.compiled()
+    changed = [
+        Layer(panning=50),
+        Layer(volume=50, panning=-100, solo=True),
+        Layer(lock=True),
+        Layer(volume=10),
+        Layer(solo=True),
+    ]
+    timeline.set_layers(changed)
+    assert_same(timeline.compiled(), PlaybackTimeline(notes, changed).compiled())
+    assert timeline.audible_layers().tolist() == [False, True, False, False, True]
+    # The layers are copied, so changes only apply once the timeline is updated
+    changed[1].volume = 0
+    assert timeline.compiled().volumes.any()
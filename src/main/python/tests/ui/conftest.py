@@ -0,0 +1,6 @@
+import sys
+
+from PyQt5 import QtWidgets
+
+# Some widget modules query the application style at import time
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from PyQt5 import QtCore, QtWidgets
+
+from nbs.core.data import Layer, Note
+from nbs.ui.workspace.minimap import DENSITY_PALETTE, MINIMAP_BIN_TICKS, Minimap
+from nbs.ui.workspace.note_blocks import NoteBlockArea, RenderMode
+
+
+@pytest.fixture(params=[RenderMode.ITEMS, RenderMode.VIRTUAL])
+def noteBlockArea(qapp, request) -> NoteBlockArea:
+    area = NoteBlockArea(
+        [Layer() for _ in range(3)], QtWidgets.QMenu(), renderMode=request.param
+    )
+    area.loadNoteData(
+        [Note(tick=tick, layer=tick % 3, instrument=0, key=45) for tick in range(10)]
+        + [Note(tick=tick, layer=0, instrument=0, key=45) for tick in range(20, 30)]
+    )
+    return area
+
+
+def expectedCounts(area: NoteBlockArea, shape) -> np.ndarray:
+    counts = np.zeros(shape, dtype=int)
+    for block in area.grid:
+        counts[block.layer, block.tick // MINIMAP_BIN_TICKS] += 1
+    return counts
+
+
+def testMinimapBinsNotes(noteBlockArea: NoteBlockArea) -> None:
+    minimap = Minimap(noteBlockArea)
+    assert minimap.counts.shape == (3, 29 // MINIMAP_BIN_TICKS + 1)
+    assert (minimap.counts == expectedCounts(noteBlockArea, (3, 8))).all()
+    # Layer 0 is full from tick 20 to 23
+    assert minimap.image.pixel(5, 0) == DENSITY_PALETTE[MINIMAP_BIN_TICKS]
+
+
+def testMinimapFollowsEdits(noteBlockArea: NoteBlockArea, qtbot) -> None:
+    minimap = Minimap(noteBlockArea)
+    with qtbot.waitSignal(noteBlockArea.ticksEdited):
+        noteBlockArea.removeBlockAt(20, 0)
+        noteBlockArea.addBlockManual(100, 5, 45, 0)
+        noteBlockArea.removeLayer(1)
+    counts = minimap.counts
+    assert counts.shape[0] >= 5 and counts.shape[1] >= 100 // MINIMAP_BIN_TICKS + 1
+    assert (counts == expectedCounts(noteBlockArea, counts.shape)).all()
+    pixels = [minimap.image.pixel(5, 0), minimap.image.pixel(25, 4)]
+    assert pixels == [DENSITY_PALETTE[MINIMAP_BIN_TICKS - 1], DENSITY_PALETTE[1]]
+
+
+def testMinimapScrollsView(noteBlockArea: NoteBlockArea, qtbot) -> None:
+    minimap = Minimap(noteBlockArea)
+    minimap.resize(400, minimap.height())
+    view = noteBlockArea.view
+    view.resize(200, 100)
+    noteBlockArea.updateSceneSize()
+    qtbot.mouseClick(minimap, QtCore.Qt.LeftButton, pos=QtCore.QPoint(300, 10))
+    sceneRect = noteBlockArea.sceneRect()
+    center = minimap.getVisibleSceneRect().center().x()
+    assert center == pytest.approx(sceneRect.width() * 3 / 4, abs=view.width())
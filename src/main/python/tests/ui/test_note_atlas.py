@@ -0,0 +1,40 @@
+from nbs.ui.workspace.note_atlas import (
+    DetailLevel,
+    NoteBlockAtlas,
+    atlasIndex,
+    getDetailLevel,
+)
+from nbs.ui.workspace.note_blocks import NoteBlock
+
+
+def testAtlasIndex() -> None:
+    assert atlasIndex(0, 0) == 0
+    assert atlasIndex(0, 45, isOutOfRange=True) == 88 + 45
+    assert atlasIndex(1, 0) == 2 * 88
+    # Custom instruments share the color of the last default one
+    assert atlasIndex(20, 10) == atlasIndex(15, 10)
+    assert atlasIndex(0, 88) == atlasIndex(0, -1) == -1
+
+
+def testAtlasLevels() -> None:
+    assert NoteBlockAtlas.levelFor(10) == 16
+    assert NoteBlockAtlas.levelFor(20) == NoteBlockAtlas.levelFor(32) == 32
+    assert NoteBlockAtlas.levelFor(100) == 64
+
+
+def testDetailLevels() -> None:
+    assert getDetailLevel(0.2 * 32) == DetailLevel.FLAT
+    assert getDetailLevel(12) == getDetailLevel(64) == DetailLevel.PIXMAP
+    assert getDetailLevel(4 * 32) == DetailLevel.VECTOR
+
+
+def testAtlasMatchesPixmaps(qapp) -> None:
+    atlas = NoteBlockAtlas().get(32, wait=True)
+    for instrument, key, isOutOfRange in [
+        (0, 0, False),
+        (3, 45, False),
+        (15, 87, True),
+    ]:
+        rect = atlas.rects[atlasIndex(instrument, key, isOutOfRange)].toRect()
+        pixmap = NoteBlock.renderPixmap(instrument, key, isOutOfRange)
+        assert atlas.pixmap.copy(rect).toImage() == pixmap.toImage()
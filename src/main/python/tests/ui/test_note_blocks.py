@@ -0,0 +1,263 @@
+import gc
+import time
+from typing import List
+
+import numpy as np
+import pytest
+from PyQt5 import QtCore, QtGui, QtWidgets, sip
+
+from nbs.core.data import Layer, Note
+from nbs.ui.workspace.constants import BLOCK_SIZE
+from nbs.ui.workspace.note_blocks import (
+    BLOCK_GLOW_BASE_OPACITY,
+    GlowAnimator,
+    NoteBlock,
+    NoteBlockArea,
+    RenderMode,
+)
+
+
+@pytest.fixture
+def noteBlockArea(qapp) -> NoteBlockArea:
+    area = NoteBlockArea([Layer() for _ in range(3)], QtWidgets.QMenu())
+    area.loadNoteData(
+        [Note(tick=tick, layer=tick % 3, instrument=tick, key=45) for tick in range(10)]
+    )
+    return area
+
+
+@pytest.fixture
+def virtualArea(qapp) -> NoteBlockArea:
+    area = NoteBlockArea(
+        [Layer() for _ in range(3)], QtWidgets.QMenu(), renderMode=RenderMode.VIRTUAL
+    )
+    area.loadNoteData(
+        [Note(tick=tick, layer=tick % 3, instrument=tick, key=45) for tick in range(10)]
+    )
+    return area
+
+
+def playedTicks(area: NoteBlockArea) -> List[List[int]]:
+    payloads: List[List[int]] = []
+    area.tickPlayed.connect(lambda notes: payloads.append(notes["instrument"].tolist()))
+    return payloads
+
+
+def testCatchUpSkippedTicks(noteBlockArea: NoteBlockArea) -> None:
+    payloads = playedTicks(noteBlockArea)
+    noteBlockArea.setPlaying(True)
+    noteBlockArea.doPlayback(0.5)
+    # A stall of several ticks: the notes in between are played together
+    noteBlockArea.doPlayback(5.2)
+    noteBlockArea.doPlayback(5.9)
+    noteBlockArea.doPlayback(6.1)
+    assert payloads == [[1, 2, 3, 4, 5], [6]]
+
+
+def testNoCatchUpWhenNotPlaying(noteBlockArea: NoteBlockArea) -> None:
+    payloads = playedTicks(noteBlockArea)
+    noteBlockArea.doPlayback(5.2)
+    noteBlockArea.setPlaying(True)
+    noteBlockArea.seekPlayback(2)
+    noteBlockArea.doPlayback(3)
+    # Moving backwards plays the tick reached only
+    noteBlockArea.doPlayback(1)
+    assert payloads == [[5], [3], [1]]
+
+
+def testScrubbingIsRateLimited(noteBlockArea: NoteBlockArea, qtbot) -> None:
+    payloads = playedTicks(noteBlockArea)
+    noteBlockArea.previewInterval = 0.1
+    for tick in range(1, 6):
+        noteBlockArea.doPlayback(tick)
+    # Only the first tick reached is played right away, and the last one once the
+    # interval is over
+    assert payloads == [[1]]
+    qtbot.waitUntil(lambda: len(payloads) == 2, timeout=1000)
+    assert payloads == [[1], [5]]
+
+
+def testPlaybackFollowsEdits(noteBlockArea: NoteBlockArea) -> None:
+    payloads = []
+    noteBlockArea.tickPlayed.connect(lambda notes: payloads.append(notes.tolist()))
+    noteBlockArea.playTick(1)
+    noteBlockArea.layers[1].volume = 50
+    noteBlockArea.setLayerVolume(1, 50)
+    noteBlockArea.getBlocksInTick(1)[0].changeKey(2)
+    noteBlockArea.playTick(1)
+    noteBlockArea.layers[1].lock = True
+    noteBlockArea.setLayerLock(1, True)
+    noteBlockArea.playTick(1)
+    assert payloads == [[(1, 45, 1, 0)], [(1, 47, 0.5, 0)]]
+
+
+def testEditsAreReported(noteBlockArea: NoteBlockArea, qtbot) -> None:
+    with qtbot.waitSignal(noteBlockArea.ticksEdited) as blocker:
+        noteBlockArea.getBlocksInTick(4)[0].changeKey(2)
+        noteBlockArea.removeBlockAt(7, 1)
+    assert blocker.args == [[4, 7]]
+    notes = noteBlockArea.getNotesInTicks([4, 7])
+    assert notes.key.tolist() == [47]
+
+
+def testGlowFadesOut(noteBlockArea: NoteBlockArea) -> None:
+    now = 0.0
+    animator = GlowAnimator(clock=lambda: now)
+    finished = []
+    animator.finished.connect(finished.extend)
+    first, second = noteBlockArea.getBlocksInTick(1) + noteBlockArea.getBlocksInTick(2)
+    animator.start([first])
+    now = 0.5
+    animator.start([first, second])
+    assert first.opacity() == second.opacity() == 1
+    now = 1.25
+    animator.advance()
+    assert first.opacity() == pytest.approx(0.7)
+    # The first block's glow was restarted, so both finish together
+    now = 1.5
+    animator.advance()
+    assert finished == [first, second]
+    assert first.opacity() == second.opacity() == BLOCK_GLOW_BASE_OPACITY
+    assert len(animator) == 0 and not animator.timer.isActive()
+
+
+def testGlowsStopWithTheScene(qapp, monkeypatch: pytest.MonkeyPatch) -> None:
+    area = NoteBlockArea([Layer()], QtWidgets.QMenu())
+    area.loadNoteData(
+        [Note(tick=tick, layer=0, instrument=0, key=45) for tick in range(3)]
+    )
+    animator = area.glowAnimator
+    animator.start(area.getBlocksInLayer(0))
+    timer = animator.timer
+    # Freeing the scene deletes its blocks, and the timer with the animator
+    del area
+    gc.collect()
+    assert sip.isdeleted(timer)
+    assert len(animator) == 0
+    written: List[NoteBlock] = []
+    monkeypatch.setattr(NoteBlock, "setOpacity", lambda block, _: written.append(block))
+    animator.advance()
+    assert written == []
+
+
+def testClearingStopsGlows(noteBlockArea: NoteBlockArea) -> None:
+    animator = noteBlockArea.glowAnimator
+    animator.start(noteBlockArea.getBlocksInTick(1))
+    noteBlockArea.clear()
+    assert len(animator) == 0 and not animator.timer.isActive()
+
+
+def layerTicks(area: NoteBlockArea, layer: int) -> List[int]:
+    return sorted(block.tick for block in area.getBlocksInLayer(layer))
+
+
+def testLayerOperationsUseGrid(noteBlockArea: NoteBlockArea) -> None:
+    assert layerTicks(noteBlockArea, 1) == [1, 4, 7]
+    noteBlockArea.removeLayer(1)
+    assert layerTicks(noteBlockArea, 1) == [2, 5, 8]
+    pos = QtCore.QPointF(2.5 * BLOCK_SIZE, 1.5 * BLOCK_SIZE)
+    assert noteBlockArea.blockAtPos(pos).tick == 2
+    noteBlockArea.removeBlockAt(2, 1)
+    assert noteBlockArea.blockAtPos(pos) is None
+    assert len(noteBlockArea.grid) == len(noteBlockArea.items()) == 6
+
+
+def testPlacingSelectionReplacesBlocksUnderIt(noteBlockArea: NoteBlockArea) -> None:
+    noteBlockArea.loadSelection(
+        [Note(tick=tick, layer=tick % 3, instrument=15, key=45) for tick in (2, 3)]
+    )
+    noteBlockArea.deselectAll()
+    assert len(noteBlockArea.grid) == len(noteBlockArea.items()) == 10
+    assert [b.note.instrument for b in noteBlockArea.getBlocksInTick(2)] == [15]
+    assert [b.note.instrument for b in noteBlockArea.getBlocksInTick(3)] == [15]
+
+
+def testCompressMovesToFirstFreeLayer(noteBlockArea: NoteBlockArea) -> None:
+    noteBlockArea.clear()
+    for tick, layer in [(0, 0), (0, 1), (0, 3)]:
+        noteBlockArea.addBlock(
+            tick, layer, Note(tick=tick, layer=layer, instrument=0, key=45)
+        )
+    selected = [
+        noteBlockArea.addBlock(
+            tick, layer, Note(tick=tick, layer=layer, instrument=0, key=45)
+        )
+        for tick, layer in [(0, 6), (1, 0)]
+    ]
+    noteBlockArea.setBlocksSelected(selected)
+    noteBlockArea.compressSelection()
+    # The block in tick 1 lands on tick 0, and skips the layers taken there
+    cells = sorted((block.tick, block.layer) for block in noteBlockArea.grid)
+    assert cells == [(0, 0), (0, 1), (0, 2), (0, 3), (0, 6)]
+
+
+def renderScene(area: NoteBlockArea, scale: float = 1) -> QtGui.QImage:
+    rect = QtCore.QRectF(0, 0, 12 * BLOCK_SIZE, 4 * BLOCK_SIZE)
+    image = QtGui.QImage((rect.size() * scale).toSize(), QtGui.QImage.Format_ARGB32)
+    painter = QtGui.QPainter(image)
+    area.render(painter, QtCore.QRectF(image.rect()), rect)
+    painter.end()
+    return image
+
+
+def imageArray(image: QtGui.QImage) -> np.ndarray:
+    data = image.constBits().asarray(image.sizeInBytes())
+    return np.frombuffer(data, dtype=np.uint8).astype(int)
+
+
+# One scale per detail level
+@pytest.mark.parametrize("scale", [0.25, 1, 3])
+def testVirtualModeLooksTheSame(
+    noteBlockArea: NoteBlockArea, virtualArea: NoteBlockArea, scale: float
+) -> None:
+    assert virtualArea.items() == []
+    virtualImage = renderScene(virtualArea, scale)
+    itemsImage = renderScene(noteBlockArea, scale)
+    if scale < 1:
+        # Flat blocks are drawn as rects with items, and as a single scaled image
+        # without, which Qt blends with slightly different rounding
+        difference = imageArray(virtualImage) - imageArray(itemsImage)
+        assert np.abs(difference).max() <= 1
+    else:
+        assert virtualImage == itemsImage
+    assert virtualArea.blocksBoundingRect() == noteBlockArea.blocksBoundingRect()
+
+
+def testVirtualModeCreatesItemsOnlyWhileNeeded(virtualArea: NoteBlockArea) -> None:
+    virtualArea.playTick(1)
+    area = QtCore.QRectF(3 * BLOCK_SIZE, 0, 2 * BLOCK_SIZE, 3 * BLOCK_SIZE)
+    virtualArea.setAreaSelected(area)
+    assert sorted(block.tick for block in virtualArea.selectedItems()) == [3, 4]
+    virtualArea.deselectAll()
+    virtualArea.releaseBlocks()
+    # The playing block keeps its item until its animation is over
+    assert [block.tick for block in virtualArea.items()] == [1]
+    virtualArea.glowAnimator.clock = lambda: time.monotonic() + 10
+    virtualArea.glowAnimator.advance()
+    virtualArea.releaseBlocks()
+    assert virtualArea.items() == []
+    assert len(virtualArea.grid) == 10
+
+
+def testVirtualModeEdits(virtualArea: NoteBlockArea) -> None:
+    virtualArea.removeLayer(1)
+    assert layerTicks(virtualArea, 1) == [2, 5, 8]
+    virtualArea.loadSelection(
+        [Note(tick=tick, layer=1, instrument=15, key=45) for tick in (2, 3)]
+    )
+    virtualArea.deselectAll()
+    virtualArea.releaseBlocks()
+    assert virtualArea.items() == []
+    notes = sorted(
+        (note.tick, note.layer, note.instrument) for note in virtualArea.getNoteData()
+    )
+    assert notes == [
+        (0, 0, 0),
+        (2, 1, 15),
+        (3, 0, 3),
+        (3, 1, 15),
+        (5, 1, 5),
+        (6, 0, 6),
+        (8, 1, 8),
+        (9, 0, 9),
+    ]